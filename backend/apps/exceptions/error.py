@@ -61,3 +61,15 @@ class TestCaseNotFound(NotFoundError):
 
 class TaskNotFound(NotFoundError):
     pass
+
+
+class NotifyError(BaseError):
+    """notify error"""
+
+    pass
+
+
+class NotifyRetryableError(NotifyError):
+    """notify error caused by network or server, can be retried"""
+
+    pass
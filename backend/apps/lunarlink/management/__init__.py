@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""
+@File    : __init__.py
+@Time    : 2026/10/19 18:10
+@Author  : geekbing
+@LastEditTime : -
+@LastEditors : -
+@Description : -
+"""
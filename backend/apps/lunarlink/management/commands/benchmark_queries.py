@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+"""
+@File    : benchmark_queries.py
+@Time    : 2026/10/19 18:10
+@Author  : geekbing
+@LastEditTime : -
+@LastEditors : -
+@Description : 生成压测数据，记录常用查询的耗时和执行计划，用于对比索引调整前后的效果
+
+    # 生成数据，在旧索引下记录耗时
+    python manage.py migrate lunarlink 0020
+    python manage.py benchmark_queries --seed --output before.json
+    # 加上新索引后再次记录并对比
+    python manage.py migrate lunarlink
+    python manage.py benchmark_queries --output after.json --compare before.json
+    # 删除压测数据
+    python manage.py benchmark_queries --clean
+"""
+import datetime
+import json
+import random
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from lunarlink import models
+
+# 压测数据所在的项目名称
+BENCHMARK_PROJECT = "__benchmark__"
+
+BATCH_SIZE = 2000
+
+
+@contextmanager
+def keep_time_fields(*model_classes):
+    """生成数据时保留手动设置的create_time、update_time"""
+    fields = [
+        field
+        for model_class in model_classes
+        for field in model_class._meta.fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    origin = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, origin):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = "生成压测数据，记录常用查询的耗时和执行计划"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", action="store_true", help="生成压测数据")
+        parser.add_argument("--clean", action="store_true", help="删除压测数据")
+        parser.add_argument("--apis", type=int, default=200000, help="接口数量")
+        parser.add_argument("--cases", type=int, default=50000, help="用例数量")
+        parser.add_argument("--steps", type=int, default=5, help="每条用例的步骤数")
+        parser.add_argument("--reports", type=int, default=200000, help="报告数量")
+        parser.add_argument("--nodes", type=int, default=50, help="目录节点数量")
+        parser.add_argument("--days", type=int, default=365, help="数据分布的天数")
+        parser.add_argument("--repeat", type=int, default=5, help="每条查询执行次数")
+        parser.add_argument("--output", help="结果写入的json文件")
+        parser.add_argument("--compare", help="对比的json结果文件")
+
+    def handle(self, *args, **options):
+        if options["clean"]:
+            self.clean()
+            return
+
+        if options["seed"]:
+            self.clean()
+            self.seed(options)
+
+        project = models.Project.objects.filter(name=BENCHMARK_PROJECT).first()
+        if project is None:
+            raise CommandError("没有压测数据，请先使用--seed生成")
+
+        results = self.run_queries(project, options["repeat"])
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fp:
+                json.dump(results, fp, ensure_ascii=False, indent=2)
+
+        before = None
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as fp:
+                before = json.load(fp)
+        self.print_results(results, before)
+
+    def clean(self):
+        project_ids = list(
+            models.Project.objects.with_deleted()
+            .filter(name=BENCHMARK_PROJECT)
+            .values_list("id", flat=True)
+        )
+        if not project_ids:
+            return
+
+        case_ids = models.Case.objects.with_deleted().filter(
+            project_id__in=project_ids
+        )
+        models.CaseStep.objects.with_deleted().filter(case_id__in=case_ids).delete()
+        for model_class in (
+            models.Report,
+            models.Case,
+            models.API,
+            models.Config,
+            models.Relation,
+        ):
+            # 压测数据没有关联的报告详情等数据，直接删除，不逐条收集级联对象
+            model_class.objects.with_deleted().filter(
+                project_id__in=project_ids
+            )._raw_delete(using="default")
+        models.Project.objects.with_deleted().filter(id__in=project_ids).delete()
+        self.stdout.write("已删除压测数据")
+
+    def seed(self, options):
+        rand = random.Random(0)
+        now = timezone.now()
+        nodes = list(range(1, options["nodes"] + 1))
+
+        def random_time():
+            seconds = rand.randint(0, options["days"] * 86400)
+            return now - datetime.timedelta(seconds=seconds)
+
+        project = models.Project.objects.create(
+            name=BENCHMARK_PROJECT, desc="压测数据", responsible="benchmark"
+        )
+        tree = [{"id": node, "label": f"目录{node}", "children": []} for node in nodes]
+        for tree_type in (1, 2):
+            models.Relation.objects.create(project=project, type=tree_type, tree=tree)
+        models.Config.objects.create(
+            project=project, name="benchmark", body="{}", base_url=""
+        )
+
+        def bulk_create(model_class, build, total):
+            with keep_time_fields(model_class):
+                for start in range(0, total, BATCH_SIZE):
+                    stop = min(start + BATCH_SIZE, total)
+                    objs = [build(i) for i in range(start, stop)]
+                    with transaction.atomic():
+                        model_class.objects.bulk_create(objs)
+            self.stdout.write(f"{model_class.__name__}: {total}")
+
+        def build_api(i):
+            create_time = random_time()
+            return models.API(
+                name=f"接口{i}",
+                url=f"/api/benchmark/{i}",
+                method="GET",
+                body="{}",
+                project=project,
+                relation=rand.choice(nodes),
+                tag=rand.choice((0, 1, 2, 4)),
+                create_time=create_time,
+                update_time=create_time,
+            )
+
+        def build_case(i):
+            create_time = random_time()
+            return models.Case(
+                name=f"用例{i}",
+                project=project,
+                relation=rand.choice(nodes),
+                length=options["steps"],
+                tag=rand.randint(1, 4),
+                create_time=create_time,
+                update_time=create_time,
+            )
+
+        def build_report(i):
+            create_time = random_time()
+            return models.Report(
+                name=f"报告{i}",
+                type=rand.randint(1, 4),
+                status=rand.random() > 0.2,
+                summary="{}",
+                project=project,
+                ci_metadata={},
+                create_time=create_time,
+                update_time=create_time,
+                is_deleted=rand.random() < 0.1,
+            )
+
+        bulk_create(models.API, build_api, options["apis"])
+        bulk_create(models.Case, build_case, options["cases"])
+        bulk_create(models.Report, build_report, options["reports"])
+
+        api_ids = list(
+            models.API.objects.filter(project=project).values_list("id", flat=True)
+        )
+        case_ids = list(
+            models.Case.objects.filter(project=project).values_list("id", flat=True)
+        )
+
+        def build_step(i):
+            create_time = random_time()
+            return models.CaseStep(
+                name=f"步骤{i}",
+                url=f"/api/benchmark/{i}",
+                method="GET",
+                body="{}",
+                case_id=case_ids[i // options["steps"]],
+                step=i % options["steps"],
+                source_api_id=rand.choice(api_ids) if api_ids else 0,
+                create_time=create_time,
+                update_time=create_time,
+            )
+
+        bulk_create(models.CaseStep, build_step, len(case_ids) * options["steps"])
+
+    def get_queries(self, project):
+        """压测的查询，与对应接口中的查询保持一致"""
+        api_id = (
+            models.API.objects.filter(project=project)
+            .values_list("id", flat=True)
+            .first()
+        )
+        case_id = (
+            models.Case.objects.filter(project=project)
+            .values_list("id", flat=True)
+            .first()
+        )
+        nodes = [1, 2, 3]
+        now = timezone.now()
+        return {
+            "api_list": models.API.objects.filter(project=project).order_by(
+                "-create_time", "-id"
+            )[:10],
+            "api_list_by_node": models.API.objects.filter(
+                project=project, relation__in=nodes
+            ).order_by("-create_time", "-id")[:10],
+            "case_list": models.Case.objects.filter(project=project).order_by(
+                "-create_time"
+            )[:10],
+            "case_list_by_node": models.Case.objects.filter(
+                project=project, relation__in=nodes
+            ).order_by("-create_time")[:10],
+            "case_steps": models.CaseStep.objects.filter(case_id=case_id).order_by(
+                "step"
+            ),
+            "case_steps_by_source_api": models.CaseStep.objects.filter(
+                source_api_id=api_id
+            ),
+            # 与ReportView.list的键集分页一致，按(create_time, id)倒序
+            "report_list": models.Report.objects.filter(project=project)
+            .defer("summary")
+            .order_by("-create_time", "-id")[:10],
+            "report_purge": models.Report.objects.with_deleted()
+            .filter(is_deleted=True, update_time__lt=now - datetime.timedelta(days=7))
+            .order_by("id")
+            .values_list("id", flat=True)[:200],
+            "daily_stat_refresh": models.Report.objects.filter(
+                create_time__gte=now - datetime.timedelta(days=2)
+            ).values_list("id", flat=True),
+            "config_list": models.Config.objects.filter(project=project).order_by(
+                "-update_time"
+            )[:10],
+            "relation": models.Relation.objects.filter(project=project, type=1),
+        }
+
+    def run_queries(self, project, repeat):
+        results = {}
+        for name, queryset in self.get_queries(project).items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = {
+                "ms": round(statistics.median(timings), 3),
+                "plan": queryset.explain(),
+            }
+        return results
+
+    def print_results(self, results, before=None):
+        for name, result in results.items():
+            line = f"{name:<28}{result['ms']:>10.3f} ms"
+            if before and name in before:
+                before_ms = before[name]["ms"]
+                speedup = before_ms / result["ms"] if result["ms"] else 0
+                line = f"{line}    before {before_ms:>10.3f} ms    x{speedup:.1f}"
+            self.stdout.write(line)
+            self.stdout.write(f"    {result['plan']}")
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.1 on 2026-10-19 10:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lunarlink', '0014_delete_hostip'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportDetailChunk',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.IntegerField(verbose_name='分片序号')),
+                ('summary_detail', models.TextField(verbose_name='用例详细信息')),
+                ('is_deleted', models.BooleanField(default=False, verbose_name='是否删除')),
+                ('report', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='detail_chunks', to='lunarlink.report')),
+            ],
+            options={
+                'verbose_name': '测试报告详情分片',
+                'db_table': 'report_detail_chunk',
+                'unique_together': {('report', 'seq')},
+            },
+        ),
+    ]
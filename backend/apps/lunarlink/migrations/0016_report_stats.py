@@ -0,0 +1,141 @@
+# Generated by Django 3.2.1 on 2026-10-19 15:20
+
+import json
+
+from django.db import migrations, models
+import jsonfield.fields
+
+BACKFILL_BATCH_SIZE = 500
+
+STATS_FIELDS = [
+    'tests_run',
+    'successes',
+    'failures',
+    'errors',
+    'skipped',
+    'case_count',
+    'case_fail_rate',
+    'failure_cases',
+    'duration',
+    'start_at',
+    'platform',
+]
+
+
+def parse_case_fail_rate(case_fail_rate):
+    """用例失败率转换为百分比数值，"12.50%" => 12.5"""
+    if case_fail_rate is None:
+        return None
+    if isinstance(case_fail_rate, str):
+        try:
+            return float(case_fail_rate.rstrip('%'))
+        except ValueError:
+            return None
+    return float(case_fail_rate)
+
+
+def get_report_stats(summary):
+    """迁移时的统计字段提取逻辑，固定在迁移中，不随业务代码变化"""
+    stat = summary.get('stat', {})
+    time_info = summary.get('time', {})
+    return {
+        'tests_run': stat.get('testsRun', 0),
+        'successes': stat.get('successes', 0),
+        'failures': stat.get('failures', 0),
+        'errors': stat.get('errors', 0),
+        'skipped': stat.get('skipped', 0),
+        'case_count': stat.get('case_count'),
+        'case_fail_rate': parse_case_fail_rate(stat.get('case_fail_rate')),
+        'failure_cases': stat.get('failure_case_config_mapping_list'),
+        'duration': time_info.get('duration', 0),
+        'start_at': time_info.get('start_at'),
+        'platform': summary.get('platform', {}),
+    }
+
+
+def backfill_report_stats(apps, schema_editor):
+    """从已有报告的summary中回填统计字段"""
+    Report = apps.get_model('lunarlink', 'Report')
+    batch = []
+    for report in Report.objects.only('id', 'summary').iterator(chunk_size=BACKFILL_BATCH_SIZE):
+        try:
+            summary = json.loads(report.summary)
+        except (TypeError, ValueError):
+            continue
+
+        for field, value in get_report_stats(summary).items():
+            setattr(report, field, value)
+        batch.append(report)
+
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            Report.objects.bulk_update(batch, STATS_FIELDS)
+            batch = []
+
+    if batch:
+        Report.objects.bulk_update(batch, STATS_FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lunarlink', '0015_reportdetailchunk'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='tests_run',
+            field=models.IntegerField(db_index=True, default=0, verbose_name='执行步骤数'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='successes',
+            field=models.IntegerField(default=0, verbose_name='成功步骤数'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='failures',
+            field=models.IntegerField(db_index=True, default=0, verbose_name='失败步骤数'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='errors',
+            field=models.IntegerField(db_index=True, default=0, verbose_name='错误步骤数'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='skipped',
+            field=models.IntegerField(default=0, verbose_name='跳过步骤数'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='case_count',
+            field=models.IntegerField(default=None, null=True, verbose_name='用例数'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='case_fail_rate',
+            field=models.FloatField(db_index=True, default=None, null=True, verbose_name='用例失败率(%)'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='duration',
+            field=models.FloatField(db_index=True, default=0, verbose_name='执行耗时(秒)'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='start_at',
+            field=models.FloatField(db_index=True, default=None, null=True, verbose_name='开始执行时间戳'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='platform',
+            field=jsonfield.fields.JSONField(default=dict, verbose_name='运行平台'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='failure_cases',
+            field=jsonfield.fields.JSONField(default=None, null=True, verbose_name='失败用例和配置'),
+        ),
+        migrations.RunPython(backfill_report_stats, migrations.RunPython.noop),
+    ]
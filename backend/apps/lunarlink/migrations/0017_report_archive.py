@@ -0,0 +1,23 @@
+# Generated by Django 3.2.1 on 2026-10-19 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lunarlink', '0016_report_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='archived',
+            field=models.BooleanField(db_index=True, default=False, verbose_name='详情是否已归档'),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='archive_key',
+            field=models.CharField(default=None, max_length=255, null=True, verbose_name='归档文件路径'),
+        ),
+    ]
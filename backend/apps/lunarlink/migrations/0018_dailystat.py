@@ -0,0 +1,89 @@
+# Generated by Django 3.2.1 on 2026-10-19 16:40
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_daily_stats(apps, schema_editor):
+    """按已有数据回填每日统计，看板在第一次定时刷新前也能展示历史数据"""
+    DailyStat = apps.get_model('lunarlink', 'DailyStat')
+    stat_models = {
+        'api': apps.get_model('lunarlink', 'API'),
+        'case': apps.get_model('lunarlink', 'Case'),
+        'report': apps.get_model('lunarlink', 'Report'),
+    }
+
+    stats = []
+    for model_name, model in stat_models.items():
+        query = model.objects.filter(is_deleted=False)
+        if model_name == 'api':
+            query = query.filter(~Q(tag=4))
+
+        group_fields = ['project_id', 'creator_id', 'creator__name', 'day']
+        aggregations = {'counts': Count('id')}
+        if model_name == 'report':
+            group_fields.append('type')
+            aggregations['success_counts'] = Count('id', filter=Q(status=True))
+
+        rows = (
+            query.annotate(day=TruncDate('create_time'))
+            .order_by()
+            .values(*group_fields)
+            .annotate(**aggregations)
+        )
+        for row in rows:
+            stats.append(
+                DailyStat(
+                    project_id=row['project_id'],
+                    model=model_name,
+                    creator_id=row['creator_id'],
+                    creator_name=row['creator__name'],
+                    category=row.get('type', 0),
+                    day=row['day'],
+                    counts=row['counts'],
+                    success_counts=row.get('success_counts', 0),
+                )
+            )
+
+    DailyStat.objects.bulk_create(stats, batch_size=BACKFILL_BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lunarlink', '0017_report_archive'),
+        ('lunaruser', '0002_myuser_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStat',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('project_id', models.IntegerField(verbose_name='项目id')),
+                ('model', models.CharField(choices=[('api', '接口'), ('case', '用例'), ('report', '报告')], max_length=10, verbose_name='数据类型')),
+                ('creator_id', models.IntegerField(null=True, verbose_name='创建人id')),
+                ('creator_name', models.CharField(max_length=40, null=True, verbose_name='创建人名称')),
+                ('category', models.IntegerField(default=0, verbose_name='分类')),
+                ('day', models.DateField(verbose_name='日期')),
+                ('counts', models.IntegerField(default=0, verbose_name='创建数量')),
+                ('success_counts', models.IntegerField(default=0, verbose_name='成功数量')),
+            ],
+            options={
+                'verbose_name': '看板每日统计',
+                'db_table': 'daily_stat',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='dailystat',
+            index=models.Index(fields=['model', 'day'], name='daily_stat_model_day'),
+        ),
+        migrations.AddIndex(
+            model_name='dailystat',
+            index=models.Index(fields=['project_id', 'model', 'day'], name='daily_stat_project_day'),
+        ),
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop),
+    ]
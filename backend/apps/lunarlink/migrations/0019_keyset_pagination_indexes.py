@@ -0,0 +1,29 @@
+# Generated by Django 3.2.1 on 2026-10-19 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lunarlink', '0018_dailystat'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='api',
+            index=models.Index(fields=['project', 'is_deleted', 'create_time'], name='api_project_create_time'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['project', 'is_deleted', 'create_time'], name='report_project_create_time'),
+        ),
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(fields=['project', 'create_time'], name='visit_project_create_time'),
+        ),
+        migrations.AddIndex(
+            model_name='loginlog',
+            index=models.Index(fields=['is_deleted', 'create_time'], name='login_log_create_time'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 3.2.1 on 2026-10-19 17:45
+
+from django.db import migrations
+
+# 名称和url上的ngram全文索引，MySQL需要关闭innodb_ft_enable_stopword，见deployment/mysql/conf.d/my.cnf
+FULLTEXT_INDEXES = [
+    ('api', 'api_name_url_fulltext'),
+    ('case_step', 'case_step_name_url_fulltext'),
+]
+
+
+def create_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    for table, index in FULLTEXT_INDEXES:
+        schema_editor.execute(
+            f'CREATE FULLTEXT INDEX `{index}` ON `{table}` (`name`, `url`) WITH PARSER ngram'
+        )
+
+
+def drop_fulltext_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    for table, index in FULLTEXT_INDEXES:
+        schema_editor.execute(f'DROP INDEX `{index}` ON `{table}`')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lunarlink', '0019_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_indexes, drop_fulltext_indexes),
+    ]
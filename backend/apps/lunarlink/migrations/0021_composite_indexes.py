@@ -0,0 +1,57 @@
+# Generated by Django 3.2.1 on 2026-10-19 18:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lunarlink', '0020_fulltext_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='config',
+            index=models.Index(fields=['project', 'is_deleted', 'update_time'], name='config_project_update_time'),
+        ),
+        migrations.AddIndex(
+            model_name='api',
+            index=models.Index(fields=['project', 'is_deleted', 'relation', 'create_time'], name='api_project_relation'),
+        ),
+        migrations.AddIndex(
+            model_name='api',
+            index=models.Index(fields=['is_deleted', 'create_time'], name='api_create_time'),
+        ),
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(fields=['project', 'is_deleted', 'create_time'], name='case_project_create_time'),
+        ),
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(fields=['project', 'is_deleted', 'relation', 'create_time'], name='case_project_relation'),
+        ),
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(fields=['is_deleted', 'create_time'], name='case_create_time'),
+        ),
+        migrations.AddIndex(
+            model_name='casestep',
+            index=models.Index(fields=['case', 'is_deleted', 'step'], name='case_step_case_step'),
+        ),
+        migrations.AddIndex(
+            model_name='casestep',
+            index=models.Index(fields=['source_api_id'], name='case_step_source_api'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['is_deleted', 'create_time'], name='report_create_time'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['is_deleted', 'update_time'], name='report_update_time'),
+        ),
+        migrations.AddIndex(
+            model_name='relation',
+            index=models.Index(fields=['project', 'type'], name='relation_project_type'),
+        ),
+    ]
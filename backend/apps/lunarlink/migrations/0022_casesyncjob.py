@@ -0,0 +1,39 @@
+# Generated by Django 3.2.1 on 2026-10-19 18:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import jsonfield.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('lunarlink', '0021_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaseSyncJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('create_time', models.DateTimeField(auto_now_add=True, help_text='创建时间', verbose_name='创建时间')),
+                ('update_time', models.DateTimeField(auto_now=True, help_text='更新时间', verbose_name='更新时间')),
+                ('updater', models.IntegerField(help_text='修改人', null=True, verbose_name='修改人')),
+                ('is_deleted', models.BooleanField(default=False, verbose_name='是否删除')),
+                ('api_ids', jsonfield.fields.JSONField(default=list, verbose_name='同步的接口id')),
+                ('status', models.IntegerField(choices=[(0, '等待'), (1, '同步中'), (2, '成功'), (3, '失败')], default=0, verbose_name='任务状态')),
+                ('total', models.IntegerField(default=0, verbose_name='需要同步的步骤数')),
+                ('done', models.IntegerField(default=0, verbose_name='已同步的步骤数')),
+                ('last_step_id', models.IntegerField(default=0, verbose_name='已同步的步骤id')),
+                ('message', models.TextField(blank=True, default='', verbose_name='失败原因')),
+                ('creator', models.ForeignKey(db_constraint=False, help_text='创建人', null=True, on_delete=django.db.models.deletion.SET_NULL, related_query_name='creator_query', to=settings.AUTH_USER_MODEL, verbose_name='创建人')),
+                ('project', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='lunarlink.project')),
+            ],
+            options={
+                'verbose_name': '用例步骤同步任务',
+                'db_table': 'case_sync_job',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.1 on 2026-10-19 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lunarlink', '0022_casesyncjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='api',
+            name='yapi_digest',
+            field=models.CharField(default='', max_length=32, null=True, verbose_name='yapi接口摘要'),
+        ),
+    ]
@@ -138,6 +138,9 @@ def delete_related_objects(sender, instance, **kwargs):
 
         # 注意：这部分操作可能会很慢，如果有大量的数据，考虑性能问题
         ReportDetail.objects.filter(report__in=report_objects).update(is_deleted=True)
+        ReportDetailChunk.objects.filter(report__in=report_objects).update(
+            is_deleted=True
+        )
         CaseStep.objects.filter(case__in=case_objects).update(
             is_deleted=True,
             updater=instance.updater,
@@ -151,6 +154,13 @@ class Config(BaseTable):
     class Meta:
         verbose_name = "环境信息"
         db_table = "config"
+        indexes = [
+            # 配置列表按项目过滤，按更新时间倒序
+            models.Index(
+                fields=["project", "is_deleted", "update_time"],
+                name="config_project_update_time",
+            ),
+        ]
 
     name = models.CharField(verbose_name="环境名称", null=False, max_length=100)
     body = models.TextField(verbose_name="主体信息", null=False)
@@ -169,6 +179,20 @@ class API(BaseTable):
     class Meta:
         verbose_name = "接口信息"
         db_table = "api"
+        indexes = [
+            # 接口列表按(create_time, id)键集分页
+            models.Index(
+                fields=["project", "is_deleted", "create_time"],
+                name="api_project_create_time",
+            ),
+            # 接口列表按目录过滤
+            models.Index(
+                fields=["project", "is_deleted", "relation", "create_time"],
+                name="api_project_relation",
+            ),
+            # 看板每日统计按创建时间刷新
+            models.Index(fields=["is_deleted", "create_time"], name="api_create_time"),
+        ]
 
     ENV_TYPE = ((0, "测试环境"), (1, "生产环境"), (2, "预发布环境"))
     TAG = Choices(
@@ -204,6 +228,9 @@ class API(BaseTable):
     yapi_username = models.CharField(
         verbose_name="yapi的原作者", null=True, default="", max_length=30
     )
+    yapi_digest = models.CharField(
+        verbose_name="yapi接口摘要", null=True, default="", max_length=32
+    )
 
 
 class Case(BaseTable):
@@ -214,6 +241,20 @@ class Case(BaseTable):
     class Meta:
         verbose_name = "用例信息"
         db_table = "case"
+        indexes = [
+            # 用例列表按项目过滤，按创建时间倒序
+            models.Index(
+                fields=["project", "is_deleted", "create_time"],
+                name="case_project_create_time",
+            ),
+            # 用例列表按目录过滤
+            models.Index(
+                fields=["project", "is_deleted", "relation", "create_time"],
+                name="case_project_relation",
+            ),
+            # 看板每日统计按创建时间刷新
+            models.Index(fields=["is_deleted", "create_time"], name="case_create_time"),
+        ]
 
     tag = (
         (1, "冒烟用例"),
@@ -272,6 +313,14 @@ class CaseStep(BaseTable):
     class Meta:
         verbose_name = "用例信息 Step"
         db_table = "case_step"
+        indexes = [
+            # 按顺序加载用例的步骤
+            models.Index(
+                fields=["case", "is_deleted", "step"], name="case_step_case_step"
+            ),
+            # 查询引用接口的用例步骤
+            models.Index(fields=["source_api_id"], name="case_step_source_api"),
+        ]
 
     name = models.CharField(verbose_name="用例名称", null=False, max_length=100)
     body = models.TextField(verbose_name="主体信息", null=False)
@@ -282,6 +331,32 @@ class CaseStep(BaseTable):
     source_api_id = models.IntegerField(verbose_name="api来源", null=False)
 
 
+class CaseSyncJob(BaseTable):
+    """接口同步到用例步骤的任务，按步骤id分批同步，记录同步进度"""
+
+    job_status = (
+        (0, "等待"),
+        (1, "同步中"),
+        (2, "成功"),
+        (3, "失败"),
+    )
+
+    class Meta:
+        verbose_name = "用例步骤同步任务"
+        db_table = "case_sync_job"
+
+    project = models.ForeignKey(
+        to=Project, on_delete=models.CASCADE, db_constraint=False
+    )
+    api_ids = jsonfield.JSONField(verbose_name="同步的接口id", default=list)
+    status = models.IntegerField(verbose_name="任务状态", choices=job_status, default=0)
+    total = models.IntegerField(verbose_name="需要同步的步骤数", default=0)
+    done = models.IntegerField(verbose_name="已同步的步骤数", default=0)
+    # 已同步的最大步骤id，任务中断后从这里继续
+    last_step_id = models.IntegerField(verbose_name="已同步的步骤id", default=0)
+    message = models.TextField(verbose_name="失败原因", default="", blank=True)
+
+
 class Variables(BaseTable):
     """
     全局变量
@@ -339,6 +414,21 @@ class Report(BaseTable):
     class Meta:
         verbose_name = "测试报告"
         db_table = "report"
+        indexes = [
+            # 报告列表按(create_time, id)键集分页
+            models.Index(
+                fields=["project", "is_deleted", "create_time"],
+                name="report_project_create_time",
+            ),
+            # 看板每日统计刷新、过期报告归档按创建时间查询
+            models.Index(
+                fields=["is_deleted", "create_time"], name="report_create_time"
+            ),
+            # 清理软删除的报告按更新时间查询
+            models.Index(
+                fields=["is_deleted", "update_time"], name="report_update_time"
+            ),
+        ]
 
     name = models.CharField(
         verbose_name="报告名称",
@@ -375,6 +465,40 @@ class Report(BaseTable):
         db_index=True,
         max_length=15,
     )
+    # 以下统计字段在保存报告时从summary中提取，报告列表和筛选不再解析summary
+    tests_run = models.IntegerField(verbose_name="执行步骤数", default=0, db_index=True)
+    successes = models.IntegerField(verbose_name="成功步骤数", default=0)
+    failures = models.IntegerField(verbose_name="失败步骤数", default=0, db_index=True)
+    errors = models.IntegerField(verbose_name="错误步骤数", default=0, db_index=True)
+    skipped = models.IntegerField(verbose_name="跳过步骤数", default=0)
+    case_count = models.IntegerField(verbose_name="用例数", null=True, default=None)
+    case_fail_rate = models.FloatField(
+        verbose_name="用例失败率(%)",
+        null=True,
+        default=None,
+        db_index=True,
+    )
+    duration = models.FloatField(verbose_name="执行耗时(秒)", default=0, db_index=True)
+    start_at = models.FloatField(
+        verbose_name="开始执行时间戳",
+        null=True,
+        default=None,
+        db_index=True,
+    )
+    platform = jsonfield.JSONField(verbose_name="运行平台", default=dict)
+    failure_cases = jsonfield.JSONField(
+        verbose_name="失败用例和配置",
+        null=True,
+        default=None,
+    )
+    # 超过保留天数后详情压缩归档到存储中，数据库中不再保留详情
+    archived = models.BooleanField(verbose_name="详情是否已归档", default=False, db_index=True)
+    archive_key = models.CharField(
+        verbose_name="归档文件路径",
+        null=True,
+        default=None,
+        max_length=255,
+    )
 
     @property
     def ci_job_url(self):
@@ -388,6 +512,7 @@ def delete_related_report_detail(sender, instance, **kwargs):
     当一个 Report 对象被删除时，删除所有与其相关的 ReportDetail 对象。
     """
     ReportDetail.objects.filter(report=instance).update(is_deleted=True)
+    ReportDetailChunk.objects.filter(report=instance).update(is_deleted=True)
 
 
 class ReportDetail(models.Model):
@@ -409,12 +534,67 @@ class ReportDetail(models.Model):
     objects = SoftDeleteManager()
 
 
+class ReportDetailChunk(models.Model):
+    """报告详情分片，用例执行过程中每完成一条用例写入一片"""
+
+    class Meta:
+        verbose_name = "测试报告详情分片"
+        db_table = "report_detail_chunk"
+        unique_together = ("report", "seq")
+
+    report = models.ForeignKey(
+        to=Report,
+        on_delete=models.CASCADE,
+        db_constraint=False,
+        related_name="detail_chunks",
+    )
+    seq = models.IntegerField(verbose_name="分片序号")
+    summary_detail = models.TextField(verbose_name="用例详细信息")
+    is_deleted = models.BooleanField(verbose_name="是否删除", default=False)
+
+    objects = SoftDeleteManager()
+
+
+class DailyStat(models.Model):
+    """看板每日统计，按项目、数据类型、创建人、日期预聚合，由定时任务刷新"""
+
+    stat_model = (
+        ("api", "接口"),
+        ("case", "用例"),
+        ("report", "报告"),
+    )
+
+    class Meta:
+        verbose_name = "看板每日统计"
+        db_table = "daily_stat"
+        indexes = [
+            models.Index(fields=["model", "day"], name="daily_stat_model_day"),
+            models.Index(
+                fields=["project_id", "model", "day"], name="daily_stat_project_day"
+            ),
+        ]
+
+    project_id = models.IntegerField(verbose_name="项目id")
+    model = models.CharField(verbose_name="数据类型", choices=stat_model, max_length=10)
+    creator_id = models.IntegerField(verbose_name="创建人id", null=True)
+    # 冗余创建人名称，查询时不再关联用户表
+    creator_name = models.CharField(verbose_name="创建人名称", null=True, max_length=40)
+    # 报告为报告类型，其他为0
+    category = models.IntegerField(verbose_name="分类", default=0)
+    day = models.DateField(verbose_name="日期")
+    counts = models.IntegerField(verbose_name="创建数量", default=0)
+    success_counts = models.IntegerField(verbose_name="成功数量", default=0)
+
+
 class Relation(models.Model):
     """树形结构关系"""
 
     class Meta:
         verbose_name = "树形结构关系"
         db_table = "relation"
+        indexes = [
+            models.Index(fields=["project", "type"], name="relation_project_type"),
+        ]
 
     tree = models.TextField(verbose_name="结构主体", null=False, default=[])
     type = models.IntegerField(verbose_name="树类型", default=1)
@@ -438,6 +618,10 @@ class Visit(models.Model):
 
     class Meta:
         db_table = "visit"
+        indexes = [
+            # 按项目统计最近的访问记录
+            models.Index(fields=["project", "create_time"], name="visit_project_create_time"),
+        ]
 
     user = models.CharField(
         verbose_name="访问url的用户名", max_length=100, db_index=True
@@ -594,3 +778,9 @@ class LoginLog(BaseTable):
         verbose_name = "登录日志"
         verbose_name_plural = verbose_name
         ordering = ("-create_time",)
+        indexes = [
+            # 登录日志按(create_time, id)键集分页
+            models.Index(
+                fields=["is_deleted", "create_time"], name="login_log_create_time"
+            ),
+        ]
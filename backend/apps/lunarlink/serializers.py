@@ -345,17 +345,36 @@ class ReportSerializer(serializers.ModelSerializer):
             "ci_job_url",
         ]
 
+    # 以下字段从报告的统计字段中读取，不解析summary
+
     def get_time(self, obj):
-        return json.loads(obj.summary)["time"]
+        return {"start_at": obj.start_at, "duration": obj.duration}
 
     def get_stat(self, obj):
-        return json.loads(obj.summary)["stat"]
+        stat = {
+            "testsRun": obj.tests_run,
+            "successes": obj.successes,
+            "failures": obj.failures,
+            "errors": obj.errors,
+            "skipped": obj.skipped,
+        }
+        if obj.case_count is not None:
+            # 批量运行用例时才有用例级别的统计
+            stat.update(
+                {
+                    "case_count": obj.case_count,
+                    "case_fail_rate": f"{obj.case_fail_rate or 0:.2f}%",
+                    "failure_case_config_mapping_list": obj.failure_cases or [],
+                    "project": obj.project_id,
+                }
+            )
+        return stat
 
     def get_platform(self, obj):
-        return json.loads(obj.summary)["platform"]
+        return obj.platform
 
     def get_success(self, obj):
-        return json.loads(obj.summary)["success"]
+        return obj.status
 
 
 def get_cron_next_execute_time(crontab_expr: str) -> int:
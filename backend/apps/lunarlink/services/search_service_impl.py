@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+@File    : search_service_impl.py
+@Time    : 2026/10/19 17:45
+@Author  : geekbing
+@LastEditTime : -
+@LastEditors : -
+@Description : 接口、用例步骤的名称和url搜索
+"""
+import re
+from typing import List
+
+from django.conf import settings
+from django.db.models import Q, QuerySet
+
+from lunarlink.models import CaseStep
+
+# 关键字中可以被ngram分词的片段，标点和空白不参与全文索引匹配
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class SearchService:
+    """
+    名称和url搜索
+
+    先用(name, url)上的ngram全文索引缩小范围，再用LIKE精确匹配，结果与只用LIKE一致
+    """
+
+    def _get_against(self, keyword: str) -> str:
+        """
+        全文索引的布尔模式查询，关键字中每个片段都要作为短语出现
+
+        :param keyword:
+        :return: 没有可以使用全文索引的片段时返回空字符串
+        """
+        setting = settings.FULLTEXT_SEARCH_SETTING
+        if not setting["enabled"]:
+            return ""
+
+        segments = [
+            segment
+            for segment in WORD_PATTERN.findall(keyword)
+            if len(segment) >= setting["ngram_token_size"]
+        ]
+        return " ".join(f'+"{segment}"' for segment in segments)
+
+    def filter_keyword(self, queryset: QuerySet, keyword: str) -> QuerySet:
+        """
+        过滤名称或url包含关键字的数据
+
+        :param queryset: API或CaseStep的查询集
+        :param keyword: 关键字
+        :return:
+        """
+        against = self._get_against(keyword)
+        if against:
+            table = queryset.model._meta.db_table
+            queryset = queryset.extra(
+                where=[
+                    f"MATCH(`{table}`.`name`, `{table}`.`url`) AGAINST (%s IN BOOLEAN MODE)"
+                ],
+                params=[against],
+            )
+        return queryset.filter(Q(name__contains=keyword) | Q(url__contains=keyword))
+
+    def search_api(self, queryset: QuerySet, keywords: List[str]) -> QuerySet:
+        """
+        搜索名称或url包含所有关键字的接口
+
+        :param queryset: 已按项目过滤的接口查询集
+        :param keywords: 关键字列表
+        :return:
+        """
+        for keyword in keywords:
+            queryset = self.filter_keyword(queryset, keyword)
+        return queryset
+
+    def search_case_ids(self, project_id: int, keyword: str) -> QuerySet:
+        """
+        搜索项目中名称或url包含关键字的用例步骤，返回用例id
+
+        :param project_id: 项目id
+        :param keyword: 关键字
+        :return: 用例id的子查询
+        """
+        queryset = CaseStep.objects.filter(case__project_id=project_id)
+        return (
+            self.filter_keyword(queryset, keyword)
+            .values_list("case_id", flat=True)
+            .distinct()
+        )
+
+
+search_service = SearchService()
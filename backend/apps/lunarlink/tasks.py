@@ -9,24 +9,37 @@
 """
 
 import logging
+import smtplib
 from ast import literal_eval
 from enum import IntEnum
 
 from celery import shared_task, Task
+from django.conf import settings
 from django_bulk_update.helper import bulk_update
 from django_celery_beat.models import PeriodicTask
 from django.db.models import F
 from django.core.exceptions import ObjectDoesNotExist
 from lunarlink import models
-from lunarlink.utils.loader import save_summary, debug_api, debug_suite
+from lunarlink.utils.loader import save_summary, debug_api, debug_suite, SuiteCache
 from lunarlink.utils.parser import Yapi
-from lunarlink.utils import qy_message, email_helper
+from lunarlink.utils.report_archive import archive_expired_reports, purge_deleted_reports
+from lunarlink.utils.report_sink import ReportSink
+from lunarlink.utils import case_sync, daily_stat, qy_message, email_helper
 from lunarlink.utils import response
+from lunarlink.utils.message_template import (
+    message_summary,
+    parse_message,
+    qy_msg_template,
+)
+from apps.exceptions.error import NotifyRetryableError
 
 
 logger = logging.getLogger(__name__)
 
 
+NOTIFY_QUEUE = "notify_tasks"
+
+
 class ReportType(IntEnum):
     DEPLOY = 4
     TIMING = 3
@@ -55,6 +68,10 @@ class MyBaseTask(Task):
         update_task_total_run_count(kwargs.get("task_id"))
 
 
+# yapi导入更新的接口字段
+YAPI_UPDATE_FIELDS = ["method", "name", "url", "body", "yapi_up_time", "yapi_digest"]
+
+
 @shared_task
 def async_import_yapi_api(yapi_base_url, yapi_token, project_id):
     """异步导入yapi接口"""
@@ -63,14 +80,20 @@ def async_import_yapi_api(yapi_base_url, yapi_token, project_id):
         token=yapi_token,
         faster_project_id=project_id,
     )
-    apis_imported_from_yapi = models.API.objects.filter(
-        project_id=project_id,
-        creator__name="yapi",
-    )
+    batch_size = settings.YAPI_IMPORT_SETTING["batch_size"]
+    # 只用于判断是否需要更新，不加载请求报文
+    imported_apis = {
+        api.yapi_id: api
+        for api in models.API.objects.filter(
+            project_id=project_id,
+            creator__name="yapi",
+        ).only("id", "yapi_id", "yapi_up_time", "yapi_digest")
+    }
     imported_apis_mapping = {
-        api.yapi_id: api.yapi_up_time for api in apis_imported_from_yapi
+        yapi_id: (api.yapi_up_time, api.yapi_digest)
+        for yapi_id, api in imported_apis.items()
     }
-    create_ids, update_ids = yapi.get_create_or_update_apis(
+    create_ids, update_ids, backfill_digests = yapi.get_create_or_update_apis(
         imported_apis_mapping=imported_apis_mapping
     )
     try:
@@ -80,32 +103,56 @@ def async_import_yapi_api(yapi_base_url, yapi_token, project_id):
         logger.error(f"导入yapi失败：{e}")
         return {"status": "error", "message": response.YAPI_ADD_FAILED}
 
+    # 没有变化的接口补充摘要，下次导入时按摘要判断
+    backfill_apis = []
+    for yapi_id, yapi_digest in backfill_digests.items():
+        imported_apis[yapi_id].yapi_digest = yapi_digest
+        backfill_apis.append(imported_apis[yapi_id])
+    bulk_update(backfill_apis, update_fields=["yapi_digest"], batch_size=batch_size)
+
     # 通过id获取所有api的详情
     create_ids.extend(update_ids)
     if not create_ids:
         return {"status": "error", "message": response.YAPI_NOT_NEED_CREATE_OR_UPDATE}
 
-    new_api_instances = []
-    update_api_instances = []
-    for api_detail in yapi.get_batch_api_detail(api_ids=create_ids):
+    created_apis_count = 0
+    updated_api_ids = []
+
+    def save_apis(api_details):
+        nonlocal created_apis_count
         # 把yapi解析成符合faster的api格式
-        api_instances = yapi.get_parsed_apis(api_info=[api_detail])
-        updated_api, new_api = yapi.merge_api(
+        api_instances = yapi.get_parsed_apis(api_info=api_details)
+        update_api_instances, new_api_instances = yapi.merge_api(
             api_instances=api_instances,
-            apis_imported_from_yapi=apis_imported_from_yapi,
+            imported_apis=imported_apis,
         )
-        new_api_instances.extend(new_api)
-        update_api_instances.extend(updated_api)
+        created_objs = models.API.objects.bulk_create(
+            objs=new_api_instances, batch_size=batch_size
+        )
+        bulk_update(
+            update_api_instances,
+            update_fields=YAPI_UPDATE_FIELDS,
+            batch_size=batch_size,
+        )
+        created_apis_count += len(created_objs)
+        updated_api_ids.extend(api.id for api in update_api_instances)
 
-    created_objs = models.API.objects.bulk_create(objs=new_api_instances)
-    bulk_update(update_api_instances)
+    # 按批解析和写入，不在内存中保留所有接口的详情
+    api_details = []
+    for api_detail in yapi.get_batch_api_detail(api_ids=create_ids):
+        api_details.append(api_detail)
+        if len(api_details) >= batch_size:
+            save_apis(api_details)
+            api_details = []
+    if api_details:
+        save_apis(api_details)
 
-    created_apis_count = len(created_objs)
-    updated_apis_count = len(update_api_instances)
     return {
         "status": "success",
         "created_apis_count": created_apis_count,
-        "updated_apis_count": updated_apis_count,
+        "updated_apis_count": len(updated_api_ids),
+        # 可以通过批量同步接口把更新的接口同步到用例步骤
+        "updated_api_ids": updated_api_ids,
     }
 
 
@@ -143,20 +190,23 @@ def async_debug_api(api, project, name, config=None, user=None):
 @shared_task
 def async_debug_suite(suite, project, obj, report, config, user=None):
     """异步执行suite"""
-    summary, _ = debug_suite(
-        suite=suite,
-        project=project,
-        obj=obj,
-        config=config,
-        save=False,
-        user=user,
-    )
-    report_id = save_summary(
-        name=report,
-        summary=summary,
-        project=project,
-        user=user,
-    )
+    report_sink = ReportSink(name=report, project=project, user=user)
+    report_sink.open()
+    try:
+        summary, _ = debug_suite(
+            suite=suite,
+            project=project,
+            obj=obj,
+            config=config,
+            save=False,
+            user=user,
+            report_sink=report_sink,
+        )
+    except Exception as e:
+        # 执行前已经创建了报告，运行异常时标记报告失败
+        report_sink.fail(str(e))
+        raise
+    report_id = report_sink.finalize(summary)
 
     return {
         "status": "success",
@@ -208,6 +258,8 @@ def build_test_sets(suite, project, override_config_body):
     """
     test_sets = []
     config_list = []
+    # 同名配置只查询一次
+    cache = SuiteCache(project)
     for content in suite:
         test_list = (
             models.CaseStep.objects.filter(case__id=content["id"])
@@ -224,11 +276,7 @@ def build_test_sets(suite, project, override_config_body):
                     config = override_config_body
                     continue
                 try:
-                    config = literal_eval(
-                        models.Config.objects.get(
-                            name=body["name"], project__id=project
-                        ).body
-                    )
+                    config = cache.get_config_body(body["name"])
                 except ObjectDoesNotExist:
                     logger.error(response.CONFIG_NOT_EXISTS["msg"])
                 continue
@@ -239,7 +287,9 @@ def build_test_sets(suite, project, override_config_body):
     return test_sets, config_list
 
 
-def execute_test_suite(test_sets, project, suite, config_list, is_parallel):
+def execute_test_suite(
+    test_sets, project, suite, config_list, is_parallel, report_sink=None
+):
     """
     执行测试套件
 
@@ -248,6 +298,7 @@ def execute_test_suite(test_sets, project, suite, config_list, is_parallel):
     :param suite:
     :param config_list:
     :param is_parallel:
+    :param report_sink:
     :return:
     """
     return debug_suite(
@@ -257,6 +308,7 @@ def execute_test_suite(test_sets, project, suite, config_list, is_parallel):
         config=config_list,
         allow_parallel=is_parallel,
         save=False,
+        report_sink=report_sink,
     )
 
 
@@ -277,24 +329,69 @@ def prepare_report_details(kwargs):
     return task_name, report_type
 
 
-def save_schedule_summary(task_name, summary, project, report_type):
+@shared_task(
+    queue=NOTIFY_QUEUE,
+    autoretry_for=(NotifyRetryableError,),
+    retry_backoff=True,
+    retry_kwargs={"max_retries": getattr(settings, "NOTIFY_MAX_RETRIES", 3)},
+)
+def async_send_qy_message(summary, webhook, **kwargs):
     """
-    保存测试报告
+    异步发送企业微信消息, 每个webhook一个任务, 网络异常、5xx和限流时单独重试
 
-    :param task_name:
-    :param summary:
-    :param project:
-    :param report_type:
+    :param summary: 消息摘要
+    :param webhook: 单个机器人地址
+    :param kwargs:
     :return:
     """
-    return save_summary(
-        name=task_name,
+    parsed_data = parse_message(summary=summary, **kwargs)
+    message = qy_msg_template(**parsed_data)
+    qy_message.post_webhook(webhook=webhook, message=message)
+
+
+@shared_task(
+    queue=NOTIFY_QUEUE,
+    autoretry_for=(smtplib.SMTPException, OSError),
+    retry_backoff=True,
+    retry_kwargs={"max_retries": getattr(settings, "NOTIFY_MAX_RETRIES", 3)},
+)
+def async_send_email(summary, email_recipient, email_cc, **kwargs):
+    """
+    异步发送邮件
+
+    :param summary: 消息摘要
+    :param email_recipient:
+    :param email_cc:
+    :param kwargs:
+    :return:
+    """
+    email_helper.send(
         summary=summary,
-        project=project,
-        report_type=report_type,
+        email_recipient=email_recipient,
+        email_cc=email_cc,
+        **kwargs,
     )
 
 
+def dispatch_qy_messages(summary, webhooks, **kwargs):
+    """
+    将企业微信消息投递到通知队列, 不阻塞用例执行
+
+    :param summary: 测试报告摘要
+    :param webhooks: 机器人地址, 可迭代对象或换行分隔的字符串
+    :param kwargs:
+    :return:
+    """
+    if isinstance(webhooks, str):
+        webhooks = [webhooks]
+    urls = []
+    for webhook in webhooks:
+        urls.extend(qy_message.split_webhooks(webhook))
+    notify_summary = message_summary(summary)
+    for url in dict.fromkeys(urls):
+        async_send_qy_message.delay(summary=notify_summary, webhook=url, **kwargs)
+
+
 def send_notifications(args, kwargs, summary, task_name, report_id):
     """
     发送通知
@@ -315,14 +412,14 @@ def send_notifications(args, kwargs, summary, task_name, report_id):
         email_recipient = kwargs.get("receiver", "")
         email_cc = kwargs.get("mail_cc", "")
         if webhook:
-            qy_message.send_message(
+            dispatch_qy_messages(
                 summary=summary,
-                webhook=webhook,
+                webhooks=webhook,
                 case_count=len(args),
             )
         if email_recipient:
-            email_helper.send(
-                summary=summary,
+            async_send_email.delay(
+                summary=message_summary(summary),
                 email_recipient=email_recipient,
                 email_cc=email_cc,
                 case_count=len(args),
@@ -341,23 +438,30 @@ def schedule_debug_suite(*args, **kwargs):
         override_config_body=override_config_body,
     )
 
-    is_parallel = kwargs.get("is_parallel", False)
-    summary, _ = execute_test_suite(
-        test_sets=test_sets,
-        project=project,
-        suite=suite,
-        config_list=config_list,
-        is_parallel=is_parallel,
-    )
-
     task_name, report_type = prepare_report_details(kwargs)
-
-    report_id = save_schedule_summary(
-        task_name=task_name,
-        summary=summary,
+    report_sink = ReportSink(
+        name=task_name,
         project=project,
         report_type=report_type,
     )
+    report_sink.open()
+
+    is_parallel = kwargs.get("is_parallel", False)
+    try:
+        summary, _ = execute_test_suite(
+            test_sets=test_sets,
+            project=project,
+            suite=suite,
+            config_list=config_list,
+            is_parallel=is_parallel,
+            report_sink=report_sink,
+        )
+    except Exception as e:
+        # 执行前已经创建了报告，运行异常时标记报告失败
+        report_sink.fail(str(e))
+        raise
+
+    report_id = report_sink.finalize(summary)
 
     send_notifications(
         args,
@@ -371,3 +475,35 @@ def schedule_debug_suite(*args, **kwargs):
         "status": "success",
         "report_id": report_id,
     }
+
+
+@shared_task
+def report_retention():
+    """报告保留策略，归档过期的报告详情并彻底删除过期的软删除报告"""
+    archive_expired_reports()
+    purge_deleted_reports()
+
+
+@shared_task
+def refresh_daily_stats(full=False):
+    """刷新看板每日统计"""
+    days = None
+    if full:
+        days = settings.DASHBOARD_STAT_SETTING["full_refresh_days"]
+    daily_stat.refresh_daily_stats(days)
+
+
+@shared_task(bind=True)
+def async_sync_case(self, job_id):
+    """异步同步接口到用例步骤，任务中断重新投递后从已同步的位置继续"""
+    # acks_late的任务在worker中断后重新投递，此时任务仍是同步中，由重新投递的任务直接接管
+    delivery_info = self.request.delivery_info or {}
+    case_sync.run_sync_job(job_id, takeover=bool(delivery_info.get("redelivered")))
+
+
+@shared_task
+def resume_stale_sync_jobs():
+    """重新投递已中断的用例步骤同步任务，兜底处理没有重新投递的消息"""
+    for job_id in case_sync.get_stale_job_ids():
+        logger.info(f"用例步骤同步任务{job_id}已中断，重新投递")
+        async_sync_case.delay(job_id)
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+@File    : test_body.py
+@Time    : 2026/10/19 22:10
+@Author  : geekbing
+@LastEditTime : -
+@LastEditors : -
+@Description : 响应体存储的内存预算
+"""
+from django.test import SimpleTestCase
+
+from httprunner.body import BodyStore, materialize
+
+
+class BodyStoreTest(SimpleTestCase):
+    def test_release_gives_back_memory(self):
+        store = BodyStore(memory_budget=10)
+        body = store.create(b"12345678")
+        self.assertFalse(body.spilled)
+        self.assertEqual(store.memory_used, 8)
+
+        body.release()
+        self.assertEqual(store.memory_used, 0)
+        # 释放后预算可以重复使用，不会落盘
+        self.assertFalse(store.create(b"12345678").spilled)
+        store.close()
+
+    def test_spilled_body_not_counted(self):
+        store = BodyStore(memory_budget=10)
+        kept = store.create(b"12345678")
+        spilled = store.create(b"12345678")
+        self.assertTrue(spilled.spilled)
+        self.assertEqual(spilled.text, "12345678")
+
+        spilled.release()
+        self.assertEqual(store.memory_used, 8)
+        kept.release()
+        kept.release()
+        self.assertEqual(store.memory_used, 0)
+        store.close()
+
+    def test_materialize_releases_body(self):
+        store = BodyStore(memory_budget=100)
+        response_meta = {"body": store.create(b'{"a": 1}', "utf-8")}
+        materialize(response_meta)
+        self.assertEqual(response_meta["json"], {"a": 1})
+        self.assertEqual(store.memory_used, 0)
+        store.close()
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+@File    : test_case_sync.py
+@Time    : 2026/10/19 23:20
+@Author  : geekbing
+@LastEditTime : -
+@LastEditors : -
+@Description : 用例步骤同步任务的抢占和接管
+"""
+import datetime
+
+from django.test import TestCase
+from django.utils import timezone
+
+from lunarlink import models
+from lunarlink.utils import case_sync
+from lunarlink.utils.case_sync import SyncStatus
+
+
+class ClaimSyncJobTest(TestCase):
+    def create_job(self, status, seconds_ago=0):
+        job = models.CaseSyncJob.objects.create(project_id=1, api_ids=[1])
+        models.CaseSyncJob.objects.filter(id=job.id).update(
+            status=status,
+            update_time=timezone.now() - datetime.timedelta(seconds=seconds_ago),
+        )
+        return job.id
+
+    def test_claim_pending_job_once(self):
+        job_id = self.create_job(SyncStatus.PENDING)
+        self.assertTrue(case_sync.claim_sync_job(job_id))
+        self.assertFalse(case_sync.claim_sync_job(job_id))
+
+    def test_redelivered_task_takes_over_running_job(self):
+        job_id = self.create_job(SyncStatus.RUNNING)
+        self.assertFalse(case_sync.claim_sync_job(job_id))
+        self.assertTrue(case_sync.claim_sync_job(job_id, takeover=True))
+
+    def test_stale_running_job(self):
+        running_id = self.create_job(SyncStatus.RUNNING)
+        stale_id = self.create_job(
+            SyncStatus.RUNNING, seconds_ago=case_sync.SYNC_STALE_SECONDS + 60
+        )
+        self.create_job(
+            SyncStatus.SUCCESS, seconds_ago=case_sync.SYNC_STALE_SECONDS + 60
+        )
+
+        self.assertEqual(case_sync.get_stale_job_ids(), [stale_id])
+        self.assertTrue(case_sync.claim_sync_job(stale_id))
+        self.assertFalse(case_sync.claim_sync_job(running_id))
+        self.assertEqual(case_sync.get_stale_job_ids(), [])
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+@File    : test_csv_parameters.py
+@Time    : 2026/10/19 22:40
+@Author  : geekbing
+@LastEditTime : -
+@LastEditors : -
+@Description : csv参数化按需读取、按行拆分
+"""
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from httprunner import parser
+from httprunner.loader import CSVParameters, load_csv_parameters
+from lunarlink.utils.loader import split_test_set
+
+CSV_CONTENT = (
+    "username,password,desc\n"
+    "user1,111111,first\n"
+    '"user2",222222,"multi\nline"\n'
+    "\n"
+    "user3,333333,third\n"
+    "user4,444444,fourth\n"
+    "user5,555555,fifth\n"
+)
+
+
+class CSVParametersTest(SimpleTestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.csv_file = os.path.join(self.tmp_dir, "account.csv")
+        with open(self.csv_file, "w", encoding="utf-8", newline="") as f:
+            f.write(CSV_CONTENT)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_iter_and_getitem_by_offset(self):
+        source = load_csv_parameters(self.csv_file)
+        rows = list(source)
+        self.assertEqual(len(source), 5)
+        self.assertEqual(
+            rows[1], {"username": "user2", "password": "222222", "desc": "multi\nline"}
+        )
+        # 按行偏移读取的结果和顺序读取一致，跨行字段和空行不影响偏移
+        self.assertEqual([source[index] for index in range(5)], rows)
+        self.assertEqual(source[-1]["username"], "user5")
+        with self.assertRaises(IndexError):
+            source[5]
+
+    def test_select_keys(self):
+        source = load_csv_parameters(self.csv_file)
+        selected = source.select(["username", "password"])
+        self.assertEqual(selected[0], {"username": "user1", "password": "111111"})
+        self.assertEqual(len(selected), 5)
+        self.assertNotIn("desc", list(selected)[2])
+
+    def test_inner_parameter_of_cartesian_product(self):
+        source = load_csv_parameters(self.csv_file).select(["username"])
+        mappings = list(
+            parser.iter_parameters([[{"app": "ios"}, {"app": "android"}], source])
+        )
+        # csv作为内层参数，每个外层取值都重新读取一遍
+        self.assertEqual(len(mappings), 10)
+        self.assertEqual(mappings[0], {"app": "ios", "username": "user1"})
+        self.assertEqual(mappings[5], {"app": "android", "username": "user1"})
+        self.assertEqual(mappings[9], {"app": "android", "username": "user5"})
+
+    def test_chunks_share_offsets(self):
+        source = CSVParameters(self.csv_file)
+        chunks = list(source.chunks(2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        self.assertEqual(
+            [row["username"] for chunk in chunks for row in chunk],
+            [row["username"] for row in source],
+        )
+        self.assertEqual(chunks[1][0]["username"], "user3")
+        self.assertIs(chunks[1].select(["username"])._offsets, source._offsets)
+        with self.assertRaises(IndexError):
+            chunks[2][1]
+
+    def test_split_test_set(self):
+        test_set = {
+            "config": {
+                "name": "csv",
+                "parameters": [
+                    {"username-password": f"${{P({self.csv_file})}}"},
+                    {"app": ["ios", "android"]},
+                ],
+                "refs": {"debugtalk": {"variables": {}, "functions": {}}},
+            },
+            "teststeps": [],
+        }
+        test_sets = split_test_set(test_set, 2)
+        self.assertEqual(len(test_sets), 3)
+
+        def iter_mappings(parameters):
+            return parser.iter_parameters(parser.load_parameters(parameters, {}, {}))
+
+        # 各份的参数组合按顺序拼接后和拆分前一致
+        self.assertEqual(
+            [
+                mapping
+                for chunk in test_sets
+                for mapping in iter_mappings(chunk["config"]["parameters"])
+            ],
+            list(iter_mappings(test_set["config"]["parameters"])),
+        )
+        self.assertEqual(len(split_test_set(test_set, 5)), 1)
+
+        test_set["config"]["parameters_mode"] = "pairwise"
+        self.assertEqual(split_test_set(test_set, 2), [test_set])
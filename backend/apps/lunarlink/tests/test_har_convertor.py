@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+@File    : test_har_convertor.py
+@Time    : 2026/10/19 23:40
+@Author  : geekbing
+@LastEditTime : -
+@LastEditors : -
+@Description : har文件流式解析
+"""
+import io
+import json
+
+from django.test import SimpleTestCase
+
+from apps.exceptions.convert import HarConvertError
+from lunarlink.utils.request.har_convertor import Convertor, HarReader
+
+
+def make_entry(index, **response):
+    return {
+        "request": {"method": "GET", "url": f"https://example.com/api/{index}"},
+        "response": {"status": 200, **response},
+    }
+
+
+def make_har(entries, **log):
+    return json.dumps(
+        {
+            "log": {
+                "version": "1.2",
+                "pages": [{"id": "page_1", "title": "中文标题"}],
+                **log,
+                "entries": entries,
+            }
+        },
+        ensure_ascii=False,
+    ).encode("utf-8")
+
+
+class HarReaderTest(SimpleTestCase):
+    def read(self, content, read_size):
+        return list(HarReader(io.BytesIO(content), read_size=read_size))
+
+    def test_entries_span_read_boundaries(self):
+        entries = [
+            make_entry(index, content={"text": "响应" * index}) for index in range(20)
+        ]
+        content = make_har(entries)
+        # 每次读取的字节数小于单个entry，多字节字符也会被截断
+        for read_size in (1, 3, 7, 64):
+            self.assertEqual(self.read(content, read_size), entries)
+
+    def test_number_cut_at_buffer_edge(self):
+        content = b'{"log": {"entries": [12345678, 3.25e10]}}'
+        # 数字跨越缓冲区边界时不能只解码前半部分
+        for read_size in range(1, len(content)):
+            self.assertEqual(self.read(content, read_size), [12345678, 3.25e10])
+
+    def test_number_at_end_of_file(self):
+        content = b'{"log": {"entries": [1]}, "size": 1234'
+        with self.assertRaises(HarConvertError):
+            self.read(content, 3)
+
+    def test_utf8_bom(self):
+        entries = [make_entry(1)]
+        self.assertEqual(self.read(b"\xef\xbb\xbf" + make_har(entries), 2), entries)
+
+    def test_truncated_file(self):
+        content = make_har([make_entry(1), make_entry(2)])
+        for end in (0, 10, len(content) // 2, len(content) - 1):
+            with self.assertRaises(HarConvertError):
+                self.read(content[:end], 16)
+
+    def test_malformed_file(self):
+        for content in (
+            b'{"log": {"entries": [{"request": }]}}',
+            b'{"log": {"entries": [1 2]}}',
+            b'{"log" {"entries": []}}',
+            b'{1: 2}',
+            b'["log"]',
+            b'{"log": {"entries": ["\xff\xfe"]}}',
+        ):
+            with self.assertRaises(HarConvertError, msg=content):
+                self.read(content, 4)
+
+    def test_convert_skips_static_entries(self):
+        entries = [
+            make_entry(1, content={"mimeType": "application/json", "text": "{}"}),
+            {"request": {"url": "https://example.com/app.js"}, "response": {}},
+            make_entry(2),
+        ]
+        requests = list(Convertor.convert(io.BytesIO(make_har(entries)), regex="api"))
+        self.assertEqual(
+            [request.url for request in requests],
+            ["https://example.com/api/1", "https://example.com/api/2"],
+        )
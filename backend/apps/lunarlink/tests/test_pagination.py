@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+@File    : test_pagination.py
+@Time    : 2026/10/19 23:00
+@Author  : geekbing
+@LastEditTime : -
+@LastEditors : -
+@Description : 键集分页
+"""
+import datetime
+from urllib.parse import parse_qs, urlparse
+
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from backend.utils.pagination import MyKeysetPagination
+from lunarlink.models import LoginLog
+
+
+class MyKeysetPaginationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        base_time = datetime.datetime(2026, 10, 1, 8, 0, 0)
+        # 每两条数据的创建时间相同，按id区分先后
+        for index in range(7):
+            log = LoginLog.objects.create(name=f"user{index}")
+            LoginLog.objects.filter(id=log.id).update(
+                create_time=base_time + datetime.timedelta(minutes=index // 2)
+            )
+        cls.expected_ids = list(
+            LoginLog.objects.order_by("-create_time", "-id").values_list(
+                "id", flat=True
+            )
+        )
+
+    def paginate(self, url):
+        request = Request(APIRequestFactory().get(url))
+        paginator = MyKeysetPagination()
+        results = paginator.paginate_queryset(
+            LoginLog.objects.order_by("-create_time"), request
+        )
+        return paginator, [log.id for log in results]
+
+    @staticmethod
+    def get_cursor(link):
+        return parse_qs(urlparse(link).query)["cursor"][0]
+
+    def test_cursor_forward_and_back(self):
+        paginator, ids = self.paginate("/logs?size=3")
+        self.assertEqual(ids, self.expected_ids[:3])
+        self.assertEqual(paginator.count, 7)
+        self.assertIsNone(paginator.get_previous_link())
+
+        cursor = self.get_cursor(paginator.get_next_link())
+        paginator, ids = self.paginate(f"/logs?size=3&count=false&cursor={cursor}")
+        self.assertEqual(ids, self.expected_ids[3:6])
+        self.assertIsNone(paginator.count)
+
+        cursor = self.get_cursor(paginator.get_next_link())
+        paginator, ids = self.paginate(f"/logs?size=3&cursor={cursor}")
+        self.assertEqual(ids, self.expected_ids[6:])
+        self.assertIsNone(paginator.get_next_link())
+
+        # 向前翻页回到第二页、第一页
+        cursor = self.get_cursor(paginator.get_previous_link())
+        paginator, ids = self.paginate(f"/logs?size=3&cursor={cursor}")
+        self.assertEqual(ids, self.expected_ids[3:6])
+
+        cursor = self.get_cursor(paginator.get_previous_link())
+        paginator, ids = self.paginate(f"/logs?size=3&cursor={cursor}")
+        self.assertEqual(ids, self.expected_ids[:3])
+        self.assertIsNone(paginator.get_previous_link())
+
+    def test_equal_sort_values_broken_by_id(self):
+        # 每页一条，创建时间相同的数据按id倒序，不重复也不遗漏
+        paginator, ids = self.paginate("/logs?size=1")
+        seen = list(ids)
+        while paginator.get_next_link():
+            cursor = self.get_cursor(paginator.get_next_link())
+            paginator, ids = self.paginate(f"/logs?size=1&cursor={cursor}")
+            seen.extend(ids)
+        self.assertEqual(seen, self.expected_ids)
+
+    def test_page_without_cursor(self):
+        paginator, ids = self.paginate("/logs?size=3&page=2")
+        self.assertEqual(ids, self.expected_ids[3:6])
+        self.assertIsNotNone(paginator.get_previous_link())
+        self.assertNotIn("page=", paginator.get_next_link())
+
+    def test_count_limit(self):
+        paginator = MyKeysetPagination()
+        paginator.count_limit = 5
+        request = Request(APIRequestFactory().get("/logs?count=limit"))
+        paginator.paginate_queryset(LoginLog.objects.order_by("-create_time"), request)
+        self.assertEqual(paginator.count, 5)
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+@File    : test_value_index.py
+@Time    : 2026/10/19 23:55
+@Author  : geekbing
+@LastEditTime : -
+@LastEditors : -
+@Description : 录制接口响应值的倒排索引和多模式串匹配
+"""
+from django.test import SimpleTestCase
+
+from lunarlink.utils.request.value_index import AhoCorasick, ValueIndex
+
+
+class AhoCorasickTest(SimpleTestCase):
+    def test_overlapping_and_nested_patterns(self):
+        matcher = AhoCorasick(["he", "she", "his", "hers"])
+        self.assertEqual(
+            sorted(matcher.iter("ushers")),
+            [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")],
+        )
+
+    def test_repeated_pattern(self):
+        matcher = AhoCorasick(["aa", "a"])
+        self.assertEqual(
+            sorted(matcher.iter("aaa")),
+            [(0, 1, "a"), (0, 2, "aa"), (1, 2, "a"), (1, 3, "aa"), (2, 3, "a")],
+        )
+
+    def test_no_patterns(self):
+        self.assertEqual(list(AhoCorasick([]).iter("text")), [])
+
+
+class ValueIndexTest(SimpleTestCase):
+    def setUp(self):
+        self.index = ValueIndex(substring_min_length=4, substring_max_length=16)
+        self.index.add("abcdefgh", "http_res_1_a::content.a")
+        self.index.add("abcdef", "http_res_1_b::content.b")
+        self.index.add("defghijk", "http_res_1_c::content.c")
+        self.index.request_index = 1
+
+    def test_prefers_earliest_then_longest_match(self):
+        replaced = []
+        text = self.index.replace_substrings("xabcdefghijk", set(), replaced)
+        # abcdef和abcdefgh都从位置1开始，取较长的abcdefgh，与其重叠的defghijk不替换
+        self.assertEqual(text, "x${http_res_1_a::content.a}ijk")
+        self.assertEqual(replaced, ["abcdefgh => ${http_res_1_a::content.a}"])
+
+    def test_only_earlier_requests_are_referenced(self):
+        self.index.add("zzzzyyyy", "http_res_2_z::content.z")
+        replaced = []
+        self.assertEqual(
+            self.index.replace_substrings("Bearer zzzzyyyy", set(), replaced),
+            "Bearer zzzzyyyy",
+        )
+
+        self.index.request_index = 2
+        self.assertEqual(
+            self.index.replace_substrings("Bearer zzzzyyyy", set(), replaced),
+            "Bearer ${http_res_2_z::content.z}",
+        )
+
+    def test_skips_own_response_values(self):
+        replaced = []
+        text = self.index.replace_substrings("id=abcdefgh", {"abcdefgh"}, replaced)
+        self.assertEqual(text, "id=${http_res_1_b::content.b}gh")
+
+    def test_value_length_limits(self):
+        self.index.add("abc", "http_res_1_short::content.short")
+        self.index.add("x" * 17, "http_res_1_long::content.long")
+        self.index.request_index = 2
+        replaced = []
+        text = "abc-" + "x" * 17
+        self.assertEqual(self.index.replace_substrings(text, set(), replaced), text)
+        self.assertEqual(replaced, [])
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+@File    : test_ws_push.py
+@Time    : 2026/10/20 00:10
+@Author  : geekbing
+@LastEditTime : -
+@LastEditors : -
+@Description : 同步环境中推送websocket消息的合并
+"""
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from backend.utils import ws_connection_manager
+
+
+class PushMessageTest(SimpleTestCase):
+    def setUp(self):
+        ws_connection_manager._last_push_time.clear()
+        ws_connection_manager._last_evict_time = 0.0
+
+    def test_coalesce_and_force(self):
+        push = ws_connection_manager.push_message
+        self.assertTrue(push(1, {"step": 1}, coalesce_key="report"))
+        self.assertFalse(push(1, {"step": 2}, coalesce_key="report"))
+        self.assertTrue(push(2, {"step": 1}, coalesce_key="report"))
+        self.assertTrue(push(1, {"step": 3}, coalesce_key="report", force=True))
+
+    def test_push_failure_does_not_raise(self):
+        with mock.patch.object(
+            ws_connection_manager, "_claim_push", side_effect=RuntimeError("boom")
+        ):
+            self.assertFalse(ws_connection_manager.push_message(1, "msg", "key"))
+
+    def test_concurrent_push(self):
+        errors = []
+
+        def push(thread_index):
+            try:
+                for index in range(200):
+                    ws_connection_manager._claim_push(thread_index, index, False)
+            except Exception as e:
+                errors.append(e)
+
+        # 合并时间窗口为0时每次推送都会清理记录，清理和写入在多个线程中交替进行
+        with mock.patch.dict(
+            ws_connection_manager.settings.WEBSOCKET_SETTING, {"flush_interval": 0}
+        ):
+            threads = [threading.Thread(target=push, args=(i,)) for i in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(errors, [])
@@ -83,6 +83,19 @@ urlpatterns = [
         "api/sync/<int:pk>",
         api.APITemplateView.as_view({"patch": "sync_case"}),  # api同步测试用例
     ),
+    path(
+        "api/sync",
+        api.APITemplateView.as_view({"patch": "bulk_sync_case"}),  # 批量api同步测试用例
+    ),
+    path(
+        "api/sync/job/<int:pk>",
+        api.APITemplateView.as_view(
+            {
+                "get": "sync_job",  # 查询同步任务进度
+                "post": "resume_sync_job",  # 继续执行中断的同步任务
+            }
+        ),
+    ),
     # 测试用例
     path(
         "test",
@@ -121,6 +134,7 @@ urlpatterns = [
     path("record/status", suite.RecordStatusView.as_view(), name="record_status"),
     path("record/remove", suite.RecordRemoveView.as_view(), name="record_remove"),
     path("record_case", suite.GenerateCaseView.as_view(), name="generate_case"),
+    path("record_case/har", suite.ConvertCaseView.as_view(), name="convert_case"),
     # run api 运行API
     path("run_api_pk/<int:pk>", run.run_api_pk),
     path("run_api", run.run_api),
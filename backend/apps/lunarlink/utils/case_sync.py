@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+@File    : case_sync.py
+@Time    : 2026/10/19 18:40
+@Author  : geekbing
+@LastEditTime : -
+@LastEditors : -
+@Description : 接口同步到用例步骤，按步骤id分批同步，中断后从已同步的位置继续
+"""
+import datetime
+import logging
+from collections import defaultdict
+from typing import List
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from lunarlink import models
+
+logger = logging.getLogger(__name__)
+
+# 同步的接口字段
+SYNC_FIELDS = ("name", "body", "url", "method")
+
+# 每批同步的步骤数量，每批在单独的事务中提交，避免长时间锁表
+SYNC_BATCH_SIZE = 500
+
+# 同步中的任务超过该时间(秒)没有进度，视为执行任务的worker已中断，可以重新执行
+SYNC_STALE_SECONDS = 10 * 60
+
+
+class SyncStatus:
+    PENDING = 0
+    RUNNING = 1
+    SUCCESS = 2
+    FAILED = 3
+
+
+def create_sync_job(api_ids: List[int], project_id: int, user_id: int):
+    """
+    创建同步任务
+
+    :param api_ids: 需要同步的接口id
+    :param project_id: 项目id
+    :param user_id: 当前用户id
+    :return:
+    """
+    return models.CaseSyncJob.objects.create(
+        project_id=project_id,
+        api_ids=sorted(set(api_ids)),
+        creator_id=user_id,
+        updater=user_id,
+    )
+
+
+def get_job_steps(job):
+    """
+    需要同步的用例步骤，限制在任务所在的项目
+
+    :param job:
+    :return:
+    """
+    return models.CaseStep.objects.filter(
+        source_api_id__in=job.api_ids,
+        case__project_id=job.project_id,
+        case__is_deleted=False,
+    )
+
+
+def sync_batch(job, apis, batch):
+    """
+    同步一批用例步骤和所属用例，并记录进度
+
+    :param job:
+    :param apis: 接口id和同步字段的映射
+    :param batch: [(步骤id, 接口id, 用例id), ...]
+    :return:
+    """
+    step_ids_by_api = defaultdict(list)
+    for step_id, source_api_id, _ in batch:
+        # 同步过程中被删除的接口不再同步
+        if source_api_id in apis:
+            step_ids_by_api[source_api_id].append(step_id)
+    case_ids = {case_id for _, _, case_id in batch}
+    now = timezone.now()
+
+    with transaction.atomic():
+        for source_api_id, step_ids in step_ids_by_api.items():
+            models.CaseStep.objects.filter(id__in=step_ids).update(
+                **apis[source_api_id],
+                updater=job.updater,
+                update_time=now,
+            )
+        models.Case.objects.filter(id__in=case_ids).update(
+            update_time=now,
+            updater=job.updater,
+        )
+        job.last_step_id = batch[-1][0]
+        job.done += len(batch)
+        models.CaseSyncJob.objects.filter(id=job.id).update(
+            last_step_id=job.last_step_id,
+            done=job.done,
+            update_time=now,
+        )
+
+
+def get_stale_before() -> datetime.datetime:
+    """同步中的任务最后一次更新早于该时间时视为已中断"""
+    return timezone.now() - datetime.timedelta(seconds=SYNC_STALE_SECONDS)
+
+
+def is_job_stale(job) -> bool:
+    """
+    同步中的任务是否已中断
+
+    :param job:
+    :return:
+    """
+    return job.status == SyncStatus.RUNNING and job.update_time < get_stale_before()
+
+
+def get_stale_job_ids() -> List[int]:
+    """已中断的同步任务id，由定时任务重新投递"""
+    return list(
+        models.CaseSyncJob.objects.filter(
+            status=SyncStatus.RUNNING, update_time__lt=get_stale_before()
+        ).values_list("id", flat=True)
+    )
+
+
+def claim_sync_job(job_id: int, takeover: bool = False) -> bool:
+    """
+    抢占同步任务，只有等待、失败或已中断的任务可以抢占，同一个任务同时只有一个worker执行
+
+    :param job_id:
+    :param takeover: 是否接管同步中的任务，worker中断后重新投递的任务接管自己的任务，不等待任务超时
+    :return: 是否抢占成功
+    """
+    running = Q(status=SyncStatus.RUNNING)
+    if not takeover:
+        running &= Q(update_time__lt=get_stale_before())
+    claimable = Q(status__in=[SyncStatus.PENDING, SyncStatus.FAILED]) | running
+    claimed = models.CaseSyncJob.objects.filter(claimable, id=job_id).update(
+        status=SyncStatus.RUNNING, update_time=timezone.now()
+    )
+    return claimed > 0
+
+
+def run_sync_job(job_id: int, takeover: bool = False):
+    """
+    执行同步任务，已同步的步骤不会重复处理，重复执行同一个任务时从中断处继续
+
+    :param job_id:
+    :param takeover: 是否接管同步中的任务，见claim_sync_job
+    :return:
+    """
+    if not claim_sync_job(job_id, takeover=takeover):
+        logger.info(f"用例步骤同步任务{job_id}不存在、已完成或正在执行，跳过")
+        return
+
+    job = models.CaseSyncJob.objects.get(id=job_id)
+    steps = get_job_steps(job)
+    apis = {
+        api["id"]: {field: api[field] for field in SYNC_FIELDS}
+        for api in models.API.objects.filter(id__in=job.api_ids).values(
+            "id", *SYNC_FIELDS
+        )
+    }
+    # 还没有同步任何步骤时统计总数，继续执行的任务沿用之前的总数
+    if job.last_step_id == 0:
+        job.total = steps.count()
+        models.CaseSyncJob.objects.filter(id=job.id).update(total=job.total)
+
+    try:
+        while True:
+            batch = list(
+                steps.filter(id__gt=job.last_step_id)
+                .order_by("id")
+                .values_list("id", "source_api_id", "case_id")[:SYNC_BATCH_SIZE]
+            )
+            if not batch:
+                break
+            sync_batch(job, apis, batch)
+    except Exception as e:
+        logger.error(f"用例步骤同步任务{job.id}失败: {e}", exc_info=True)
+        models.CaseSyncJob.objects.filter(id=job.id).update(
+            status=SyncStatus.FAILED, message=str(e), update_time=timezone.now()
+        )
+        raise
+
+    models.CaseSyncJob.objects.filter(id=job.id).update(
+        status=SyncStatus.SUCCESS, message="", update_time=timezone.now()
+    )
+    logger.info(f"用例步骤同步任务{job.id}完成，同步步骤{job.done}条")
+
+
+def get_job_progress(job) -> dict:
+    """
+    同步任务的进度
+
+    :param job:
+    :return:
+    """
+    return {
+        "id": job.id,
+        "status": job.status,
+        "status_name": job.get_status_display(),
+        "api_ids": job.api_ids,
+        "total": job.total,
+        "done": job.done,
+        "message": job.message,
+    }
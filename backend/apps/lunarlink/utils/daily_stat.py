@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+@File    : daily_stat.py
+@Time    : 2026/10/19 16:40
+@Author  : geekbing
+@LastEditTime : -
+@LastEditors : -
+@Description : 看板每日统计，按日预聚合接口、用例、报告的创建数量
+"""
+import datetime
+import logging
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+
+from lunarlink import models
+
+logger = logging.getLogger(__name__)
+
+# 数据类型和模型的对应关系
+STAT_MODELS = {
+    "api": models.API,
+    "case": models.Case,
+    "report": models.Report,
+}
+
+
+def get_stat_queryset(model_name: str):
+    """
+    参与统计的数据，与看板的统计口径一致
+
+    :param model_name: api | case | report
+    :return:
+    """
+    query = STAT_MODELS[model_name].objects
+    if model_name == "api":
+        query = query.filter(~Q(tag=4))
+    return query
+
+
+def build_daily_stats(
+    model_name: str, start_day: Optional[datetime.date]
+) -> List[models.DailyStat]:
+    """
+    统计start_day及之后每天的创建数量
+
+    :param model_name: api | case | report
+    :param start_day: 开始日期，为空时统计全部数据
+    :return:
+    """
+    query = get_stat_queryset(model_name)
+    if start_day:
+        query = query.filter(create_time__gte=start_day)
+
+    group_fields = ["project_id", "creator_id", "creator__name", "day"]
+    aggregations = {"counts": Count("id")}
+    if model_name == "report":
+        group_fields.append("type")
+        aggregations["success_counts"] = Count("id", filter=Q(status=True))
+
+    rows = (
+        query.annotate(day=TruncDate("create_time"))
+        .order_by()
+        .values(*group_fields)
+        .annotate(**aggregations)
+    )
+    return [
+        models.DailyStat(
+            project_id=row["project_id"],
+            model=model_name,
+            creator_id=row["creator_id"],
+            creator_name=row["creator__name"],
+            category=row.get("type", 0),
+            day=row["day"],
+            counts=row["counts"],
+            success_counts=row.get("success_counts", 0),
+        )
+        for row in rows
+    ]
+
+
+def refresh_daily_stats(days: Optional[int] = None) -> int:
+    """
+    重新统计最近days天的数据，统计表为空时回填全部历史数据
+
+    :param days: 刷新天数，默认取配置
+    :return: 写入的统计条数
+    """
+    days = days or settings.DASHBOARD_STAT_SETTING["refresh_days"]
+    start_day = datetime.date.today() - datetime.timedelta(days=days - 1)
+    if not models.DailyStat.objects.exists():
+        start_day = None
+
+    stats = []
+    for model_name in STAT_MODELS:
+        stats.extend(build_daily_stats(model_name, start_day))
+
+    with transaction.atomic():
+        query = models.DailyStat.objects.all()
+        if start_day:
+            query = query.filter(day__gte=start_day)
+        query.delete()
+        models.DailyStat.objects.bulk_create(stats, batch_size=1000)
+
+    logger.info(f"刷新看板每日统计，开始日期: {start_day}，统计条数: {len(stats)}")
+    return len(stats)
@@ -10,18 +10,53 @@
 import logging
 from typing import Dict, Union
 
-from django.core.mail import EmailMessage
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
 
 from lunarlink.utils.message_template import parse_message, email_msg_template
 
 logger = logging.getLogger(__name__)
 
+_connection = None
+
+
+def get_mail_connection():
+    """
+    获取进程内复用的SMTP连接，连接保持打开，避免每封邮件都重新握手登录
+
+    :return:
+    """
+    global _connection
+    if _connection is None:
+        _connection = get_connection(
+            fail_silently=False,
+            timeout=getattr(settings, "NOTIFY_TIMEOUT", 5),
+        )
+        _connection.open()
+    return _connection
+
+
+def reset_mail_connection():
+    """
+    关闭并丢弃当前SMTP连接，下次发送时重新建立
+
+    :return:
+    """
+    global _connection
+    if _connection is not None:
+        try:
+            _connection.close()
+        except Exception as e:
+            logger.warning(f"关闭SMTP连接失败: {e}")
+        _connection = None
+
 
 def send_mail_with_cc(
     subject: str,
     html_message: str,
     recipient_list: list[str],
     cc_list: list[str] = None,
+    connection=None,
 ) -> bool:
     """
     发送带有抄送人的HTML邮件
@@ -30,6 +65,7 @@ def send_mail_with_cc(
     :param html_message: HTML格式的邮件内容
     :param recipient_list: 收件人邮箱列表
     :param cc_list: 抄送人邮箱列表
+    :param connection: 邮件连接，为空时使用默认连接
     :return: 发送邮件成功返回True，失败返回False
     """
     email = EmailMessage(
@@ -37,6 +73,7 @@ def send_mail_with_cc(
         body=html_message,
         to=recipient_list,
         cc=cc_list,
+        connection=connection,
     )
     email.content_subtype = "html"
     return email.send()
@@ -52,15 +89,21 @@ def send(summary: Union[Dict, str], email_recipient: str, email_cc: str, **kwarg
     :param kwargs:
     :return:
     """
-    recipient_list = email_recipient.split(";")
-    ccr_list = email_cc.split(";")
+    recipient_list = [r for r in email_recipient.split(";") if r]
+    ccr_list = [c for c in email_cc.split(";") if c]
     parsed_data = parse_message(summary=summary, **kwargs)
     message = email_msg_template(**parsed_data)
-    is_send = send_mail_with_cc(
-        recipient_list=recipient_list,
-        cc_list=ccr_list,
-        **message,
-    )
+    try:
+        is_send = send_mail_with_cc(
+            recipient_list=recipient_list,
+            cc_list=ccr_list,
+            connection=get_mail_connection(),
+            **message,
+        )
+    except Exception:
+        # 连接可能已被服务端断开，丢弃后由调用方重试
+        reset_mail_connection()
+        raise
     if is_send:
         logger.info(f"邮件发送成功, 收件人：{email_recipient}，抄送人：{email_cc}")
     else:
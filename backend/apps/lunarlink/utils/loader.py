@@ -8,7 +8,6 @@
 @Description : -
 """
 import concurrent.futures
-import copy
 import datetime
 import importlib
 import json
@@ -24,15 +23,21 @@ from typing import Dict, List, Tuple, Union
 from concurrent.futures import ThreadPoolExecutor
 
 from bs4 import BeautifulSoup
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import connection
 from requests.utils import dict_from_cookiejar
 from requests.cookies import RequestsCookieJar
 
 from backend.settings import BASE_DIR
 from lunarlink import models
 from lunarlink.utils.parser import Format
+from lunarlink.utils.report_stats import get_report_stats
 from lunarlink.views.report import ConvertRequest
-from httprunner import HttpRunner
+from httprunner import HttpRunner, parser, report
+from httprunner.body import BodyStore, materialize
+from httprunner.client import ConnectionPoolManager
+from httprunner.loader import CSVParameters
 from apps.exceptions.error import (
     ApiNotFound,
     ConfigNotFound,
@@ -148,12 +153,98 @@ def load_debugtalk(project: int):
         shutil.rmtree(os.path.dirname(file_path))
 
 
+def create_connection_pool():
+    """
+    根据配置创建一次运行内共享的连接池，未开启时返回None
+
+    :return:
+    """
+    pool_setting = getattr(settings, "HTTP_POOL_SETTING", {})
+    if not pool_setting.get("enabled"):
+        return None
+    return ConnectionPoolManager(
+        pool_connections=pool_setting.get("pool_connections", 10),
+        pool_maxsize=pool_setting.get("pool_maxsize", 50),
+        pool_block=pool_setting.get("pool_block", False),
+        keep_alive=pool_setting.get("keep_alive", True),
+    )
+
+
+def create_body_store():
+    """
+    根据配置创建一次运行内共享的响应体存储，限制单个响应体大小和内存总量，超出部分写入临时文件
+
+    :return:
+    """
+    body_setting = getattr(settings, "RESPONSE_BODY_SETTING", {})
+    return BodyStore(
+        max_body_size=body_setting.get("max_body_size"),
+        memory_budget=body_setting.get("memory_budget"),
+        spill_dir=body_setting.get("spill_dir"),
+    )
+
+
+class SuiteCache:
+    """
+    一次运行内共享的项目数据，全局变量、配置和驱动代码引用只解析一次，
+    各条用例共享同一份数据，不再逐条查询和深拷贝
+    """
+
+    def __init__(self, project, debugtalk=None):
+        """
+        :param project: 项目id
+        :param debugtalk: 驱动代码
+        """
+        self.project = project
+        self.debugtalk = debugtalk
+        self._global_variables = None
+        self._config_bodies = {}
+        self._refs = None
+
+    @property
+    def global_variables(self) -> List[Dict]:
+        """项目全局变量，[{"key": key, "value": value}]"""
+        if self._global_variables is None:
+            self._global_variables = list(
+                models.Variables.objects.filter(project=self.project).values(
+                    "key", "value"
+                )
+            )
+        return self._global_variables
+
+    @property
+    def refs(self) -> Dict:
+        """httprunner的项目引用，所有用例共享"""
+        if self._refs is None:
+            self._refs = {
+                "env": {},
+                "def-api": {},
+                "def-testcase": {},
+                "debugtalk": self.debugtalk,
+            }
+        return self._refs
+
+    def get_config_body(self, name) -> Dict:
+        """
+        按名称获取配置，同一配置只查询和解析一次，返回的配置被多条用例共享，不能修改
+
+        :param name: 配置名称
+        :return:
+        """
+        if name not in self._config_bodies:
+            self._config_bodies[name] = literal_eval(
+                models.Config.objects.get(name=name, project__id=self.project).body
+            )
+        return self._config_bodies[name]
+
+
 def parse_tests(
     testcases: List,
     debugtalk: Dict,
     name=None,
     config=None,
     project=None,
+    cache: SuiteCache = None,
 ):
     """
     get test case structure
@@ -161,54 +252,40 @@ def parse_tests(
     :param testcases:
     :param debugtalk: 驱动代码
     :param name:
-    :param config: 配置文件
+    :param config: 配置文件，不会被修改，可以在多条用例之间共享
     :param project:
+    :param cache: 一次运行内共享的项目数据，为空时单独查询
     :return:
     """
-
-    refs = {
-        "env": {},
-        "def-api": {},
-        "def-testcase": {},
-        "debugtalk": debugtalk,
-    }
-
-    test_set = {
-        "config": {"name": testcases[-1]["name"], "variables": []},
-        "teststeps": testcases,
-    }
+    if cache is None:
+        cache = SuiteCache(project, debugtalk)
 
     if config:
-        test_set["config"] = config
+        # 浅拷贝配置，只替换会变化的字段，其余内容和其他用例共享
+        test_set_config = dict(config)
+    else:
+        test_set_config = {"name": testcases[-1]["name"]}
 
     if name:
-        test_set["config"]["name"] = name
+        test_set_config["name"] = name
 
-    # 获取当前项目的全局变量
-    global_variables = (
-        models.Variables.objects.filter(project=project).all().values("key", "value")
-    )
+    config_variables = test_set_config.get("variables") or []
     # 并集，重复内容只保留一个
-    all_config_variables_keys = set().union(
-        *(d.keys() for d in test_set["config"].setdefault("variables", []))
-    )
-    global_variables_list_of_dict = []
-    for item in global_variables:
-        if item["key"] not in all_config_variables_keys:
-            global_variables_list_of_dict.append({item["key"]: item["value"]})
-
-    # 有 variables 就直接 extend，没有就加一个[], 再 extend
+    all_config_variables_keys = set().union(*(d.keys() for d in config_variables))
     # 配置的 variables 和全局变量重叠，优先使用配置中的 variables
-    test_set["config"].setdefault("variables", []).extend(global_variables_list_of_dict)
-    test_set["config"]["refs"] = refs
-
-    # 配置中的变量和全局变量合并
-    variables_mapping = {}
-    if config:
-        for variables in config["variables"]:
-            variables_mapping.update(variables)
-
-    return test_set
+    global_variables_list_of_dict = [
+        {item["key"]: item["value"]}
+        for item in cache.global_variables
+        if item["key"] not in all_config_variables_keys
+    ]
+    test_set_config["variables"] = config_variables + global_variables_list_of_dict
+    test_set_config["refs"] = cache.refs
+
+    # 用例步骤在httprunner中按参数组合复制，这里不需要深拷贝
+    return {
+        "config": test_set_config,
+        "teststeps": testcases,
+    }
 
 
 def debug_api(
@@ -270,6 +347,7 @@ def debug_api(
     debugtalk_content = debugtalk[0]
     debugtalk_path = debugtalk[1]
     os.chdir(os.path.dirname(debugtalk_path))
+    body_store = create_body_store()
     try:
         testcase_list = [
             parse_tests(
@@ -281,7 +359,7 @@ def debug_api(
             )
         ]
 
-        kwargs = {"failfast": False}
+        kwargs = {"failfast": False, "body_store": body_store}
         runner = HttpRunner(**kwargs)
         runner.run(path_or_testcases=testcase_list)
         summary = parse_summary(summary=runner.summary)
@@ -296,18 +374,13 @@ def debug_api(
                 user=user,
             )
 
-        # 复制一份 response 的 json
-        for details in summary.get("details", []):
-            for record in details.get("records", []):
-                json_data = record["meta_data"]["response"].pop("json", {})
-                if json_data:
-                    record["meta_data"]["response"]["jsonCopy"] = json_data
         ConvertRequest.generate_curl(report_details=summary["details"])
         return summary
     except Exception as e:
         logger.error(f"debug_api error")
         raise SyntaxError(str(e))
     finally:
+        body_store.close()
         os.chdir(BASE_DIR)
         shutil.rmtree(os.path.dirname(debugtalk_path))
 
@@ -322,6 +395,7 @@ def debug_suite(
     report_type=1,
     report_name="",
     allow_parallel=False,
+    report_sink=None,
 ):
     """debug suite
 
@@ -334,6 +408,7 @@ def debug_suite(
     :param report_type: int, 默认类型是调试
     :param report_name:
     :param allow_parallel: bool, 是否允许并行
+    :param report_sink: ReportSink, 每条用例执行完成后写入报告分片
     :return:
     """
     if len(suite) == 0:
@@ -347,6 +422,10 @@ def debug_suite(
     # 先记录配置的名称，parse_tests会改变config
     config_name_list = [d["name"] for d in config]
 
+    # 同一次运行的用例共享连接池，每个用例仍使用独立的session保存cookies
+    connection_pool = create_connection_pool()
+    body_store = create_body_store()
+
     try:
         test_sets = create_test_sets(
             suite=suite,
@@ -357,9 +436,19 @@ def debug_suite(
         )
 
         if allow_parallel:
-            summary = debug_suite_parallel(test_sets)
+            summary = debug_suite_parallel(
+                test_sets,
+                connection_pool=connection_pool,
+                body_store=body_store,
+                report_sink=report_sink,
+            )
         else:
-            kwargs = {"failfast": False}
+            kwargs = {
+                "failfast": False,
+                "connection_pool": connection_pool,
+                "body_store": body_store,
+                "report_sink": report_sink,
+            }
             runner = HttpRunner(**kwargs)
             runner.run(test_sets)
             summary = parse_summary(runner.summary)
@@ -382,12 +471,13 @@ def debug_suite(
                 report_type=report_type,
                 user=user,
             )
-        # 复制一份response的json
-        summary = process_response_json(summary)
         return summary, report_id
     except Exception as e:
         raise SyntaxError(str(e))
     finally:
+        if connection_pool is not None:
+            connection_pool.close()
+        body_store.close()
         os.chdir(BASE_DIR)
         shutil.rmtree(os.path.dirname(debugtalk_path))
 
@@ -401,17 +491,18 @@ def create_test_sets(suite, obj, debugtalk_content, config, project):
     :param project:
     :return:
     """
+    # 全局变量和驱动代码引用在一次运行内只解析一次
+    cache = SuiteCache(project, debugtalk_content)
     test_sets = []
     for index in range(len(suite)):
-        # copy.deepcopy 修复引用bug
-        testcases = copy.deepcopy(
-            parse_tests(
-                testcases=suite[index],
-                debugtalk=debugtalk_content,
-                name=obj[index]["name"],
-                config=config[index],
-                project=project,
-            )
+        # parse_tests不修改传入的配置，多条用例共享同一配置也不会互相影响
+        testcases = parse_tests(
+            testcases=suite[index],
+            debugtalk=debugtalk_content,
+            name=obj[index]["name"],
+            config=config[index],
+            project=project,
+            cache=cache,
         )
         test_sets.append(testcases)
     return test_sets
@@ -442,30 +533,41 @@ def update_summary(obj, test_sets, project, summary, config_name_list):
     return summary
 
 
-def process_response_json(summary):
-    """
-    处理 summary 中的 response json，以便在 summary 中添加 jsonCopy。
-    """
-    for _details in summary.get("details", []):
-        for record in _details.get("records", []):
-            json_data = record["meta_data"]["response"].pop("json", {})
-            if json_data:
-                record["meta_data"]["response"]["jsonCopy"] = json_data
-    return summary
-
-
-def debug_suite_parallel(test_sets: List):
+def debug_suite_parallel(
+    test_sets: List, connection_pool=None, body_store=None, report_sink=None
+):
     """
     并行运行用例
     :param test_sets:
+    :param connection_pool: 共享的连接池，为空时每个用例独立建立连接
+    :param body_store: 共享的响应体存储
+    :param report_sink: 共享的报告写入器
     :return:
     """
 
     def run_test(test_set: Dict):
-        kwargs = {"failfast": False}
-        runner = HttpRunner(**kwargs)
-        runner.run([test_set])
-        return parse_summary(runner.summary)
+        kwargs = {
+            "failfast": False,
+            "connection_pool": connection_pool,
+            "body_store": body_store,
+            "report_sink": report_sink,
+        }
+        try:
+            runner = HttpRunner(**kwargs)
+            runner.run([test_set])
+            return parse_summary(runner.summary)
+        finally:
+            if report_sink is not None:
+                # 报告分片在工作线程中写入，释放线程的数据库连接
+                connection.close()
+
+    # csv参数化数据量大的用例按行拆成多份，分给多个线程运行
+    chunk_size = getattr(settings, "PARAMETERS_CHUNK_SIZE", 0)
+    test_sets = [
+        chunk
+        for test_set in test_sets
+        for chunk in split_test_set(test_set, chunk_size)
+    ]
 
     start = time.time()
     # 限制最多10个线程
@@ -480,6 +582,55 @@ def debug_suite_parallel(test_sets: List):
     return merge_parallel_result(results, duration)
 
 
+def split_test_set(test_set: Dict, chunk_size: int) -> List[Dict]:
+    """
+    按csv参数的行拆分用例，每份只运行chunk_size行，各份共享csv文件的行偏移索引
+
+    只拆分笛卡尔积模式下的第一个参数，各份的参数组合按顺序拼接后和拆分前一致；
+    第一个参数不是内置的csv参数化，或者是pairwise、sample模式、限制了组合数量时不拆分
+    :param test_set: parse_tests返回的用例
+    :param chunk_size: 每份的csv行数，不大于0时不拆分
+    :return: 拆分后的用例列表
+    """
+    config = test_set["config"]
+    parameters = config.get("parameters")
+    if not parameters or chunk_size <= 0:
+        return [test_set]
+    if (config.get("parameters_mode") or "cartesian") != "cartesian" or config.get(
+        "parameters_limit"
+    ) is not None:
+        return [test_set]
+
+    parameter_name, parameter_content = list(parameters[0].items())[0]
+    if not isinstance(parameter_content, str):
+        return [test_set]
+
+    debugtalk = config.get("refs", {}).get("debugtalk") or {}
+    functions = debugtalk.get("functions") or {}
+    func_match = parser.function_regex_compile.fullmatch(parameter_content.strip())
+    # 只处理内置的csv参数化，驱动代码中的函数可能有副作用，不在这里提前调用
+    if (
+        not func_match
+        or func_match.group(1) not in ("parameterize", "P")
+        or func_match.group(1) in functions
+    ):
+        return [test_set]
+
+    source = parser.parse_data(
+        parameter_content.strip(), debugtalk.get("variables"), functions
+    )
+    if not isinstance(source, CSVParameters) or len(source) <= chunk_size:
+        return [test_set]
+
+    test_set_chunks = []
+    for chunk in source.chunks(chunk_size):
+        # httprunner运行时会取出配置中的参数，每份使用独立的配置
+        chunk_config = dict(config)
+        chunk_config["parameters"] = [{parameter_name: chunk}] + parameters[1:]
+        test_set_chunks.append({**test_set, "config": chunk_config})
+    return test_set_chunks
+
+
 def merge_parallel_result(results: List, duration: float):
     """
     合并并行的结果，保持和串行的运行结果一致
@@ -500,11 +651,13 @@ def merge_parallel_result(results: List, duration: float):
                 base_result["time"][k] = v + result["time"][k]
         base_result["details"].extend(result["details"])
     base_result["time"]["duration"] = duration
+    # 各阶段耗时的分位数需要基于全部用例重新统计
+    base_result["timings"] = report.get_timings_stat(base_result["details"])
 
     # 删除多余的key
     keys = list(base_result.keys())
     for k in keys:
-        if k not in ("success", "stat", "time", "platform", "details"):
+        if k not in ("success", "stat", "time", "platform", "timings", "details"):
             base_result.pop(k)
     return base_result
 
@@ -516,30 +669,50 @@ def parse_summary(summary):
     """
 
     for detail in summary["details"]:
-        for record in detail["records"]:
-            for key, value in record["meta_data"]["request"].items():
-                if isinstance(value, bytes):
-                    record["meta_data"]["request"][key] = value.decode("utf-8")
-                if isinstance(value, RequestsCookieJar):
-                    record["meta_data"]["request"][key] = dict_from_cookiejar(value)
-
-            for key, value in record["meta_data"]["response"].items():
-                if isinstance(value, bytes):
-                    record["meta_data"]["response"][key] = value.decode("utf-8")
-                if isinstance(value, RequestsCookieJar):
-                    record["meta_data"]["response"][key] = dict_from_cookiejar(value)
-
-            if "text/html" in record["meta_data"]["response"]["content_type"]:
-                record["meta_data"]["response"]["content"] = BeautifulSoup(
-                    record["meta_data"]["response"]["content"], features="html.parser"
-                ).prettify()
-
-            if record["status"] == "failure":
-                record["meta_data"].update({"validators": []})
+        parse_detail(detail)
 
     return summary
 
 
+def parse_detail(detail):
+    """序列化单条用例的执行记录，已序列化过的记录会跳过
+    保存的报告和返回给前端的报告使用同一份记录，不再复制
+    :param detail:
+    :return:
+    """
+    for record in detail["records"]:
+        if "body" not in record["meta_data"]["response"]:
+            continue
+
+        # 响应体只保留了一份原始字节，在这里解码为content和json
+        materialize(record["meta_data"]["response"])
+        # 前端从jsonCopy中读取响应的json
+        json_data = record["meta_data"]["response"].pop("json", None)
+        if json_data:
+            record["meta_data"]["response"]["jsonCopy"] = json_data
+        for key, value in record["meta_data"]["request"].items():
+            if isinstance(value, bytes):
+                record["meta_data"]["request"][key] = value.decode("utf-8")
+            if isinstance(value, RequestsCookieJar):
+                record["meta_data"]["request"][key] = dict_from_cookiejar(value)
+
+        for key, value in record["meta_data"]["response"].items():
+            if isinstance(value, bytes):
+                record["meta_data"]["response"][key] = value.decode("utf-8")
+            if isinstance(value, RequestsCookieJar):
+                record["meta_data"]["response"][key] = dict_from_cookiejar(value)
+
+        if "text/html" in record["meta_data"]["response"]["content_type"]:
+            record["meta_data"]["response"]["content"] = BeautifulSoup(
+                record["meta_data"]["response"]["content"], features="html.parser"
+            ).prettify()
+
+        if record["status"] == "failure":
+            record["meta_data"].update({"validators": []})
+
+    return detail
+
+
 def save_summary(name, summary, project, report_type=2, user=None, ci_metadata=None):
     """保存报告信息"""
 
@@ -552,9 +725,9 @@ def save_summary(name, summary, project, report_type=2, user=None, ci_metadata=N
     if name == "" or name is None:
         name = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-    # 需要先复制一份，不然会影响debug_api返回给前端的报告
-    summary = copy.deepcopy(summary)
-    summary_detail = summary.pop("details")
+    # 只去掉details，记录本身和返回给前端的报告共用，不做深拷贝
+    summary_detail = summary["details"]
+    summary = {key: value for key, value in summary.items() if key != "details"}
     report = models.Report.objects.create(
         **{
             "project": models.Project.objects.get(id=project),
@@ -566,6 +739,7 @@ def save_summary(name, summary, project, report_type=2, user=None, ci_metadata=N
             "ci_metadata": ci_metadata,
             "ci_project_id": ci_metadata.get("ci_project_id"),
             "ci_job_id": ci_metadata.get("ci_job_id", None),
+            **get_report_stats(summary),
         }
     )
 
@@ -11,6 +11,24 @@ from typing import Dict
 from django.conf import settings
 
 
+def message_summary(summary: Dict) -> Dict:
+    """
+    提取消息模板需要的摘要字段，用于投递到通知队列，避免序列化整份报告
+
+    :param summary: 测试报告摘要
+    :return:
+    """
+    stat = summary["stat"]
+    return {
+        "task_name": summary.get("task_name"),
+        "report_id": summary.get("report_id"),
+        "stat": {
+            key: stat[key] for key in ("testsRun", "successes", "failures", "errors")
+        },
+        "time": {"duration": summary["time"]["duration"]},
+    }
+
+
 def parse_message(summary: Dict, **kwargs):
     """
     解析消息模板
@@ -8,6 +8,7 @@
 @Description : API用例解析
 """
 import datetime
+import hashlib
 import json
 import logging
 
@@ -17,6 +18,9 @@ from typing import Any, Dict, Generator, List, Tuple, Union
 
 import json5
 import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from lunarlink import models
 from lunaruser import models as user_models
@@ -434,6 +438,9 @@ class Parse:
 
 
 class Yapi:
+    # 参与摘要计算的字段，接口菜单和接口详情中都包含这些字段
+    DIGEST_FIELDS = ("title", "path", "method", "catid", "up_time")
+
     def __init__(
         self,
         yapi_base_url: str,
@@ -453,35 +460,85 @@ class Yapi:
         # api所有分组目录，也包含了api的基础信息
         self.category_info_url = self.__yapi_base_url + "/api/interface/list_menu"
 
+        import_setting = settings.YAPI_IMPORT_SETTING
+        self.max_workers = import_setting["max_workers"]
+        self.timeout = import_setting["timeout"]
+        self.session = self.get_session(
+            retries=import_setting["retries"], pool_size=self.max_workers
+        )
+        self._category_info = None
+        self._parse_context = None
+
+    @staticmethod
+    def get_session(retries: int, pool_size: int) -> requests.Session:
+        """
+        连接失败和5xx响应自动重试的会话，连接池大小与并发数一致
+
+        :param retries: 重试次数
+        :param pool_size: 连接池大小
+        :return:
+        """
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=(500, 502, 503, 504),
+            allowed_methods=("GET",),
+        )
+        adapter = HTTPAdapter(
+            max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size
+        )
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    @classmethod
+    def get_api_digest(cls, api_info: Dict) -> str:
+        """
+        yapi接口摘要，接口菜单中的摘要与已导入接口的摘要一致时不需要获取详情
+
+        :param api_info: 接口菜单中的接口或接口详情
+        :return:
+        """
+        content = json.dumps(
+            [api_info.get(field) for field in cls.DIGEST_FIELDS], ensure_ascii=False
+        )
+        return hashlib.md5(content.encode("utf-8")).hexdigest()
+
     def get_category_info(self) -> Dict:
-        """获取接口菜单列表
+        """获取接口菜单列表，同一次导入只请求一次
         :return:
         """
+        if self._category_info is not None:
+            return self._category_info
+
         try:
-            res = requests.get(
-                self.category_info_url, params={"token": self.__token}
+            res = self.session.get(
+                self.category_info_url,
+                params={"token": self.__token},
+                timeout=self.timeout,
             ).json()
         except Exception as e:
             logger.error(f"获取yapi的目录失败：{e}")
+            return {"errcode": 1, "errmsg": "获取yapi的目录失败！", "data": []}
+
+        if res["errcode"] == 0:
+            self._category_info = res
+            return res
         else:
-            if res["errcode"] == 0:
-                return res
-            else:
-                return {"errcode": 1, "errmsg": "获取yapi的目录失败！", "data": []}
+            return {"errcode": 1, "errmsg": "获取yapi的目录失败！", "data": []}
 
-    def get_api_uptime_mapping(self):
-        """yapi所有api的更新时间映射关系，{api_id: api_up_time}
+    def get_api_digest_mapping(self) -> Dict:
+        """yapi所有api的更新时间和摘要，{api_id: (api_up_time, api_digest)}
         :return:
         """
-        ""
         category_info_list = self.get_category_info()
         mapping = {}
         for category_info in category_info_list["data"]:
             category_detail = category_info.get("list", [])
             for category in category_detail:
                 api_id = category["_id"]
-                up_time = category["up_time"]
-                mapping[api_id] = up_time
+                mapping[api_id] = (category["up_time"], self.get_api_digest(category))
         return mapping
 
     def get_category_id_name_mapping(self):
@@ -510,13 +567,14 @@ class Yapi:
         :return:
         """
         try:
-            res = requests.get(
+            res = self.session.get(
                 self.api_list_url,
                 params={
                     "token": self.__token,
                     "page": 1,
                     "limit": 100000,
                 },
+                timeout=self.timeout,
             ).json()
         except Exception as e:
             logger.error(f"获取api list失败: {e}")
@@ -534,17 +592,19 @@ class Yapi:
 
     def get_batch_api_detail(self, api_ids: List[int]) -> Generator[dict, None, None]:
         """
-        获取yapi的所有api的详细信息
+        并发获取yapi的api的详细信息，请求超时或重试后仍失败的api会被跳过
         :param api_ids:
         :return:
         """
         token = self.__token
-        session = requests.Session()  # 创建一个 Session 对象
+        session = self.session
 
         def fetch_api_detail(api_id):
             try:
                 response = session.get(
-                    f"{self.api_details_url}?token={token}&id={api_id}"
+                    self.api_details_url,
+                    params={"token": token, "id": api_id},
+                    timeout=self.timeout,
                 )
                 response.raise_for_status()  # 如果状态码不是200，会引发HTTPError异常
                 res = response.json()
@@ -554,7 +614,7 @@ class Yapi:
             except Exception as e:
                 logger.error(f"Error occurred: {e}")
 
-        with ThreadPoolExecutor(max_workers=10) as executor:
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
             futures = {executor.submit(fetch_api_detail, api_id) for api_id in api_ids}
             for future in as_completed(futures):
                 api_detail = future.result()
@@ -811,6 +871,23 @@ class Yapi:
             "description", ""
         )
 
+    def get_parse_context(self) -> Dict:
+        """
+        解析api时需要的项目、目录和yapi用户，同一次导入只查询一次
+        :return:
+        """
+        if self._parse_context is None:
+            obj = models.Relation.objects.get(project_id=self.faster_project_id, type=1)
+            yapi_user = user_models.MyUser.objects.filter(name="yapi").first()
+            self._parse_context = {
+                "project": models.Project.objects.get(id=self.faster_project_id),
+                "tree_ycatid_mapping": get_tree_ycatid_mapping(
+                    value=literal_eval(obj.tree)
+                ),
+                "yapi_user_id": yapi_user.id if yapi_user else None,
+            }
+        return self._parse_context
+
     def get_parsed_apis(self, api_info) -> List:
         """
         批量创建fastapi格式的api
@@ -819,16 +896,14 @@ class Yapi:
         """
 
         apis = [
-            self.yapi2faster(api) for api in api_info if isinstance(api, dict) is True
+            (api, self.yapi2faster(api))
+            for api in api_info
+            if isinstance(api, dict) is True
         ]
-        proj = models.Project.objects.get(id=self.faster_project_id)
-        obj = models.Relation.objects.get(project_id=self.faster_project_id, type=1)
-        yapi_user = user_models.MyUser.objects.filter(name="yapi").first()
-        yapi_user_id = yapi_user.id if yapi_user else None
-        eval_tree: List = literal_eval(obj.tree)
-        tree_ycatid_mapping = get_tree_ycatid_mapping(value=eval_tree)
+        context = self.get_parse_context()
+        tree_ycatid_mapping = context["tree_ycatid_mapping"]
         api_instances = []
-        for api in apis:
+        for source_api, api in apis:
             format_api = Format(api)
             format_api.parse()
             yapi_catid: int = api["yapi_catid"]
@@ -837,7 +912,7 @@ class Yapi:
                 "body": format_api.testcase,
                 "url": format_api.url,
                 "method": format_api.method,
-                "project": proj,
+                "project": context["project"],
                 "relation": tree_ycatid_mapping.get(yapi_catid, 0),
                 # 直接从yapi原来的api中获取
                 "yapi_catid": yapi_catid,
@@ -845,8 +920,9 @@ class Yapi:
                 "yapi_add_time": api["yapi_add_time"],
                 "yapi_up_time": api["yapi_up_time"],
                 "yapi_username": api["yapi_username"],
+                "yapi_digest": self.get_api_digest(source_api),
                 # 默认为yapi用户
-                "creator_id": yapi_user_id,
+                "creator_id": context["yapi_user_id"],
             }
             api_instances.append(models.API(**api_body))
 
@@ -854,73 +930,73 @@ class Yapi:
 
     @staticmethod
     def merge_api(
-        api_instances: List, apis_imported_from_yapi: List
+        api_instances: List, imported_apis: Dict[int, models.API]
     ) -> Tuple[List, List]:
         """
         将 yapi 获取的 api 和已导入测试平台的 api 进行合并
         两种情况：
         1. parsed_api.yapi_id不存在测试平台
-        2. yapi的id已经存在测试平台，新获取的 parsed_api.yapi_up_time > imported_api.yapi_up_time
+        2. yapi的id已经存在测试平台，且摘要发生变化
         :param api_instances: 解析后的 API 实例
-        :param apis_imported_from_yapi: 原 api 信息
+        :param imported_apis: 已导入的 api，{yapi_id: API}
         :return: 返回要更新的 API 实例和要新增的 API 实例
         """
-        imported_apis_mapping = {
-            api.yapi_id: api.yapi_up_time for api in apis_imported_from_yapi
-        }
-        imported_apis_index = {
-            api.yapi_id: index for index, api in enumerate(apis_imported_from_yapi)
-        }
-
         new_api_instances = []
         update_api_instances = []
-        imported_apis_ids = set(imported_apis_mapping.keys())
         for api in api_instances:
-            yapi_id = api.yapi_id
+            imported_api = imported_apis.get(api.yapi_id)
             # parsed_api.yapi_id不存在测试平台
-            if yapi_id not in imported_apis_ids:
+            if imported_api is None:
                 new_api_instances.append(api)
-            else:
+            elif api.yapi_digest != imported_api.yapi_digest:
                 # yapi的id已经存在测试平台
-                imported_yapi_up_time = imported_apis_mapping[yapi_id]
-                if api.yapi_up_time > int(imported_yapi_up_time):
-                    index = imported_apis_index[yapi_id]
-                    imported_api = apis_imported_from_yapi[index]
-                    imported_api.method = api.method
-                    imported_api.name = api.name
-                    imported_api.url = api.url
-                    imported_api.body = api.body
-                    imported_api.yapi_up_time = api.yapi_up_time
-
-                    update_api_instances.append(imported_api)
+                imported_api.method = api.method
+                imported_api.name = api.name
+                imported_api.url = api.url
+                imported_api.body = api.body
+                imported_api.yapi_up_time = api.yapi_up_time
+                imported_api.yapi_digest = api.yapi_digest
+
+                update_api_instances.append(imported_api)
 
         return update_api_instances, new_api_instances
 
-    def get_create_or_update_apis(self, imported_apis_mapping):
+    def get_create_or_update_apis(
+        self, imported_apis_mapping: Dict
+    ) -> Tuple[List, List, Dict]:
         """
-        返回需要新增和更新的api_id
-        imported_apis_mapping: {yapi_id: yapi_up_time}
+        返回需要新增和更新的api_id，摘要没有变化的api不需要获取详情
+        imported_apis_mapping: {yapi_id: (yapi_up_time, yapi_digest)}
         新增：
             yapi_id不存在测试平台imported_apis_mapping中
         更新：
-            yapi_id存在测试平台imported_apis_mapping, 且up_time大于测试平台的
+            yapi_id存在测试平台imported_apis_mapping, 且摘要与测试平台的不一致；
+            没有摘要的api(增加摘要前导入的)按up_time判断
         :param imported_apis_mapping:
-        :return:
+        :return: 新增的api_id, 更新的api_id, 需要补充摘要的{yapi_id: yapi_digest}
         """
-        api_uptime_mapping: Dict = self.get_api_uptime_mapping()
+        api_digest_mapping: Dict = self.get_api_digest_mapping()
 
         create_ids = []
         update_ids = []
-        for yapi_id, yapi_up_time in api_uptime_mapping.items():
-            imported_yapi_up_time = imported_apis_mapping.get(yapi_id)
-            if not imported_yapi_up_time:
+        backfill_digests = {}
+        for yapi_id, (yapi_up_time, yapi_digest) in api_digest_mapping.items():
+            imported = imported_apis_mapping.get(yapi_id)
+            if not imported:
                 # 新增
                 create_ids.append(yapi_id)
-            elif yapi_up_time > int(imported_yapi_up_time):
-                # 更新
+                continue
+
+            imported_yapi_up_time, imported_yapi_digest = imported
+            if imported_yapi_digest:
+                if yapi_digest != imported_yapi_digest:
+                    update_ids.append(yapi_id)
+            elif yapi_up_time > int(imported_yapi_up_time or 0):
                 update_ids.append(yapi_id)
+            else:
+                backfill_digests[yapi_id] = yapi_digest
 
-        return create_ids, update_ids
+        return create_ids, update_ids, backfill_digests
 
 
 # 特殊字段conditions
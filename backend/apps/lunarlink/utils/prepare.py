@@ -7,10 +7,11 @@
 @LastEditors : -
 @Description : 
 """
+import datetime
 import logging
 
 from ast import literal_eval
-from typing import Type
+from typing import Iterable, Type
 
 import pydash
 import requests
@@ -18,7 +19,8 @@ import requests
 from collections import defaultdict
 from typing import Dict, List, Tuple
 
-from django.db.models import Count, Model, F, Q
+from django.db import transaction
+from django.db.models import Count, Model, Q, Sum
 from django.db.models.query import QuerySet
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils import timezone
@@ -39,16 +41,44 @@ def project_init(project, creator):
     models.Debugtalk.objects.create(project=project, creator=creator)
 
 
-def get_sql_dateformat(date_type: str) -> str:
-    create_time = ""
+# 模型和看板每日统计中数据类型的对应关系
+STAT_MODEL_NAMES = {
+    models.API: "api",
+    models.Case: "case",
+    models.Report: "report",
+}
+
+
+def get_date_key(day: datetime.date, date_type: str) -> str:
+    """
+    日期所属的日、周、月，格式与get_day、get_week、get_month一致
+
+    :param day: 日期
+    :param date_type: day | week | month
+    :return:
+    """
     if date_type == "week":
-        create_time = "CAST(YEARWEEK(create_time, 1) AS CHAR)"
+        year, week_number, _ = day.isocalendar()
+        return f"{year}{str(week_number).zfill(2)}"
     elif date_type == "month":
-        create_time = "DATE_FORMAT(create_time, '%%Y%%m')"
-    elif date_type == "day":
-        create_time = "DATE_FORMAT(create_time, '%%Y-%%m-%%d')"
+        return day.strftime("%Y%m")
+    return day.strftime("%Y-%m-%d")
+
 
-    return create_time
+def get_recent_start_day(date_type: str) -> datetime.date:
+    """
+    最近6天，6周，6月的开始日期
+
+    :param date_type: day | week | month
+    :return:
+    """
+    today = datetime.date.today()
+    if date_type == "week":
+        return today - datetime.timedelta(weeks=5, days=today.weekday())
+    elif date_type == "month":
+        month = get_month(-5)
+        return datetime.date(int(month[:4]), int(month[4:]), 1)
+    return today - datetime.timedelta(days=5)
 
 
 def get_recent_date(date_type) -> List:
@@ -65,28 +95,29 @@ def get_recent_date(date_type) -> List:
         return [get_month(n) for n in range(-5, 1)]
 
 
-def list2dict(arr: List) -> Dict:
+def query_recent_stats(model_name: str, date_type: str) -> QuerySet:
     """
-    将一个包含字典的列表转换为一个字典
-    :param arr: [{create_time: xxx, counts: xxx}, ...]
-    :return: {create_time: counts, ...}
+    查询最近6天，6周，6月的每日统计
+
+    :param model_name: api | case | report
+    :param date_type: day | week | month
+    :return:
     """
-    keys = []
-    values = []
-    for value in arr:
-        keys.append(str(value.get("create_time")))
-        values.append(value.get("counts"))
-    return dict(zip(keys, values))
+    return models.DailyStat.objects.filter(
+        model=model_name, day__gte=get_recent_start_day(date_type)
+    )
 
 
-def complete_list(arr: List[Dict], date_type: str) -> List:
+def complete_list(arr: Iterable[Dict], date_type: str) -> List:
     """获取最近6天，6周，6月的数量, 并返回一个包含6个元素的列表
 
-    :param arr: [{create_time: xxx, counts: xxx}, ...]
+    :param arr: [{day: xxx, counts: xxx}, ...]
     :param date_type: day | week | month
     :return: [1, 2, 3, 4, 5, 6]
     """
-    mapping = list2dict(arr)  # {create_time: counts, ...}
+    mapping = defaultdict(int)  # {create_time: counts, ...}
+    for value in arr:
+        mapping[get_date_key(value["day"], date_type)] += value["counts"]
     recent_six_date_list = get_recent_date(date_type)  # ['08-13', '08-14', ...]
     # [1, 2, 3, 4, 5, 6]
     count = [mapping.get(date, 0) for date in recent_six_date_list]
@@ -123,46 +154,43 @@ def aggregate_case_by_tag(project_id) -> Tuple:
 
 def aggregate_reports_by_type(project_id) -> Tuple:
     """按照类型统计项目中的报告"""
-    query = models.Report.objects
+    query = models.DailyStat.objects.filter(model="report")
     if project_id:
         query = query.filter(project_id=project_id)
     report_count: Dict = query.aggregate(
-        测试=Count("pk", filter=Q(type=1)),
-        异步=Count("pk", filter=Q(type=2)),
-        定时=Count("pk", filter=Q(type=3)),
+        测试=Sum("counts", filter=Q(category=1)),
+        异步=Sum("counts", filter=Q(category=2)),
+        定时=Sum("counts", filter=Q(category=3)),
     )
-    return list(report_count.keys()), list(report_count.values())
+    return list(report_count.keys()), [
+        count or 0 for count in report_count.values()
+    ]
 
 
 def aggregate_reports_by_status(project_id) -> Tuple[List, List]:
     """按照状态统计项目中的报告"""
-    query = models.Report.objects
+    query = models.DailyStat.objects.filter(model="report")
     if project_id:
         query = query.filter(project_id=project_id)
     report_count: Dict = query.aggregate(
-        失败=Count("pk", filter=Q(status=0)),
-        成功=Count("pk", filter=Q(status=1)),
+        total=Sum("counts"),
+        success=Sum("success_counts"),
     )
+    total = report_count["total"] or 0
+    success = report_count["success"] or 0
 
-    return list(report_count.keys()), list(report_count.values())
+    return ["失败", "成功"], [total - success, success]
 
 
 def aggregate_reports_or_case_bydate(date_type: str, model) -> List:
     """按月和周统计报告创建数量"""
-    create_time = get_sql_dateformat(date_type)
     qs = (
-        model.objects.extra(select={"create_time": create_time})
-        .values(
-            "create_time",
-        )
-        .annotate(counts=Count("id"))
-        .values("create_time", "counts")
+        query_recent_stats(STAT_MODEL_NAMES[model], date_type)
+        .values("day")
+        .annotate(counts=Sum("counts"))
     )
 
-    # qs = [{"create_time": xxx, "counts": xxx}]
-    # qs = list(qs)
-    # 查询结果是按时间升序，取最后6条
-    # 没有的补0
+    # 同一周、同一月的每日数量累加，没有的补0
     values = complete_list(arr=qs, date_type=date_type)
 
     return values
@@ -175,25 +203,15 @@ def aggregate_apis_bydate(date_type: str, is_yapi=False) -> List:
     :param is_yapi: False: 统计手动创建的接口数量，True: 统计yapi导入的接口数量
     :return: 返回统计结果
     """
-    create_time = get_sql_dateformat(date_type)
-
-    query = models.API.objects.filter(~Q(tag=4))
+    query = query_recent_stats("api", date_type)
     if is_yapi:
-        query = query.filter(creator__name="yapi")
+        query = query.filter(creator_name="yapi")
     else:
-        query = query.filter(~Q(creator__name="yapi"))
+        query = query.filter(~Q(creator_name="yapi"))
 
-    count_data = (
-        query.extra(select={"create_time": create_time})
-        .values(
-            "create_time",
-        )
-        .annotate(counts=Count("id"))
-        .values("create_time", "counts")
-    )
+    count_data = query.values("day").annotate(counts=Sum("counts"))
 
-    # 查询结果是按时间升序，取最后6条
-    # 没有的补0
+    # 同一周、同一月的每日数量累加，没有的补0
     count = complete_list(arr=count_data, date_type=date_type)
 
     return count
@@ -210,21 +228,20 @@ def aggregate_data_by_date(
     :param model: 数据模型
     :return: (创建人列表, 创建人所创建的数据项数量字典)
     """
-    create_time = get_sql_dateformat(date_type)
+    query = query_recent_stats(STAT_MODEL_NAMES[model], date_type)
     if model == models.API:
-        query = model.objects.filter(~Q(tag=4), ~Q(creator__name="yapi"))
-    else:
-        query = model.objects
+        query = query.filter(~Q(creator_name="yapi"))
 
-    count_data = (
-        query.annotate(
-            creator_name=F("creator__name"),
+    count_data = [
+        {
+            "creator_name": item["creator_name"],
+            "create_time": get_date_key(item["day"], date_type),
+            "counts": item["counts"],
+        }
+        for item in query.values("creator_name", "day").annotate(
+            counts=Sum("counts")
         )
-        .extra(select={"create_time": create_time})
-        .values("creator_name", "create_time")
-        .annotate(counts=Count("id"))
-        .order_by("creator_name", "create_time")
-    )
+    ]
 
     # 获取最近6个时间段
     recent_six_date_list = get_recent_date(date_type)
@@ -238,7 +255,7 @@ def aggregate_data_by_date(
 
 
 def extract_top_creators_and_counts(
-    count_data: QuerySet,
+    count_data: Iterable[Dict],
     recent_six_date_list: List[str],
 ) -> Tuple[List[str], Dict[str, List[int]]]:
     """
@@ -272,26 +289,22 @@ def extract_top_creators_and_counts(
 def get_daily_count(project_id, model_name, start, end):
     # 生成日期list, ['08-13', '08-14', ...]
     recent_days = [get_day(n)[5:] for n in range(start, end)]
-    models_mapping = {"api": models.API, "case": models.Case, "report": models.Report}
-    model = models_mapping[model_name]
-    query = model.objects
-    if model_name == "api":
-        query = query.filter(~Q(tag=4))
 
     # 统计给定日期范围内，每天创建的条数
-    count_data: List = (
-        query.filter(
-            project_id=project_id, create_time__range=[get_day(start), get_day(end)]
+    count_data = (
+        models.DailyStat.objects.filter(
+            project_id=project_id,
+            model=model_name,
+            day__gte=get_day(start),
+            day__lt=get_day(end),
         )
-        .extra(select={"create_time": "DATE_FORMAT(create_time,'%%m-%%d')"})
-        .values("create_time")
-        .annotate(counts=Count("id"))
-        .values("create_time", "counts")
+        .values("day")
+        .annotate(counts=Sum("counts"))
     )
 
     # list转dict，key是日期，value是统计数
     create_time_count_mapping = {
-        data["create_time"]: data["counts"] for data in count_data
+        data["day"].strftime("%m-%d"): data["counts"] for data in count_data
     }
 
     # 日期为空的key, 补0
@@ -534,6 +547,43 @@ def generate_casestep(
     models.CaseStep.objects.bulk_create(objs=case_steps)
 
 
+# 更新用例步骤时写入的字段
+CASESTEP_UPDATE_FIELDS = ["name", "body", "url", "method", "step", "source_api_id"]
+
+
+def prefetch_casestep_sources(
+    step_body_list: List, project_id: int
+) -> Tuple[Dict, Dict, Dict]:
+    """
+    批量查询用例步骤引用的原步骤、接口和配置
+
+    :param step_body_list: 测试用例步骤，包含配置和接口
+    :param project_id: 项目id
+    :return: (步骤id映射, 接口id映射, 配置名称映射)
+    """
+    step_ids, api_ids, config_names = set(), set(), set()
+    for item in step_body_list:
+        body = item.get("body") or {}
+        if "case" in item.keys():
+            step_ids.add(item["id"])
+        elif body.get("method") == "config":
+            config_names.add(body.get("name"))
+        else:
+            api_ids.add(item["id"])
+
+    case_steps = models.CaseStep.objects.in_bulk(step_ids) if step_ids else {}
+    apis = models.API.objects.in_bulk(api_ids) if api_ids else {}
+    configs = {}
+    if config_names:
+        configs = {
+            config.name: config
+            for config in models.Config.objects.filter(
+                project_id=project_id, name__in=config_names
+            )
+        }
+    return case_steps, apis, configs
+
+
 def update_casestep(
     step_body_list: List,
     case_obj,
@@ -541,7 +591,7 @@ def update_casestep(
     updater,
 ):
     """
-    更新测试用例步骤
+    更新测试用例步骤，引用的数据批量查询，步骤批量更新和新增
 
     :param step_body_list: 测试用例步骤，包含配置和接口
     :param case_obj: 用例模型对象
@@ -549,7 +599,14 @@ def update_casestep(
     :param updater: 当前用户
     :return:
     """
-    step_list = list(models.CaseStep.objects.filter(case=case_obj).values("id"))
+    step_ids = set(
+        models.CaseStep.objects.filter(case=case_obj).values_list("id", flat=True)
+    )
+    case_steps, apis, configs = prefetch_casestep_sources(
+        step_body_list, case_obj.project_id
+    )
+    update_steps = []
+    create_steps = []
 
     for index, item in enumerate(step_body_list):
         try:
@@ -562,21 +619,16 @@ def update_casestep(
             method = format_http.method
         except KeyError:
             if "case" in item.keys():
-                try:
-                    case_step = models.CaseStep.objects.get(id=item["id"])
-                except ObjectDoesNotExist:
+                case_step = case_steps.get(item["id"])
+                if case_step is None:
                     raise CaseStepNotFound("指定的用例步骤不存在")
             elif item["body"]["method"] == "config":
-                try:
-                    case_step = models.Config.objects.get(
-                        name=item["body"]["name"], project_id=case_obj.project_id
-                    )
-                except ObjectDoesNotExist:
+                case_step = configs.get(item["body"]["name"])
+                if case_step is None:
                     raise ConfigNotFound("指定的配置不存在")
             else:
-                try:
-                    case_step = models.API.objects.get(id=item["id"])
-                except ObjectDoesNotExist:
+                case_step = apis.get(item["id"])
+                if case_step is None:
                     raise ApiNotFound("指定的接口不存在")
 
             new_body = literal_eval(case_step.body)
@@ -611,17 +663,23 @@ def update_casestep(
         }
         # is_copy 为 True表示用例步骤是复制的
         if "case" in item.keys() and item.pop("is_copy", False) is False:
-            models.CaseStep.objects.filter(id=item["id"]).update(
-                **kwargs, updater=updater
+            update_steps.append(
+                models.CaseStep(id=item["id"], **kwargs, updater=updater)
             )
-            step_list.remove({"id": item["id"]})
+            step_ids.discard(item["id"])
         else:
-            kwargs["case"] = case_obj
-            models.CaseStep.objects.create(**kwargs, creator=creator)
-
-    # 删除多余的step，获取需要删除的所有CaseStep id
-    step_id_list = [content["id"] for content in step_list]
-    # 使用一次查询进行更新
-    models.CaseStep.objects.filter(id__in=step_id_list).update(
-        is_deleted=True, update_time=timezone.now(), updater=updater
-    )
+            create_steps.append(
+                models.CaseStep(**kwargs, case=case_obj, creator=creator)
+            )
+
+    with transaction.atomic():
+        models.CaseStep.objects.bulk_update(
+            update_steps,
+            fields=[*CASESTEP_UPDATE_FIELDS, "updater"],
+            batch_size=100,
+        )
+        models.CaseStep.objects.bulk_create(create_steps, batch_size=100)
+        # 删除多余的step，使用一次查询进行更新
+        models.CaseStep.objects.filter(id__in=step_ids).update(
+            is_deleted=True, update_time=timezone.now(), updater=updater
+        )
@@ -10,15 +10,93 @@
 import logging
 import json
 
-from typing import Dict, Union
+from typing import Dict, List, Union
 
 import requests
 from django.conf import settings
+from requests.adapters import HTTPAdapter
 
+from apps.exceptions.error import NotifyError, NotifyRetryableError
 from lunarlink.utils.message_template import parse_message, qy_msg_template
 
 logger = logging.getLogger(__name__)
 
+_session = None
+
+# 企微返回的可以重试的错误码：系统繁忙、接口调用超过频率限制
+RETRYABLE_ERRCODES = {-1, 45009}
+
+
+def get_session() -> requests.Session:
+    """
+    获取进程内复用的webhook会话，避免每次发送都重新建立TCP/TLS连接
+
+    :return:
+    """
+    global _session
+    if _session is None:
+        pool_size = getattr(settings, "NOTIFY_POOL_SIZE", 10)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session = requests.Session()
+        session.headers.update({"Content-Type": "application/json"})
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _session = session
+    return _session
+
+
+def split_webhooks(webhook: str) -> List[str]:
+    """
+    拆分并去重webhook，多个机器人换行分隔
+
+    :param webhook:
+    :return:
+    """
+    webhooks = []
+    for url in webhook.split("\n"):
+        url = url.strip()
+        if url and url not in webhooks:
+            webhooks.append(url)
+    return webhooks
+
+
+def post_webhook(webhook: str, message: Dict):
+    """
+    向单个机器人发送消息
+
+    网络异常、服务端5xx和限流抛出NotifyRetryableError，可以重试；
+    其他错误(如webhook无效、消息格式错误)抛出NotifyError，重试也不会成功
+
+    :param webhook:
+    :param message:
+    :return:
+    """
+    timeout = getattr(settings, "NOTIFY_TIMEOUT", 5)
+    try:
+        resp = get_session().post(
+            url=webhook,
+            data=json.dumps(message).encode("utf-8"),
+            timeout=timeout,
+        )
+    except requests.RequestException as e:
+        raise NotifyRetryableError(f"请求的webhook是: {webhook}， 异常是：{e}") from e
+    if resp.status_code >= 500:
+        raise NotifyRetryableError(
+            f"请求的webhook是: {webhook}， 响应状态码是：{resp.status_code}"
+        )
+    try:
+        res = resp.json()
+    except ValueError as e:
+        raise NotifyError(
+            f"请求的webhook是: {webhook}， 响应状态码是：{resp.status_code}，异常是：{e}"
+        ) from e
+    errcode = res.get("errcode")
+    if errcode in RETRYABLE_ERRCODES:
+        raise NotifyRetryableError(f"请求的webhook是: {webhook}， 响应是：{res}")
+    if errcode != 0:
+        raise NotifyError(f"请求的webhook是: {webhook}， 响应是：{res}")
+    logger.info(f"发送通知成功，请求的webhook是: {webhook}")
+
 
 def send_message(summary: Union[Dict, str], webhook: str, **kwargs):
     """
@@ -29,18 +107,14 @@ def send_message(summary: Union[Dict, str], webhook: str, **kwargs):
     :param kwargs:
     :return:
     """
-    header = {"Content-Type": "application/json"}
-    webhooks = webhook.split("\n")  # 多个机器人，换行分隔
-    for webhook in webhooks:
-        parsed_data = parse_message(summary=summary, **kwargs)
-        message = qy_msg_template(**parsed_data)
-        res = requests.post(
-            url=webhook, headers=header, data=json.dumps(message).encode("utf-8")
-        ).json()
-        if res.get("errcode") == 0:
-            logger.info(f"发送通知成功，请求的webhook是: {webhook}")
-        else:
-            logger.error(f"发送通知失败，请求的webhook是: {webhook}， 响应是：{res}")
+    # 同一份报告的消息内容相同，只需渲染一次
+    parsed_data = parse_message(summary=summary, **kwargs)
+    message = qy_msg_template(**parsed_data)
+    for url in split_webhooks(webhook):
+        try:
+            post_webhook(webhook=url, message=message)
+        except NotifyError as e:
+            logger.error(f"发送通知失败，{e}")
 
 
 def send(msg: Dict, mentioned_list=None, mentioned_mobile_list=None):
@@ -64,7 +138,12 @@ def send(msg: Dict, mentioned_list=None, mentioned_mobile_list=None):
             "mentioned_mobile_list": mentioned_mobile_list,
         },
     }
-    res = requests.post(url=webhook, headers=header, json=data).json()
+    res = requests.post(
+        url=webhook,
+        headers=header,
+        json=data,
+        timeout=getattr(settings, "NOTIFY_TIMEOUT", 5),
+    ).json()
     if res.get("errcode") == 0:
         logger.info(f"发送通知成功，请求的webhook是: {webhook}")
     else:
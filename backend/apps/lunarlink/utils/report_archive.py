@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+@File    : report_archive.py
+@Time    : 2026/10/19 15:20
+@Author  : geekbing
+@LastEditTime : -
+@LastEditors : -
+@Description : 测试报告保留策略，过期报告详情归档和软删除报告清理
+"""
+import datetime
+import gzip
+import logging
+import os
+from ast import literal_eval
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from lunarlink import models
+
+logger = logging.getLogger(__name__)
+
+
+class ArchiveStorage:
+    """
+    归档存储基类
+
+    自定义存储(如对象存储)继承该类实现save、load、delete，
+    并通过REPORT_ARCHIVE_STORAGE配置类路径，类需要支持无参实例化
+    """
+
+    def save(self, key: str, content: bytes):
+        raise NotImplementedError
+
+    def load(self, key: str) -> bytes:
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+
+class LocalArchiveStorage(ArchiveStorage):
+    """本地磁盘归档存储"""
+
+    def __init__(self, storage_dir=None):
+        self.storage_dir = (
+            storage_dir
+            or settings.REPORT_RETENTION_SETTING["storage_dir"]
+            or os.path.join(settings.BASE_DIR, "report_archive")
+        )
+
+    def _get_path(self, key: str) -> str:
+        return os.path.join(self.storage_dir, *key.split("/"))
+
+    def save(self, key: str, content: bytes):
+        path = self._get_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写临时文件再替换，避免归档中断时留下不完整的文件
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as fp:
+            fp.write(content)
+        os.replace(tmp_path, path)
+
+    def load(self, key: str) -> bytes:
+        with open(self._get_path(key), "rb") as fp:
+            return fp.read()
+
+    def delete(self, key: str):
+        path = self._get_path(key)
+        if os.path.isfile(path):
+            os.remove(path)
+
+
+def get_archive_storage() -> ArchiveStorage:
+    """
+    按配置实例化归档存储
+
+    :return:
+    """
+    return import_string(settings.REPORT_RETENTION_SETTING["storage_class"])()
+
+
+def get_archive_key(report: models.Report) -> str:
+    """
+    归档文件路径，按项目和月份分目录
+
+    :param report:
+    :return:
+    """
+    return f"{report.project_id}/{report.create_time:%Y%m}/{report.id}.gz"
+
+
+def get_detail_text(report_id: int) -> Optional[str]:
+    """
+    报告详情文本，与ReportDetail.summary_detail格式一致，流式写入的报告按执行顺序拼接分片
+
+    :param report_id:
+    :return: 没有详情时返回None
+    """
+    report_detail = models.ReportDetail.objects.filter(report_id=report_id).first()
+    if report_detail:
+        return report_detail.summary_detail
+
+    chunks = list(
+        models.ReportDetailChunk.objects.filter(report_id=report_id)
+        .order_by("seq")
+        .values_list("summary_detail", flat=True)
+    )
+    if not chunks:
+        return None
+    return "[" + ", ".join(chunks) + "]"
+
+
+def archive_report(report: models.Report, storage: ArchiveStorage):
+    """
+    归档单个报告的详情，压缩写入存储后删除数据库中的详情
+
+    :param report:
+    :param storage:
+    :return:
+    """
+    detail_text = get_detail_text(report.id)
+    archive_key = None
+    if detail_text is not None:
+        archive_key = get_archive_key(report)
+        storage.save(archive_key, gzip.compress(detail_text.encode("utf-8")))
+
+    with transaction.atomic():
+        models.ReportDetail.objects.with_deleted().filter(report_id=report.id).delete()
+        models.ReportDetailChunk.objects.with_deleted().filter(
+            report_id=report.id
+        ).delete()
+        # 不调用save，避免触发pre_save信号
+        models.Report.objects.filter(id=report.id).update(
+            archived=True, archive_key=archive_key
+        )
+
+
+def load_archived_details(report: models.Report) -> Optional[List]:
+    """
+    读取已归档的报告详情
+
+    :param report:
+    :return: 没有归档文件时返回None
+    """
+    if not report.archive_key:
+        return None
+
+    try:
+        content = get_archive_storage().load(report.archive_key)
+    except FileNotFoundError:
+        logger.error(f"报告{report.id}的归档文件{report.archive_key}不存在")
+        return None
+    return literal_eval(gzip.decompress(content).decode("utf-8"))
+
+
+def archive_expired_reports() -> int:
+    """
+    按报告类型的保留天数归档过期的报告详情
+
+    :return: 归档的报告数量
+    """
+    setting = settings.REPORT_RETENTION_SETTING
+    batch_size = setting["batch_size"]
+    storage = get_archive_storage()
+    now = timezone.now()
+    count = 0
+    for report_type, days in setting["archive_after_days"].items():
+        if not days:
+            continue
+
+        queryset = models.Report.objects.filter(
+            type=report_type,
+            archived=False,
+            create_time__lt=now - datetime.timedelta(days=days),
+        ).only("id", "project", "create_time")
+        while True:
+            # 归档后的报告不再满足条件，每批都从头取
+            reports = list(queryset.order_by("id")[:batch_size])
+            if not reports:
+                break
+            for report in reports:
+                archive_report(report, storage)
+            count += len(reports)
+
+    logger.info(f"归档报告详情{count}条")
+    return count
+
+
+def purge_deleted_reports() -> int:
+    """
+    分批彻底删除超过保留天数的软删除报告，及其详情和归档文件
+
+    :return: 删除的报告数量
+    """
+    setting = settings.REPORT_RETENTION_SETTING
+    days = setting["purge_deleted_after_days"]
+    if not days:
+        return 0
+
+    batch_size = setting["batch_size"]
+    storage = None
+    queryset = models.Report.objects.with_deleted().filter(
+        is_deleted=True,
+        update_time__lt=timezone.now() - datetime.timedelta(days=days),
+    )
+    count = 0
+    while True:
+        reports = list(
+            queryset.order_by("id").values_list("id", "archive_key")[:batch_size]
+        )
+        if not reports:
+            break
+
+        report_ids = [report_id for report_id, _ in reports]
+        with transaction.atomic():
+            models.ReportDetail.objects.with_deleted().filter(
+                report_id__in=report_ids
+            ).delete()
+            models.ReportDetailChunk.objects.with_deleted().filter(
+                report_id__in=report_ids
+            ).delete()
+            models.Report.objects.with_deleted().filter(id__in=report_ids).delete()
+
+        for _, archive_key in reports:
+            if archive_key:
+                storage = storage or get_archive_storage()
+                storage.delete(archive_key)
+        count += len(reports)
+
+    logger.info(f"彻底删除软删除报告{count}条")
+    return count
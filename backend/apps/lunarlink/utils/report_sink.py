@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+@File    : report_sink.py
+@Time    : 2026/10/19 10:12
+@Author  : geekbing
+@LastEditTime : -
+@LastEditors : -
+@Description : 流式报告写入，用例执行过程中逐条保存报告详情
+"""
+import datetime
+import json
+import logging
+import threading
+import time
+from typing import Dict
+
+from django.utils import timezone
+
+from backend.utils.ws_connection_manager import MessageType, push_message
+from httprunner import report
+from lunarlink import models
+from lunarlink.utils.loader import parse_detail
+from lunarlink.utils.report_stats import get_report_stats
+
+logger = logging.getLogger(__name__)
+
+
+class ReportSink:
+    """
+    流式报告写入器
+
+    执行前创建报告，每条用例执行完成后把执行记录作为一个分片写入ReportDetailChunk，
+    并更新报告的统计信息，执行结束后写入汇总数据。
+    运行中断时已完成用例的记录仍然保留，可以查看部分报告。
+    """
+
+    def __init__(
+        self,
+        name,
+        project,
+        report_type=2,
+        user=None,
+        ci_metadata=None,
+        keep_records=False,
+    ):
+        """
+        :param name: 报告名称
+        :param project: 项目id
+        :param report_type: 报告类型
+        :param user: 创建人id
+        :param ci_metadata: gitlab-ci参数
+        :param keep_records: 写入后是否在内存中保留执行记录，调用方需要使用执行记录时开启
+        """
+        if not name:
+            name = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.name = name
+        self.project = project
+        self.report_type = report_type
+        self.user = user
+        self.ci_metadata = ci_metadata or {}
+        self.keep_records = keep_records
+        self.report_id = None
+
+        self._seq = 0
+        self._stat = {}
+        self._time = {}
+        self._timing_samples = {}
+        self._lock = threading.Lock()
+
+    def _get_running_fields(self) -> Dict:
+        """
+        执行中的summary和对应的报告字段
+
+        :return:
+        """
+        # 执行中的报告状态为失败，结束后再写入真实状态，分位数也在结束时统计
+        summary = {
+            "success": False,
+            "stat": self._stat,
+            "time": self._time,
+            "platform": report.get_platform(),
+            "timings": {},
+        }
+        return {
+            "summary": json.dumps(summary, ensure_ascii=False),
+            **get_report_stats(summary),
+        }
+
+    def open(self) -> int:
+        """
+        创建运行中的报告
+
+        :return: 报告id
+        """
+        self._time = {"start_at": time.time(), "duration": 0}
+        self._stat = {
+            "testsRun": 0,
+            "failures": 0,
+            "errors": 0,
+            "skipped": 0,
+            "expectedFailures": 0,
+            "unexpectedSuccesses": 0,
+            "successes": 0,
+        }
+        report_obj = models.Report.objects.create(
+            project_id=self.project,
+            name=self.name,
+            type=self.report_type,
+            status=False,
+            creator_id=self.user,
+            ci_metadata=self.ci_metadata,
+            ci_project_id=self.ci_metadata.get("ci_project_id"),
+            ci_job_id=self.ci_metadata.get("ci_job_id", None),
+            **self._get_running_fields(),
+        )
+        self.report_id = report_obj.id
+        return self.report_id
+
+    def write(self, testcase_summary: Dict):
+        """
+        写入一条用例的执行记录，由HttpRunner在每条用例执行完成后调用
+
+        :param testcase_summary: 单条用例的summary
+        :return:
+        """
+        parse_detail(testcase_summary)
+        with self._lock:
+            seq = self._seq
+            self._seq += 1
+            report.aggregate_stat(self._stat, testcase_summary["stat"])
+            report.aggregate_stat(self._time, testcase_summary.get("time", {}))
+            report.collect_timing_samples(
+                testcase_summary["records"], self._timing_samples
+            )
+            running_fields = self._get_running_fields()
+            stat = dict(self._stat)
+
+        models.ReportDetailChunk.objects.create(
+            report_id=self.report_id,
+            seq=seq,
+            summary_detail=testcase_summary,
+        )
+        models.Report.objects.filter(id=self.report_id).update(
+            update_time=timezone.now(),
+            **running_fields,
+        )
+
+        self.push_progress(stat)
+
+        if not self.keep_records:
+            # 记录已经持久化，释放内存
+            testcase_summary["records"] = []
+
+    def push_progress(self, stat: Dict, success=None):
+        """
+        推送运行进度给创建人，运行中的进度按时间窗口合并，结束时的进度立即推送
+
+        :param stat: 当前的统计数据
+        :param success: 运行结果，运行中为None
+        :return:
+        """
+        push_message(
+            self.user,
+            {
+                "type": MessageType.PROGRESS.value,
+                "report_id": self.report_id,
+                "stat": stat,
+                "finished": success is not None,
+                "success": success,
+            },
+            coalesce_key=f"report_{self.report_id}",
+            force=success is not None,
+        )
+
+    def fail(self, error: str):
+        """
+        运行异常中断时标记报告失败，保留已写入的分片和统计，并记录异常信息
+
+        :param error: 异常信息
+        :return:
+        """
+        with self._lock:
+            summary = {
+                "success": False,
+                "stat": self._stat,
+                "time": self._time,
+                "platform": report.get_platform(),
+                "timings": report.summarize_timing_samples(self._timing_samples),
+                "error": error,
+            }
+            stat = dict(self._stat)
+
+        models.Report.objects.filter(id=self.report_id).update(
+            status=False,
+            summary=json.dumps(summary, ensure_ascii=False),
+            update_time=timezone.now(),
+            **get_report_stats(summary),
+        )
+        self.push_progress(stat, success=False)
+
+    def finalize(self, summary: Dict) -> int:
+        """
+        写入最终的汇总数据
+
+        :param summary: 执行结束后的summary，details中的执行记录已经写入分片
+        :return: 报告id
+        """
+        if "success" not in summary:
+            # 节点下没有用例，没有产生执行结果，删除执行前创建的报告
+            models.Report.objects.filter(id=self.report_id).delete()
+            return None
+
+        summary = {key: value for key, value in summary.items() if key != "details"}
+        summary["timings"] = report.summarize_timing_samples(self._timing_samples)
+        models.Report.objects.filter(id=self.report_id).update(
+            status=summary["success"],
+            summary=json.dumps(summary, ensure_ascii=False),
+            update_time=timezone.now(),
+            **get_report_stats(summary),
+        )
+        self.push_progress(summary.get("stat", {}), success=summary["success"])
+        return self.report_id
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+@File    : report_stats.py
+@Time    : 2026/10/19 15:20
+@Author  : geekbing
+@LastEditTime : -
+@LastEditors : -
+@Description : 报告统计字段，报告列表直接读取统计字段，不再解析summary
+"""
+from typing import Dict, Optional
+
+
+def parse_number(value, convert=float):
+    """
+    解析查询参数中的数值，为空或格式不正确时返回None
+
+    :param value: 查询参数
+    :param convert: 转换函数，float或int
+    :return:
+    """
+    if value in (None, ""):
+        return None
+    try:
+        number = convert(value)
+    except (TypeError, ValueError):
+        return None
+    # 排除nan、inf
+    if number != number or number in (float("inf"), float("-inf")):
+        return None
+    return number
+
+
+def parse_case_fail_rate(case_fail_rate) -> Optional[float]:
+    """
+    用例失败率转换为百分比数值，"12.50%" => 12.5
+
+    :param case_fail_rate:
+    :return:
+    """
+    if case_fail_rate is None:
+        return None
+    if isinstance(case_fail_rate, str):
+        try:
+            return float(case_fail_rate.rstrip("%"))
+        except ValueError:
+            return None
+    return float(case_fail_rate)
+
+
+def get_report_stats(summary: Dict) -> Dict:
+    """
+    从summary中提取报告的统计字段，保存报告时写入Report对应的列
+
+    :param summary: 报告的summary，不包含details
+    :return:
+    """
+    stat = summary.get("stat", {})
+    time_info = summary.get("time", {})
+    return {
+        "tests_run": stat.get("testsRun", 0),
+        "successes": stat.get("successes", 0),
+        "failures": stat.get("failures", 0),
+        "errors": stat.get("errors", 0),
+        "skipped": stat.get("skipped", 0),
+        "case_count": stat.get("case_count"),
+        "case_fail_rate": parse_case_fail_rate(stat.get("case_fail_rate")),
+        "failure_cases": stat.get("failure_case_config_mapping_list"),
+        "duration": time_info.get("duration", 0),
+        "start_at": time_info.get("start_at"),
+        "platform": summary.get("platform", {}),
+    }
@@ -10,7 +10,6 @@
 import logging
 import json
 import re
-from collections import defaultdict
 from enum import IntEnum
 from typing import Any, Dict, List, Tuple, Union, Set
 
@@ -23,11 +22,22 @@ from apps.schema.testcase_schema import RecordCaseSchema, APIBodySchema
 from lunarlink.models import API
 from lunarlink.utils.enums.RequestBodyEnum import BodyType
 from lunarlink.utils.parser import Format
+from lunarlink.utils.request.value_index import ValueIndex
 
 
 logger = logging.getLogger(__name__)
 
 
+# 子串替换的最小长度，过短的值(如状态码、分页参数)容易误匹配
+SUBSTRING_MIN_LENGTH = 8
+
+# 子串替换的最大长度，token、id等值都较短，过长的值(如整段响应文本)会让匹配用的自动机占用大量内存
+SUBSTRING_MAX_LENGTH = 256
+
+# 嵌入在字符串中的变量 ${http_res_INDEX_variable::path}
+EMBEDDED_VARIABLE_PATTERN = re.compile(r"\$\{http_res_(\d+)_([^{}]*?)::([^{}]+)\}")
+
+
 class CaseTag(IntEnum):
     INTEGRATION_CASE = 2
 
@@ -95,6 +105,29 @@ class CaseGenerator:
             return "http_res_" + idx, full_variable, path
         return None
 
+    @staticmethod
+    def replace_embedded_variables(input_string: str, api_info_map: Dict) -> str:
+        """
+        替换嵌入在字符串中的 ${http_res_INDEX_variable::path} 变量为 ${http_res_INDEX_variable}，
+        并在对应接口中加入 extract
+
+        :param input_string:
+        :param api_info_map: 全部接口的请求信息和接口名的映射
+        :return: 替换后的字符串
+        """
+        if not isinstance(input_string, str):
+            return input_string
+
+        def replace(match):
+            idx, var_name, path = match.groups()
+            full_variable = "http_res_" + idx + "_" + var_name
+            CaseGenerator.add_extract(
+                api_info_map, "http_res_" + idx, full_variable, path
+            )
+            return "${" + full_variable + "}"
+
+        return EMBEDDED_VARIABLE_PATTERN.sub(replace, input_string)
+
     @staticmethod
     def generate_case(
         length: int,
@@ -142,6 +175,9 @@ class CaseGenerator:
 
         # 遍历所有接口，将 htt_res_1_token 的值 content.token 加入 extract
         for api_name, request_data in api_info_map.items():
+            request_data["url"] = CaseGenerator.replace_embedded_variables(
+                request_data["url"], api_info_map
+            )
             for headers_key, headers_value in request_data["header"]["header"].items():
                 CaseGenerator.append_extract(
                     request_data, api_info_map, headers_key, headers_value, "headers"
@@ -266,16 +302,40 @@ class CaseGenerator:
                 CaseGenerator.replace_faster_json(request_data, item_key, variables)
             elif request_type == "params":
                 CaseGenerator.replace_faster_params(request_data, item_key, variables)
-            if api_name in api_info_map:
-                if {extract_var_name: extract_var_path} not in api_info_map[api_name][
-                    "extract"
-                ]["extract"]:
-                    api_info_map[api_name]["extract"]["extract"].append(
-                        {extract_var_name: extract_var_path}
-                    )
-                    api_info_map[api_name]["extract"]["desc"].update(
-                        {extract_var_name: ""}
-                    )
+            CaseGenerator.add_extract(
+                api_info_map, api_name, extract_var_name, extract_var_path
+            )
+        elif isinstance(item_value, str) and "${http_res_" in item_value:
+            new_value = CaseGenerator.replace_embedded_variables(
+                item_value, api_info_map
+            )
+            if request_type == "headers":
+                request_data["header"]["header"][item_key] = new_value
+            elif request_type == "form":
+                request_data["request"]["form"]["data"][item_key] = new_value
+            elif request_type == "json":
+                request_data["request"]["json"][item_key] = new_value
+            elif request_type == "params":
+                request_data["request"]["params"]["params"][item_key] = new_value
+
+    @staticmethod
+    def add_extract(
+        api_info_map: Dict, api_name: str, extract_var_name: str, extract_var_path: str
+    ):
+        """
+        在被引用的接口中加入 extract
+
+        :param api_info_map: 全部接口的请求信息和接口名的映射
+        :param api_name: 被引用的接口名, http_res_1
+        :param extract_var_name: 变量名
+        :param extract_var_path: 变量路径
+        :return:
+        """
+        if api_name in api_info_map:
+            extract = api_info_map[api_name]["extract"]
+            if extract_var_name not in extract["desc"]:
+                extract["extract"].append({extract_var_name: extract_var_path})
+                extract["desc"].update({extract_var_name: ""})
 
     @staticmethod
     def replace_faster_form(request_data: Dict, var_name: str, variables: Tuple):
@@ -326,7 +386,11 @@ class CaseGenerator:
         :param requests: 录制流量接口信息
         :return:
         """
-        value_to_path_map: Dict = defaultdict(list)  # 变量值到路径的映射 {变量值: [变量路径, ...], ...}
+        # 变量值到路径的倒排索引 {变量值: (接口序号, 变量路径)}
+        value_index = ValueIndex(
+            substring_min_length=SUBSTRING_MIN_LENGTH,
+            substring_max_length=SUBSTRING_MAX_LENGTH,
+        )
         replaced = []  # 替换记录
         for i, item in enumerate(requests):
             if "Content-Length" in item.request_headers:
@@ -334,39 +398,43 @@ class CaseGenerator:
             if "Content-Type" in item.response_headers:
                 item.response_headers.pop("Content-Type")
             # 记录变量
+            value_index.request_index = i
             CaseGenerator.record_vars(
                 request=item,
-                value_to_path_map=value_to_path_map,
+                value_index=value_index,
                 var_name=f"http_res_{i + 1}",
             )
+
+        # 接口变量替换，只引用之前接口响应中的变量
+        for i, item in enumerate(requests):
             if i > 0:
-                # 接口变量替换
-                CaseGenerator.replace_vars(item, value_to_path_map, replaced)
+                value_index.request_index = i
+                CaseGenerator.replace_vars(item, value_index, replaced)
         return replaced
 
     @staticmethod
-    def replace_vars(request: RequestInfo, value_to_path_map: Dict, replaced: List):
+    def replace_vars(request: RequestInfo, value_index: ValueIndex, replaced: List):
         """
         替换变量
 
         :param request: 录制流量接口
-        :param value_to_path_map: 记录变量值, {变量值: [变量路径, ...], ...}
+        :param value_index: 变量值到路径的倒排索引
         :param replaced: 替换记录
         :return:
         """
         # 提取响应内容和响应头部中的所有值
         response_values = CaseGenerator.extract_response_values(request)
 
-        CaseGenerator.replace_url(request, value_to_path_map, replaced, response_values)
+        CaseGenerator.replace_url(request, value_index, replaced, response_values)
         CaseGenerator.replace_headers(
             request,
-            value_to_path_map,
+            value_index,
             replaced,
             response_values,
         )
         CaseGenerator.replace_body(
             request,
-            value_to_path_map,
+            value_index,
             replaced,
             response_values,
         )
@@ -434,7 +502,7 @@ class CaseGenerator:
     @staticmethod
     def replace_path_segments(
         path_with_domain: str,
-        value_to_path_map: Dict,
+        value_index: ValueIndex,
         replaced: List,
         response_values: Set,
     ):
@@ -443,7 +511,7 @@ class CaseGenerator:
 
         :param replaced:
         :param path_with_domain: 域名和路径组合的字符串。
-        :param value_to_path_map: 一个映射字典，用于替换路径中的变量。
+        :param value_index: 一个映射字典，用于替换路径中的变量。
         :param replaced: 记录替换详情的列表
         :param response_values: request_headers和request_content响应值集合
         :return: 替换后的路径段落列表。
@@ -452,18 +520,20 @@ class CaseGenerator:
         domain_and_path_list = path_with_domain.split("/")
         for segment in domain_and_path_list:
             # 检查当前字段是否是自身响应中的值，如果是则跳过
-            if segment.lower() in value_to_path_map and segment not in response_values:
-                new_segment = value_to_path_map[segment.lower()][0]
+            new_segment = value_index.get_path(segment.lower())
+            if new_segment and segment not in response_values:
                 new_url.append(new_segment)
                 replaced.append(f"{segment} => ${new_segment}")
             else:
-                new_url.append(segment)
+                new_url.append(
+                    value_index.replace_substrings(segment, response_values, replaced)
+                )
         return new_url
 
     @staticmethod
     def replace_query_parameters(
         query_params: List[str],
-        value_to_path_map: Dict,
+        value_index: ValueIndex,
         replaced: List,
         response_values: Set,
     ):
@@ -471,7 +541,7 @@ class CaseGenerator:
         替换查询参数中的值
 
         :param query_params: 查询参数列表。
-        :param value_to_path_map: 一个映射字典，用于替换查询参数的值。
+        :param value_index: 一个映射字典，用于替换查询参数的值。
         :param replaced: 替换后的路径段落列表。
         :return: 替换后的查询参数字符串列表。
         :param response_values: request_headers和request_content响应值集合
@@ -480,15 +550,15 @@ class CaseGenerator:
         for param in query_params:
             param_name, param_value = param.split("=")
             # 检查当前查询参数值是否是自身响应中的值，如果是则跳过
-            if (
-                param_value.lower() in value_to_path_map
-                and param_value not in response_values
-            ):
-                new_param_value = value_to_path_map[param_value.lower()][0]
+            new_param_value = value_index.get_path(param_value.lower())
+            if new_param_value and param_value not in response_values:
                 new_query.append(f"{param_name}=${new_param_value}")
                 replaced.append(f"{param_value} => ${new_param_value}")
             else:
-                new_query.append(param)
+                new_param_value = value_index.replace_substrings(
+                    param_value, response_values, replaced
+                )
+                new_query.append(f"{param_name}={new_param_value}")
         return new_query
 
     @staticmethod
@@ -506,7 +576,7 @@ class CaseGenerator:
     @staticmethod
     def replace_url(
         request: RequestInfo,
-        value_to_path_map: Dict,
+        value_index: ValueIndex,
         replaced: List,
         response_values: Set,
     ):
@@ -514,7 +584,7 @@ class CaseGenerator:
         替换请求对象中的URL路径和查询参数。
 
         :param request: 包含原始URL的请求对象。
-        :param value_to_path_map: 一个映射字典，用于替换URL的路径和查询参数中的值。
+        :param value_index: 一个映射字典，用于替换URL的路径和查询参数中的值。
         :param replaced: 记录替换详情的列表。
         :param response_values: request_headers和request_content响应值集合
         :return: None。函数直接修改传入的请求对象中的URL属性。
@@ -523,13 +593,13 @@ class CaseGenerator:
 
         new_url = CaseGenerator.replace_path_segments(
             path_with_domain,
-            value_to_path_map,
+            value_index,
             replaced,
             response_values,
         )
         new_query = CaseGenerator.replace_query_parameters(
             query_params,
-            value_to_path_map,
+            value_index,
             replaced,
             response_values,
         )
@@ -539,7 +609,7 @@ class CaseGenerator:
     @staticmethod
     def replace_headers(
         request: RequestInfo,
-        value_to_path_map: Dict,
+        value_index: ValueIndex,
         replaced: List,
         response_values: Set,
     ):
@@ -547,23 +617,29 @@ class CaseGenerator:
         替换请求接口中的request_headers。
 
         :param request: 包含原始request_headers的请求对象。
-        :param value_to_path_map: 一个映射字典，用于替换request_headers的值。
+        :param value_index: 一个映射字典，用于替换request_headers的值。
         :param replaced: 记录替换详情的列表。
         :param response_values: 从响应内容和头部中提取的所有值的集合。
         :return: None。函数直接修改传入的请求对象中的request_headers属性。
         """
         for header_key, header_value in list(request.request_headers.items()):
             if header_value not in response_values:
-                replacement = value_to_path_map.get(header_value)
-                if replacement:
-                    new_header_value = replacement[0]
+                new_header_value = value_index.get_path(header_value)
+                if new_header_value:
                     request.request_headers[header_key] = f"${new_header_value}"
                     replaced.append(f"{header_key} => ${new_header_value}")
+                else:
+                    # 值的一部分引用了变量，如 Authorization: Bearer {token}
+                    request.request_headers[
+                        header_key
+                    ] = value_index.replace_substrings(
+                        header_value, response_values, replaced
+                    )
 
     @staticmethod
     def replace_body(
         request: RequestInfo,
-        value_to_path_map: Dict,
+        value_index: ValueIndex,
         replaced: List,
         response_values: Set,
     ):
@@ -571,7 +647,7 @@ class CaseGenerator:
         替换请求接口中的body。
 
         :param request: 包含原始body的请求对象。
-        :param value_to_path_map: 一个映射字典，用于替换body的值。，{变量值: [变量路径, ...],...}
+        :param value_index: 变量值到路径的倒排索引，用于替换body的值。
         :param replaced: 记录替换详情的列表。
         :param response_values: 从响应内容和头部中提取的所有值的集合。
         :return: None。函数直接修改传入的请求对象中的body属性。
@@ -582,13 +658,13 @@ class CaseGenerator:
                 replaced_non_str_variables = []  # 非字符串变量替换路径
                 CaseGenerator.dfs_replace(
                     request_body,
-                    value_to_path_map,
+                    value_index,
                     replaced_non_str_variables,
                     replaced,
                     response_values,
                 )
                 result = json.dumps(request_body, ensure_ascii=False)
-                for v in replaced_non_str_variables:
+                for v in set(replaced_non_str_variables):
                     result = result.replace(f"'{v}'", f"{v}")
                 request.body = result
             except json.JSONDecodeError:
@@ -599,7 +675,7 @@ class CaseGenerator:
     @staticmethod
     def _dfs_replace_dict(
         request_dict: Dict,
-        value_to_path_map: Dict,
+        value_index: ValueIndex,
         replaced_non_str_variables: List,
         replaced: List,
         response_values: Set,
@@ -608,7 +684,7 @@ class CaseGenerator:
         递归地替换字典中的变量。
 
         :param request_dict: 要处理的请求体字典。
-        :param value_to_path_map: 存储变量替换信息的字典。
+        :param value_index: 存储变量替换信息的字典。
         :param replaced_non_str_variables: 存储被替换的非字符串变量。
         :param replaced: 存储所有替换操作的列表。
         :param response_values: 从响应内容和头部中提取的所有值的集。
@@ -617,7 +693,7 @@ class CaseGenerator:
         for key, value in request_dict.items():
             is_str, new_value = CaseGenerator.dfs_replace(
                 value,
-                value_to_path_map,
+                value_index,
                 replaced_non_str_variables,
                 replaced,
                 response_values,
@@ -631,7 +707,7 @@ class CaseGenerator:
     @staticmethod
     def _dfs_replace_list(
         request_list: List,
-        value_to_path_map: Dict,
+        value_index: ValueIndex,
         replaced_non_str_variables: List,
         replaced: List,
         response_values: Set,
@@ -640,7 +716,7 @@ class CaseGenerator:
         递归地替换列表中的变量。
 
         :param request_list: 要处理的请求体列表。
-        :param value_to_path_map: 存储变量替换信息的字典。
+        :param value_index: 存储变量替换信息的字典。
         :param replaced_non_str_variables: 存储被替换的非字符串变量。
         :param replaced: 存储所有替换操作的列表。
         :param response_values: 响应体中的值，这些值不应被替换。
@@ -649,7 +725,7 @@ class CaseGenerator:
         for i, item in enumerate(request_list):
             is_str, new_value = CaseGenerator.dfs_replace(
                 item,
-                value_to_path_map,
+                value_index,
                 replaced_non_str_variables,
                 replaced,
                 response_values,
@@ -660,12 +736,12 @@ class CaseGenerator:
                     replaced_non_str_variables.append(f"${new_value}")
 
     @staticmethod
-    def _dfs_replace_value(value, value_to_path_map, replaced, response_values):
+    def _dfs_replace_value(value, value_index, replaced, response_values):
         """
         替换基本数据类型的值。
 
         :param value: 要替换的值。
-        :param value_to_path_map: 存储变量替换信息的字典。
+        :param value_index: 存储变量替换信息的字典。
         :param replaced: 存储所有替换操作的列表。
         :param response_values: 响应体中的值，这些值不应被替换。
         :return: 替换结果和是否为字符串的标志。
@@ -674,8 +750,8 @@ class CaseGenerator:
         value_str = str(value) if not isinstance(value, str) else value
 
         # 如果这个值在映射中并且不在响应值中，使用映射中的新值进行替换
-        if value_str in value_to_path_map and value_str not in response_values:
-            new_value = value_to_path_map[value_str][0]
+        new_value = value_index.get_path(value_str)
+        if new_value and value_str not in response_values:
             replaced.append(f"{value_str} => ${new_value}")
             # 返回替换状态和新值，非字符串类型的变量也记录在replaced_non_str_variables中
             return not isinstance(value, str), new_value
@@ -685,7 +761,7 @@ class CaseGenerator:
     @staticmethod
     def dfs_replace(
         request_body: Any,
-        value_to_path_map: Dict,
+        value_index: ValueIndex,
         replaced_non_str_variables: List,
         replaced: List,
         response_values: Set,
@@ -694,7 +770,7 @@ class CaseGenerator:
         对请求体进行深度优先遍历，替换其中的变量。
 
         :param request_body: 请求体，可能是字典、列表或基本数据类型。
-        :param value_to_path_map: 存储变量替换信息的字典。
+        :param value_index: 存储变量替换信息的字典。
         :param replaced_non_str_variables: 存储被替换的非字符串变量。
         :param replaced: 存储所有替换操作的列表。
         :param response_values: 从响应内容和头部中提取的所有值的集。
@@ -705,7 +781,7 @@ class CaseGenerator:
         if isinstance(request_body, dict):
             CaseGenerator._dfs_replace_dict(
                 request_body,
-                value_to_path_map,
+                value_index,
                 replaced_non_str_variables,
                 replaced,
                 response_values,
@@ -714,7 +790,7 @@ class CaseGenerator:
         elif isinstance(request_body, list):
             CaseGenerator._dfs_replace_list(
                 request_body,
-                value_to_path_map,
+                value_index,
                 replaced_non_str_variables,
                 replaced,
                 response_values,
@@ -723,35 +799,35 @@ class CaseGenerator:
         else:
             return CaseGenerator._dfs_replace_value(
                 request_body,
-                value_to_path_map,
+                value_index,
                 replaced,
                 response_values,
             )
 
     @staticmethod
-    def record_vars(request: RequestInfo, value_to_path_map: Dict, var_name: str):
+    def record_vars(request: RequestInfo, value_index: ValueIndex, var_name: str):
         """
         记录变量
         :param request: 录制流量的接口信息
-        :param value_to_path_map: 变量值到路径的映射 {变量值: [变量路径, ...], ...}
+        :param value_index: 变量值到路径的倒排索引
         :param var_name: http_res_{i + 1}
         :return:
         """
         CaseGenerator.split_headers(
             request,
-            value_to_path_map,
+            value_index,
             var_name,
         )
         CaseGenerator.split_body(
             request,
-            value_to_path_map,
+            value_index,
             var_name,
         )
 
     @staticmethod
     def split_headers(
         request: RequestInfo,
-        value_to_path_map: Dict,
+        value_index: ValueIndex,
         var_name: str = "",
         header_path_prefix: str = "headers",
     ):
@@ -759,7 +835,7 @@ class CaseGenerator:
         分析和记录请求头中的变量及其对应的路径。
 
         :param request: 包含响应头的请求信息对象。
-        :param value_to_path_map: 一个映射，将变量值映射到其在请求中的路径。
+        :param value_index: 一个映射，将变量值映射到其在请求中的路径。
         :param var_name: 用于变量提取的基本名称。
         :param header_path_prefix: 用于变量路径的前缀。
         :return:
@@ -769,7 +845,7 @@ class CaseGenerator:
                 request.response_headers,
                 var_name,
                 header_path_prefix,
-                value_to_path_map,
+                value_index,
                 headers=True,
             )
         except Exception as e:
@@ -778,7 +854,7 @@ class CaseGenerator:
     @staticmethod
     def split_body(
         request: RequestInfo,
-        value_to_path_map: Dict,
+        value_index: ValueIndex,
         var_name: str = "",
         content_path_prefix: str = "content",
     ):
@@ -786,7 +862,7 @@ class CaseGenerator:
         分析和记录请求体中的变量及其对应的路径。
 
         :param request: 包含响应内容的请求信息对象。
-        :param value_to_path_map: 一个映射，将变量值映射到其在请求中的路径。
+        :param value_index: 一个映射，将变量值映射到其在请求中的路径。
         :param var_name: 用于变量提取的基本名称。
         :param content_path_prefix: 用于变量路径的前缀。
         :return:
@@ -798,7 +874,7 @@ class CaseGenerator:
                     body=body,
                     var_name=var_name,
                     var_path=content_path_prefix,
-                    value_to_path_map=value_to_path_map,
+                    value_index=value_index,
                 )
             except json.JSONDecodeError:
                 # body不是JSON，跳过
@@ -811,7 +887,7 @@ class CaseGenerator:
         body_dict,
         var_name,
         var_path,
-        value_to_path_map,
+        value_index,
         headers,
     ):
         """
@@ -820,38 +896,38 @@ class CaseGenerator:
         :param body_dict:
         :param var_name:
         :param var_path:
-        :param value_to_path_map:
+        :param value_index:
         :param headers:
         :return:
         """
         for key, value in body_dict.items():
             c_name = f"{var_name}_{key}"
             c_path = f"{var_path}.{key}"
-            CaseGenerator.dfs(value, c_name, c_path, value_to_path_map, headers)
+            CaseGenerator.dfs(value, c_name, c_path, value_index, headers)
 
     @staticmethod
-    def dfs_list(body_list, var_name, var_path, value_to_path_map, headers):
+    def dfs_list(body_list, var_name, var_path, value_index, headers):
         """
         递归地遍历响应的头部或内容，提取并记录变量及其路径。
 
         :param body_list:
         :param var_name:
         :param var_path:
-        :param value_to_path_map:
+        :param value_index:
         :param headers:
         :return:
         """
         for i, item in enumerate(body_list):
             c_name = f"{var_name}_{i}"
             c_path = f"{var_path}.{i}"
-            CaseGenerator.dfs(item, c_name, c_path, value_to_path_map, headers)
+            CaseGenerator.dfs(item, c_name, c_path, value_index, headers)
 
     @staticmethod
     def process_basic_type(
         value,
         var_name,
         var_path,
-        value_to_path_map,
+        value_index,
         headers,
     ):
         """
@@ -860,7 +936,7 @@ class CaseGenerator:
         :param value:
         :param var_name:
         :param var_path:
-        :param value_to_path_map:
+        :param value_index:
         :param headers:
         :return:
         """
@@ -869,16 +945,16 @@ class CaseGenerator:
             # 如果是bool值，需要特殊处理一下，因为Python get False/True会变成get 0 1
             if value is not None:
                 if isinstance(value, bool):
-                    value_to_path_map[str(value)].append(var_name_path)
+                    value_index.add(str(value), var_name_path)
                 else:
-                    value_to_path_map[value].append(var_name_path)
+                    value_index.add(value, var_name_path)
 
     @staticmethod
     def dfs(
         body: Any,
         var_name: str,
         var_path: str,
-        value_to_path_map: Dict,
+        value_index: ValueIndex,
         headers: bool = False,
     ):
         """
@@ -887,7 +963,7 @@ class CaseGenerator:
         :param body: 可能是响应头或响应内容的部分，可以是字典或列表。
         :param var_name: 当前变量的名称。
         :param var_path: 当前变量的提取路径。
-        :param value_to_path_map: 变量到路径的映射。
+        :param value_index: 变量到路径的映射。
         :param headers: 指示当前处理的是否是响应头。
         :return:
         """
@@ -896,7 +972,7 @@ class CaseGenerator:
                 body,
                 var_name,
                 var_path,
-                value_to_path_map,
+                value_index,
                 headers,
             )
         elif isinstance(body, dict):
@@ -904,7 +980,7 @@ class CaseGenerator:
                 body,
                 var_name,
                 var_path,
-                value_to_path_map,
+                value_index,
                 headers,
             )
         else:
@@ -912,6 +988,6 @@ class CaseGenerator:
                 body,
                 var_name,
                 var_path,
-                value_to_path_map,
+                value_index,
                 headers,
             )
@@ -7,11 +7,365 @@
 @LastEditors : -
 @Description : request转化器，支持har
 """
-from typing import List
+import base64
+import codecs
+import json
+import re
+import time
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+from apps.exceptions.convert import HarConvertError
 from apps.schema.request import RequestInfo
 
+# 每次从文件读取的字节数
+READ_SIZE = 1024 * 1024
+
+# json数字中可能出现的字符
+NUMBER_CHARS = "0123456789+-.eE"
+
+# 静态资源的后缀
+STATIC_SUFFIXES = (
+    ".js",
+    ".css",
+    ".map",
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".gif",
+    ".svg",
+    ".ico",
+    ".webp",
+    ".bmp",
+    ".woff",
+    ".woff2",
+    ".ttf",
+    ".otf",
+    ".eot",
+    ".mp3",
+    ".mp4",
+    ".webm",
+    ".html",
+    ".htm",
+)
+
+# 浏览器导出har时标记的静态资源类型
+STATIC_RESOURCE_TYPES = {
+    "document",
+    "stylesheet",
+    "script",
+    "image",
+    "font",
+    "media",
+    "manifest",
+    "texttrack",
+}
+
+# 静态资源的响应类型
+STATIC_MIME_PREFIXES = (
+    "image/",
+    "font/",
+    "audio/",
+    "video/",
+    "text/css",
+    "text/html",
+    "text/javascript",
+    "application/javascript",
+    "application/x-javascript",
+    "application/font",
+)
+
+
+class HarReader:
+    """
+    流式读取har文件的entries，每次只解码一个entry，内存占用与单个entry的大小相关
+
+    har格式：{"log": {"version": ..., "pages": [...], "entries": [{...}, ...]}}
+    """
+
+    def __init__(self, file, read_size: int = READ_SIZE):
+        """
+        :param file: 以二进制方式打开的文件或上传的文件
+        :param read_size: 每次读取的字节数
+        """
+        self._file = file
+        self._read_size = read_size
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _read(self, size: int) -> bool:
+        """
+        读取更多内容到缓冲区，已处理的部分从缓冲区中丢弃
+
+        :param size: 读取的字节数
+        :return: 文件已读完时返回False
+        """
+        if self._eof:
+            return False
+
+        # gevent工作进程中让出执行权，解析大文件时不阻塞同一进程的其他请求和心跳
+        time.sleep(0)
+        chunk = self._file.read(size)
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        self._eof = not chunk
+        try:
+            text = self._text_decoder.decode(chunk, final=self._eof)
+        except UnicodeDecodeError as e:
+            raise HarConvertError(f"har文件不是utf-8编码: {e}")
+        self._buffer = self._buffer[self._pos :] + text
+        self._pos = 0
+        return not self._eof or bool(text)
+
+    def _skip_whitespace(self):
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos].isspace():
+                self._pos += 1
+            if self._pos < len(self._buffer) or not self._read(self._read_size):
+                return
+
+    def _peek(self) -> str:
+        self._skip_whitespace()
+        if self._pos >= len(self._buffer):
+            raise HarConvertError("har文件不完整")
+        return self._buffer[self._pos]
+
+    def _expect(self, char: str):
+        if self._peek() != char:
+            raise HarConvertError(f"har文件格式错误，位置{self._pos}应为{char}")
+        self._pos += 1
+
+    def _decode(self) -> Any:
+        """
+        解码缓冲区中的下一个json值，内容不完整时继续读取，每次读取量翻倍，避免大entry反复解码
+
+        :return:
+        """
+        self._skip_whitespace()
+        read_size = self._read_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as e:
+                if not self._read(read_size):
+                    raise HarConvertError(f"har文件格式错误: {e}")
+                read_size *= 2
+                continue
+            # 数字可能在缓冲区末尾被截断，如1.5e10只读到1.5，读到数字之后的字符再确认
+            if self._eof or not self._is_number_cut(value, end):
+                self._pos = end
+                return value
+            self._read(read_size)
+
+    def _is_number_cut(self, value: Any, end: int) -> bool:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return False
+        return end >= len(self._buffer) or self._buffer[end] in NUMBER_CHARS
+
+    def _iter_object(self) -> Iterator[str]:
+        """
+        遍历对象的键，调用方需要在下一次迭代前处理掉对应的值
+
+        :return:
+        """
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self._decode()
+            if not isinstance(key, str):
+                raise HarConvertError("har文件格式错误，对象的键应为字符串")
+            self._expect(":")
+            yield key
+            char = self._peek()
+            self._pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise HarConvertError(f"har文件格式错误，位置{self._pos}应为,或}}")
+
+    def _iter_array(self) -> Iterator[Any]:
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        while True:
+            yield self._decode()
+            char = self._peek()
+            self._pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise HarConvertError(f"har文件格式错误，位置{self._pos}应为,或]")
+
+    def __iter__(self) -> Iterator[Dict]:
+        for key in self._iter_object():
+            if key != "log":
+                self._decode()
+                continue
+            for log_key in self._iter_object():
+                if log_key != "entries":
+                    self._decode()
+                    continue
+                for entry in self._iter_array():
+                    yield entry
+
 
 class Convertor:
     @staticmethod
-    def convert(file, regex: str = None) -> List[RequestInfo]:
-        raise NotImplementedError
+    def is_static(entry: Dict) -> bool:
+        """
+        是否是静态资源请求，按浏览器标记的资源类型、url后缀、响应类型判断
+
+        :param entry: har的entry
+        :return:
+        """
+        resource_type = (entry.get("_resourceType") or "").lower()
+        if resource_type in STATIC_RESOURCE_TYPES:
+            return True
+
+        path = urlparse(entry["request"].get("url", "")).path.lower()
+        if path.endswith(STATIC_SUFFIXES):
+            return True
+
+        content = entry.get("response", {}).get("content") or {}
+        mime_type = (content.get("mimeType") or "").lower()
+        return mime_type.startswith(STATIC_MIME_PREFIXES)
+
+    @staticmethod
+    def get_headers(headers: List[Dict]) -> Dict:
+        """
+        har的headers列表转成字典，忽略HTTP/2的伪头部(:authority等)
+
+        :param headers:
+        :return:
+        """
+        return {
+            header["name"]: header.get("value", "")
+            for header in headers or []
+            if not header["name"].startswith(":")
+        }
+
+    @staticmethod
+    def get_cookies(cookies: List[Dict]) -> Dict:
+        return {cookie["name"]: cookie.get("value", "") for cookie in cookies or []}
+
+    @staticmethod
+    def get_body(request: Dict) -> str:
+        """
+        请求body，与录制时RequestInfo.get_body的格式一致
+
+        :param request: har的request
+        :return:
+        """
+        post_data = request.get("postData") or {}
+        mime_type = (post_data.get("mimeType") or "").lower()
+        text = post_data.get("text") or ""
+        if "x-www-form-urlencoded" in mime_type and post_data.get("params"):
+            return json.dumps(
+                {
+                    param["name"]: param.get("value", "")
+                    for param in post_data["params"]
+                }
+            )
+        if "json" in mime_type and text:
+            return RequestInfo.translate_json(text)
+        return text
+
+    @staticmethod
+    def get_response_content(response: Dict, max_content_length: int) -> str:
+        """
+        响应内容，非文本的响应和超过长度限制的响应不保留
+
+        :param response: har的response
+        :param max_content_length: 响应内容的最大长度
+        :return:
+        """
+        content = response.get("content") or {}
+        mime_type = (content.get("mimeType") or "").lower()
+        text = content.get("text") or ""
+        if not text or len(text) > max_content_length:
+            return ""
+        if content.get("encoding") == "base64":
+            try:
+                text = base64.b64decode(text).decode("utf-8")
+            except (ValueError, UnicodeDecodeError):
+                return ""
+        if "json" in mime_type:
+            return RequestInfo.translate_json(text)
+        return text
+
+    @staticmethod
+    def to_request_info(entry: Dict, max_content_length: int) -> RequestInfo:
+        """
+        har的entry转成RequestInfo
+
+        :param entry:
+        :param max_content_length: 响应内容的最大长度，为0时不保留响应内容
+        :return:
+        """
+        request = entry["request"]
+        response = entry.get("response") or {}
+        return RequestInfo(
+            url=request["url"],
+            body=Convertor.get_body(request),
+            request_method=request.get("method", "GET").upper(),
+            request_headers=Convertor.get_headers(request.get("headers")),
+            response_headers=Convertor.get_headers(response.get("headers")),
+            cookies=Convertor.get_cookies(response.get("cookies")),
+            request_cookies=Convertor.get_cookies(request.get("cookies")),
+            response_content=Convertor.get_response_content(
+                response, max_content_length
+            ),
+            status_code=response.get("status") or 0,
+        )
+
+    @staticmethod
+    def convert(
+        file,
+        regex: str = None,
+        max_content_length: int = 256 * 1024,
+        max_requests: Optional[int] = None,
+        max_total_content_length: Optional[int] = None,
+    ) -> Iterator[RequestInfo]:
+        """
+        流式解析har文件，按顺序返回匹配regex的非静态资源请求
+
+        :param file: 以二进制方式打开的har文件或上传的文件
+        :param regex: 过滤url的正则表达式，为空时不过滤
+        :param max_content_length: 响应内容的最大长度，超过时不保留响应内容
+        :param max_requests: 最多返回的请求数量，超过时抛出HarConvertError
+        :param max_total_content_length: 保留的响应内容总长度，用完后之后的请求不再保留响应内容，
+            调用方一次性保存所有请求时限制内存占用
+        :return:
+        """
+        try:
+            pattern = re.compile(regex) if regex else None
+        except re.error as e:
+            raise HarConvertError(f"过滤url的正则表达式错误: {e}")
+
+        count = 0
+        remaining = max_total_content_length
+        for entry in HarReader(file):
+            if not isinstance(entry, dict) or "request" not in entry:
+                continue
+            if pattern and not pattern.search(entry["request"].get("url", "")):
+                continue
+            if Convertor.is_static(entry):
+                continue
+
+            count += 1
+            if max_requests and count > max_requests:
+                raise HarConvertError(f"har文件中的请求超过{max_requests}个，请使用正则过滤")
+
+            content_length = max_content_length
+            if remaining is not None:
+                content_length = min(content_length, remaining)
+            request_info = Convertor.to_request_info(entry, content_length)
+            if remaining is not None:
+                remaining -= len(request_info.response_content or "")
+            yield request_info
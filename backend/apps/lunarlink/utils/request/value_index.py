@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+@File    : value_index.py
+@Time    : 2026/10/19 19:30
+@Author  : geekbing
+@LastEditTime : -
+@LastEditors : -
+@Description : 录制接口响应值的倒排索引，用于关联后续请求中引用的变量
+"""
+from collections import deque
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+class AhoCorasick:
+    """
+    多模式串匹配，一次扫描文本找出所有模式串出现的位置，耗时与文本长度和匹配数量成正比
+    """
+
+    def __init__(self, patterns: List[str]):
+        # 每个节点: 子节点 {字符: 节点}、失败指针、以该节点结尾的模式串
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[str]] = [[]]
+        for pattern in patterns:
+            self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str):
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node].append(pattern)
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, next_node in self._goto[node].items():
+                queue.append(next_node)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_node] = self._goto[fail].get(char, 0)
+                self._output[next_node] = (
+                    self._output[next_node] + self._output[self._fail[next_node]]
+                )
+
+    def iter(self, text: str):
+        """
+        遍历文本中所有模式串的出现位置
+
+        :param text:
+        :return: (开始位置, 结束位置, 模式串)
+        """
+        node = 0
+        for end, char in enumerate(text, 1):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for pattern in self._output[node]:
+                yield end - len(pattern), end, pattern
+
+
+class ValueIndex:
+    """
+    响应值倒排索引 {变量值: (接口序号, 变量路径)}
+
+    所有接口的响应只遍历一次，同一个值只保留第一次出现的位置，
+    当前接口(request_index)只能引用序号更小的接口响应中的值
+    """
+
+    def __init__(self, substring_min_length: int = 8, substring_max_length: int = 256):
+        """
+        :param substring_min_length: 参与子串替换的值的最小长度
+        :param substring_max_length: 参与子串替换的值的最大长度，自动机的节点数与值的总长度成正比
+        """
+        self._index: Dict[Any, Tuple[int, str]] = {}
+        self._matcher: Optional[AhoCorasick] = None
+        self.substring_min_length = substring_min_length
+        self.substring_max_length = substring_max_length
+        self.request_index = 0
+
+    def add(self, value, var_path: str):
+        """
+        记录当前接口响应中的值
+
+        :param value: 响应值
+        :param var_path: 变量路径, http_res_1_token::content.token
+        :return:
+        """
+        if value not in self._index:
+            self._index[value] = (self.request_index, var_path)
+            self._matcher = None
+
+    def get_path(self, value) -> Optional[str]:
+        """
+        当前接口可以引用的变量路径
+
+        :param value: 请求中的值
+        :return: 没有可以引用的变量时返回None
+        """
+        try:
+            hit = self._index.get(value)
+        except TypeError:
+            return None
+        if hit is None or hit[0] >= self.request_index:
+            return None
+        return hit[1]
+
+    def _get_matcher(self) -> AhoCorasick:
+        if self._matcher is None:
+            self._matcher = AhoCorasick(
+                [
+                    value
+                    for value in self._index
+                    if isinstance(value, str)
+                    and self.substring_min_length
+                    <= len(value)
+                    <= self.substring_max_length
+                ]
+            )
+        return self._matcher
+
+    def replace_substrings(
+        self,
+        text: str,
+        response_values: Set,
+        replaced: List,
+    ) -> str:
+        """
+        替换文本中包含的响应值，如 Bearer {token}，替换为 ${变量路径}
+
+        重叠的匹配取最靠前、最长的值，过短的值容易误匹配，过长的值占用内存，都不参与子串替换
+
+        :param text: 请求url或请求头中的值
+        :param response_values: 当前接口自身的响应值，不替换
+        :param replaced: 替换记录
+        :return: 替换后的文本
+        """
+        if not isinstance(text, str) or len(text) < self.substring_min_length:
+            return text
+
+        matches = [
+            (start, end, self.get_path(value))
+            for start, end, value in self._get_matcher().iter(text)
+            if value not in response_values
+        ]
+        matches = [match for match in matches if match[2]]
+        if not matches:
+            return text
+
+        matches.sort(key=lambda match: (match[0], match[0] - match[1]))
+        parts = []
+        position = 0
+        for start, end, var_path in matches:
+            if start < position:
+                continue
+            parts.append(text[position:start])
+            parts.append(f"${{{var_path}}}")
+            replaced.append(f"{text[start:end]} => ${{{var_path}}}")
+            position = end
+        parts.append(text[position:])
+        return "".join(parts)
@@ -44,6 +44,14 @@ RECORD_REMOVE_SUCCESS = {"code": "0003", "success": True, "msg": "删除成功"}
 
 RECORD_DATA_ERROR = {"code": "0101", "success": False, "msg": "无http请求，请检查参数"}
 
+HAR_CONVERT_ERROR = {"code": "0102", "success": False, "msg": "har文件解析失败"}
+
+RECORD_PARAMS_ERROR = {
+    "code": "0101",
+    "success": False,
+    "msg": "length、case_dir、api_dir必须是整数，config必须是json对象",
+}
+
 API_ADD_SUCCESS = {"code": "0001", "success": True, "msg": "接口添加成功"}
 
 API_GET_SUCCESS = {"code": "0012", "success": True, "msg": "获取数据成功"}
@@ -133,7 +141,15 @@ PROJECT_DELETE_SUCCESS = {"code": "0003", "success": True, "msg": "项目删除
 
 PROJECT_NOT_EXISTS = {"code": "0102", "success": False, "msg": "项目不存在"}
 
-CASE_STEP_SYNC_SUCCESS = {"code": "0002", "success": True, "msg": "用例步骤同步成功"}
+CASE_STEP_SYNC_START = {"code": "0001", "success": True, "msg": "用例步骤同步任务已提交"}
+
+CASE_SYNC_JOB_GET_SUCCESS = {"code": "0001", "success": True, "msg": "同步任务查询成功"}
+
+CASE_SYNC_JOB_NOT_EXISTS = {"code": "0102", "success": False, "msg": "指定的同步任务不存在"}
+
+CASE_SYNC_JOB_FINISHED = {"code": "0101", "success": False, "msg": "同步任务已完成"}
+
+CASE_SYNC_JOB_RUNNING = {"code": "0101", "success": False, "msg": "同步任务正在执行中"}
 
 CASE_STEP_NOT_EXIST = {"code": "0102", "success": False, "msg": "指定的用例步骤不存在"}
 
@@ -7,6 +7,7 @@
 @LastEditors : -
 @Description : API视图
 """
+from collections import defaultdict
 from enum import IntEnum
 from typing import List
 
@@ -24,8 +25,10 @@ from rest_framework.viewsets import GenericViewSet
 from rest_framework.response import Response
 
 from apps.exceptions.error import RelationNotFound
-from lunarlink import models, serializers
-from lunarlink.utils import response
+from backend.utils import pagination
+from lunarlink import models, serializers, tasks
+from lunarlink.services.search_service_impl import search_service
+from lunarlink.utils import case_sync, response
 from lunarlink.utils.decorator import request_log
 from lunarlink.utils.query_filters import filter_by_time_range, filter_by_node
 from lunarlink.utils.parser import Format, Parse
@@ -43,6 +46,7 @@ class APITemplateView(GenericViewSet):
 
     serializer_class = serializers.APISerializer
     queryset = models.API.objects.filter(~Q(tag=APITag.DEPRECATED.value))
+    pagination_class = pagination.MyKeysetPagination
 
     @swagger_auto_schema(query_serializer=serializers.AssertSerializer())
     @method_decorator(request_log(level="DEBUG"))
@@ -79,10 +83,7 @@ class APITemplateView(GenericViewSet):
 
             if search != "":
                 search: List = search.split()
-                for key in search:
-                    queryset = queryset.filter(
-                        Q(name__contains=key) | Q(url__contains=key)
-                    )
+                queryset = search_service.search_api(queryset, search)
             try:
                 queryset = filter_by_node(queryset, project, node, TreeType.API.value)
             except RelationNotFound:
@@ -384,38 +385,75 @@ class APITemplateView(GenericViewSet):
         """
         api-同步api到case_step
 
-        1.根据api_id查出("name", "body", "url", "method")
-        2.根据api_id更新case_step中的("name", "body", "url", "method", "updater")
-        3.更新case的update_time, updater
+        提交异步同步任务，根据api_id分批更新当前项目case_step中的("name", "body", "url", "method", "updater")
+        和所属case的update_time, updater
         """
-        source_api = (
-            models.API.objects.filter(pk=pk)
-            .values("name", "body", "url", "method", "project")
-            .first()
-        )
-        # 根据api反向查出project
-        project = source_api.pop("project")
+        source_api = models.API.objects.filter(pk=pk).values("project").first()
+        if not source_api:
+            return Response(response.API_NOT_FOUND)
 
-        project_case_ids = models.Case.objects.filter(project=project).values_list(
-            "id", flat=True
-        )
-        # 限制case_step只在当前项目
-        case_steps = models.CaseStep.objects.filter(
-            source_api_id=pk, case_id__in=project_case_ids
+        job = case_sync.create_sync_job(
+            api_ids=[pk], project_id=source_api["project"], user_id=request.user.id
         )
+        tasks.async_sync_case.delay(job.id)
+        return Response({**response.CASE_STEP_SYNC_START, "job_ids": [job.id]})
 
-        case_steps.update(
-            **source_api,
-            updater=request.user.id,
-            update_time=timezone.now(),
-        )
-        case_ids = case_steps.values_list("case", flat=True)
-        # 限制case只在当前项目
-        models.Case.objects.filter(pk__in=list(case_ids), project=project).update(
-            update_time=timezone.now(),
-            updater=request.user.id,
+    @method_decorator(request_log(level="INFO"))
+    def bulk_sync_case(self, request):
+        """
+        api-批量同步api到case_step
+
+        {"api_ids": [int]}，按项目分别提交异步同步任务，如yapi导入后同步更新的接口
+        """
+        api_ids: List = request.data.get("api_ids", [])
+        project_api_ids = defaultdict(list)
+        apis = models.API.objects.filter(pk__in=api_ids).values_list("id", "project")
+        for api_id, project_id in apis:
+            project_api_ids[project_id].append(api_id)
+        if not project_api_ids:
+            return Response(response.API_NOT_FOUND)
+
+        job_ids = []
+        for project_id, ids in project_api_ids.items():
+            job = case_sync.create_sync_job(
+                api_ids=ids, project_id=project_id, user_id=request.user.id
+            )
+            tasks.async_sync_case.delay(job.id)
+            job_ids.append(job.id)
+        return Response({**response.CASE_STEP_SYNC_START, "job_ids": job_ids})
+
+    @method_decorator(request_log(level="DEBUG"))
+    def sync_job(self, request, pk):
+        """
+        api-查询同步任务进度
+        """
+        job = models.CaseSyncJob.objects.filter(pk=pk).first()
+        if not job:
+            return Response(response.CASE_SYNC_JOB_NOT_EXISTS)
+        return Response(
+            {
+                **response.CASE_SYNC_JOB_GET_SUCCESS,
+                "data": case_sync.get_job_progress(job),
+            }
         )
-        return Response(response.CASE_STEP_SYNC_SUCCESS)
+
+    @method_decorator(request_log(level="INFO"))
+    def resume_sync_job(self, request, pk):
+        """
+        api-继续执行中断的同步任务，从已同步的位置继续
+        """
+        job = models.CaseSyncJob.objects.filter(pk=pk).first()
+        if not job:
+            return Response(response.CASE_SYNC_JOB_NOT_EXISTS)
+        if job.status == case_sync.SyncStatus.SUCCESS:
+            return Response(response.CASE_SYNC_JOB_FINISHED)
+        if job.status == case_sync.SyncStatus.RUNNING and not case_sync.is_job_stale(
+            job
+        ):
+            return Response(response.CASE_SYNC_JOB_RUNNING)
+
+        tasks.async_sync_case.delay(job.id)
+        return Response({**response.CASE_STEP_SYNC_START, "job_ids": [job.id]})
 
     @method_decorator(request_log(level="INFO"))
     def single(self, request, pk):
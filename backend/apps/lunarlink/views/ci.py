@@ -23,15 +23,15 @@ from django.conf import settings
 from django_celery_beat.models import PeriodicTask
 from drf_yasg.utils import swagger_auto_schema
 
-from lunarlink import models
-from lunarlink.utils import loader, qy_message
+from lunarlink import models, tasks
+from lunarlink.utils import loader
 from lunarlink.utils.decorator import request_log
 from django.utils.decorators import method_decorator
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.viewsets import GenericViewSet
 from lunarlink.serializers import CISerializer, CIReportSerializer
-from lunarlink.utils.loader import save_summary
+from lunarlink.utils.report_sink import ReportSink
 from lunarlink.utils import response
 
 
@@ -258,40 +258,49 @@ class CIView(GenericViewSet):
                     config = None
                 suite_list.extend(suite)
                 override_config_body = None
-            # 同步运行用例
-            summary, _ = loader.debug_suite(
-                suite=test_sets,
-                project=project,
-                obj=suite_list,
-                config=config_list,
-                save=False,
-            )
             ci_project_namespace = ser.validated_data["ci_project_namespace"]
             ci_project_name = ser.validated_data["ci_project_name"]
             ci_job_id = ser.validated_data["ci_job_id"]
-            summary["name"] = f"{ci_project_namespace}_{ci_project_name}_job{ci_job_id}"
-
-            report_id = save_summary(
-                name=summary.get("name"),
-                summary=summary,
+            report_name = f"{ci_project_namespace}_{ci_project_name}_job{ci_job_id}"
+            # junit结果需要用到执行记录，写入报告后仍保留在内存中
+            report_sink = ReportSink(
+                name=report_name,
                 project=project,
                 report_type=4,
                 user=ser.validated_data["start_job_user"],
                 ci_metadata=ser.validated_data,
+                keep_records=True,
             )
+            report_sink.open()
+            # 同步运行用例
+            try:
+                summary, _ = loader.debug_suite(
+                    suite=test_sets,
+                    project=project,
+                    obj=suite_list,
+                    config=config_list,
+                    save=False,
+                    report_sink=report_sink,
+                )
+            except Exception as e:
+                # 执行前已经创建了报告，运行异常时标记报告失败
+                report_sink.fail(str(e))
+                raise
+            summary["name"] = report_name
+
+            report_id = report_sink.finalize(summary)
             junit_results = summary2junit(summary)
             xml_data = xmltodict.unparse(junit_results)
             summary["task_name"] = "gitlab-ci_" + summary.get("name")
             summary["report_id"] = report_id
-            for webhook in webhook_set:
-                # TODO: 还需要优化企微发送，加入ci集成参数
-                qy_message.send_message(
-                    summary=summary,
-                    webhook=webhook,
-                    ci_job_url=ser.validated_data["ci_job_url"],
-                    ci_pipeline_url=ser.validated_data["ci_pipeline_url"],
-                    case_count=junit_results["testsuites"]["testsuite"]["tests"],
-                )
+            # TODO: 还需要优化企微发送，加入ci集成参数
+            tasks.dispatch_qy_messages(
+                summary=summary,
+                webhooks=webhook_set,
+                ci_job_url=ser.validated_data["ci_job_url"],
+                ci_pipeline_url=ser.validated_data["ci_pipeline_url"],
+                case_count=junit_results["testsuites"]["testsuite"]["tests"],
+            )
             return HttpResponse(xml_data, content_type="text/xml")
         else:
             return Response(ser.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -27,6 +27,8 @@ from lunarlink import models, serializers
 from lunarlink.utils import response
 from lunarlink.utils.convert2hrp import Hrp
 from lunarlink.utils.decorator import request_log
+from lunarlink.utils.report_archive import get_detail_text, load_archived_details
+from lunarlink.utils.report_stats import parse_number
 
 
 class ConvertRequest:
@@ -117,7 +119,7 @@ class ReportView(GenericViewSet):
 
     queryset = models.Report.objects
     serializer_class = serializers.ReportSerializer
-    pagination_class = pagination.MyPageNumberPagination
+    pagination_class = pagination.MyKeysetPagination
 
     def get_authenticators(self):
         # 查看报告详情不需要鉴权
@@ -144,9 +146,16 @@ class ReportView(GenericViewSet):
         report_type = request.query_params.get("reportType")
         report_status = request.query_params.get("reportStatus")
         only_me = request.query_params.get("onlyMe")
+        min_duration = request.query_params.get("minDuration")
+        max_duration = request.query_params.get("maxDuration")
+        min_failures = request.query_params.get("minFailures")
 
+        # 列表只使用统计字段，不加载summary，按创建时间倒序分页
         queryset = (
-            self.get_queryset().filter(project__id=project).order_by("-update_time")
+            self.get_queryset()
+            .filter(project__id=project)
+            .defer("summary")
+            .order_by("-create_time")
         )
 
         # 前端传过来是小写的字符串，不是python的True
@@ -162,6 +171,19 @@ class ReportView(GenericViewSet):
         if report_status != "":
             queryset = queryset.filter(status=report_status)
 
+        # 数值筛选条件格式不正确时忽略
+        min_duration = parse_number(min_duration, float)
+        if min_duration is not None:
+            queryset = queryset.filter(duration__gte=min_duration)
+
+        max_duration = parse_number(max_duration, float)
+        if max_duration is not None:
+            queryset = queryset.filter(duration__lte=max_duration)
+
+        min_failures = parse_number(min_failures, int)
+        if min_failures is not None:
+            queryset = queryset.filter(failures__gte=min_failures)
+
         page_report = self.paginate_queryset(queryset)
         serializer = self.get_serializer(page_report, many=True)
         return self.get_paginated_response(serializer.data)
@@ -175,12 +197,23 @@ class ReportView(GenericViewSet):
         """
         try:
             report = models.Report.objects.get(id=pk)
-            report_detail = models.ReportDetail.objects.get(report__id=pk)
         except ObjectDoesNotExist:
             return Response(response.REPORT_NOT_EXISTS)
 
+        if report.archived:
+            # 已归档的报告从归档存储中读取详情
+            details = load_archived_details(report)
+            if details is None:
+                return Response(response.REPORT_NOT_EXISTS)
+        else:
+            # 流式写入的报告按执行顺序拼接分片
+            detail_text = get_detail_text(pk)
+            if detail_text is None:
+                return Response(response.REPORT_NOT_EXISTS)
+            details = literal_eval(detail_text)
+
         summary = json.loads(report.summary)
-        summary["details"] = literal_eval(report_detail.summary_detail)
+        summary["details"] = details
         ConvertRequest.generate_curl(summary["details"], convert_type=("curl",))
         summary["html_report_name"] = report.name
 
@@ -226,6 +259,9 @@ class ReportView(GenericViewSet):
                 models.ReportDetail.objects.filter(report__in=objs).update(
                     is_deleted=True
                 )
+                models.ReportDetailChunk.objects.filter(report__in=objs).update(
+                    is_deleted=True
+                )
         except Exception as e:
             return Response({"error": str(e)}, status=400)
 
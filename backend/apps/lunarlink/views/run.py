@@ -329,6 +329,8 @@ def run_suite_tree(request):
     test_sets = []
     suite_list = []
     config_list = []
+    # 同名配置只查询一次
+    cache = loader.SuiteCache(project)
     for relation_id in relation:
         case_name_id_mapping_list = list(
             models.Case.objects.filter(project__id=project, relation=relation_id)
@@ -349,11 +351,7 @@ def run_suite_tree(request):
                 if body["request"].get("url"):
                     testcase_list.append(body)
                 elif config is None and body["request"].get("base_url"):
-                    config = literal_eval(
-                        models.Config.objects.get(
-                            name=body["name"], project__id=project
-                        ).body
-                    )
+                    config = cache.get_config_body(body["name"])
             config_list.append(config)
             test_sets.append(testcase_list)
             config = None
@@ -11,12 +11,12 @@ import json
 import logging
 
 from enum import Enum
-from typing import List
+from typing import List, Optional
 
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from django_celery_beat import models as celery_models
 from django.db import transaction
-from django.db.models import Q
 from django.utils import timezone
 from django.utils.decorators import method_decorator
 from rest_framework.status import HTTP_400_BAD_REQUEST
@@ -25,6 +25,7 @@ from rest_framework.mixins import DestroyModelMixin
 from rest_framework.viewsets import GenericViewSet
 from rest_framework.response import Response
 
+from apps.exceptions.convert import HarConvertError
 from apps.exceptions.error import (
     ApiNotFound,
     CaseStepNotFound,
@@ -35,12 +36,14 @@ from apps.schema.request import RequestInfo
 from backend.utils.redis_manager import RedisHelper
 from backend.utils.request_util import get_request_ip
 from lunarlink import models, serializers
+from lunarlink.services.search_service_impl import search_service
 from lunarlink.utils import response
 from lunarlink.utils import prepare
 from lunarlink.utils.decorator import request_log
 from lunarlink.utils.enums.TreeTypeEnum import TreeType
 from lunarlink.utils.query_filters import filter_by_time_range, filter_by_node
 from lunarlink.utils.request.generator import CaseGenerator
+from lunarlink.utils.request.har_convertor import Convertor
 
 
 logger = logging.getLogger(__name__)
@@ -111,7 +114,7 @@ class TestCaseView(GenericViewSet, DestroyModelMixin):
                     queryset = queryset.filter(name__contains=search)
                 # API名称或API URL搜索
                 elif search_type == SearchType.API.value:
-                    case_id = self.case_step_search(search)
+                    case_id = search_service.search_case_ids(project, search)
                     queryset = queryset.filter(pk__in=case_id)
 
             pagination_query = self.paginate_queryset(queryset)
@@ -182,19 +185,6 @@ class TestCaseView(GenericViewSet, DestroyModelMixin):
 
         return Response({"test_id": case_obj.id, **response.CASE_ADD_SUCCESS})
 
-    @staticmethod
-    def case_step_search(search: str):
-        """
-        搜索case_step的url或name
-        返回对应的case_id
-        """
-        case_id = models.CaseStep.objects.filter(
-            Q(name__contains=search) | Q(url__contains=search)
-        ).values("case_id")
-
-        case_id = set(item["case_id"] for _, item in enumerate(case_id))
-        return case_id
-
     @method_decorator(request_log(level="INFO"))
     def patch(self, request, pk):
         """
@@ -587,17 +577,43 @@ class RecordRemoveView(APIView):
 class GenerateCaseView(APIView):
     """录制生成用例"""
 
+    def get_requests(self, request) -> List[RequestInfo]:
+        """
+        生成用例的请求
+        :param request:
+        :return:
+        """
+        raw_requests = request.data.get("requests") or []
+        return [RequestInfo(**item) for item in raw_requests]
+
+    @staticmethod
+    def to_int(value) -> Optional[int]:
+        """
+        上传文件时表单中的字段都是字符串，转换为整数，为空时返回None
+
+        :param value:
+        :return:
+        """
+        if value is None or value == "":
+            return None
+        return int(value)
+
     @method_decorator(request_log(level="INFO"))
     def post(self, request):
         case_name = request.data.get("name")
-        length = request.data.get("length")
         project_id = request.data.get("project")
-        case_dir = request.data.get("case_dir")
-        api_dir = request.data.get("api_dir")
         config = request.data.get("config")
-        raw_requests = request.data.get("requests")
-        if not raw_requests:
-            return Response(response.RECORD_DATA_ERROR)
+        try:
+            length = self.to_int(request.data.get("length"))
+            case_dir = self.to_int(request.data.get("case_dir"))
+            api_dir = self.to_int(request.data.get("api_dir"))
+            if isinstance(config, str):
+                # 上传文件时表单中的配置为json字符串
+                config = json.loads(config)
+        except (TypeError, ValueError):
+            return Response(response.RECORD_PARAMS_ERROR)
+        if not isinstance(config, dict) or not isinstance(config.get("body"), dict):
+            return Response(response.RECORD_PARAMS_ERROR)
 
         if not models.Project.objects.filter(id=project_id).exists():
             return Response(response.PROJECT_NOT_EXISTS)
@@ -610,10 +626,17 @@ class GenerateCaseView(APIView):
         except models.Config.DoesNotExist:
             return Response(response.CONFIG_NOT_EXISTS)
 
-        requests = [RequestInfo(**item) for item in raw_requests]
+        try:
+            requests = self.get_requests(request)
+        except HarConvertError as e:
+            logger.warning(f"解析har文件失败: {e}")
+            return Response({**response.HAR_CONVERT_ERROR, "msg": str(e)})
+        if not requests:
+            return Response(response.RECORD_DATA_ERROR)
+
         CaseGenerator.extract_field(requests)
         record_case, api_instances = CaseGenerator.generate_case(
-            length=length,
+            length=length or len(requests),
             project_id=project_id,
             case_dir=case_dir,
             api_dir=api_dir,
@@ -660,7 +683,26 @@ class GenerateCaseView(APIView):
         return api_ids
 
 
-class ConvertCaseView(APIView):
+class ConvertCaseView(GenerateCaseView):
     """导入har或其他用例数据文件生成用例"""
 
-    pass
+    def get_requests(self, request) -> List[RequestInfo]:
+        """
+        流式解析上传的har文件，只保留匹配regex的非静态资源请求
+        :param request:
+        :return:
+        """
+        file = request.FILES.get("file")
+        if file is None:
+            return []
+
+        har_setting = settings.HAR_IMPORT_SETTING
+        return list(
+            Convertor.convert(
+                file,
+                regex=request.data.get("regex"),
+                max_content_length=har_setting["max_content_length"],
+                max_requests=har_setting["max_requests"],
+                max_total_content_length=har_setting["max_total_content_length"],
+            )
+        )
@@ -8,6 +8,7 @@ from rest_framework.viewsets import GenericViewSet
 from drf_yasg.utils import swagger_auto_schema
 
 
+from backend.utils import pagination
 from backend.utils.request_util import save_login_log
 from lunarlink.models import LoginLog
 from lunaruser.common import response
@@ -87,6 +88,7 @@ class LoginLogView(GenericViewSet):
 
     queryset = LoginLog.objects.all()
     serializer_class = serializers.LoginLogSerializer
+    pagination_class = pagination.MyKeysetPagination
 
     @method_decorator(request_log(level="DEBUG"))
     def list(self, request):
@@ -10,4 +10,25 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 
-application = get_asgi_application()
+# 先初始化django，再导入依赖models的模块
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from django.urls import path  # noqa: E402
+
+from backend.utils.ws_auth import JWTAuthMiddleware  # noqa: E402
+from backend.utils.ws_connection_manager import ConnectionManager  # noqa: E402
+
+application = ProtocolTypeRouter(
+    {
+        "http": django_asgi_app,
+        # 连接时校验token，只能订阅自己的消息
+        "websocket": JWTAuthMiddleware(
+            URLRouter(
+                [
+                    path("ws/<int:user_id>", ConnectionManager.as_asgi()),
+                ]
+            )
+        ),
+    }
+)
@@ -37,6 +37,11 @@ app.conf.update(
             "exchange_type": "direct",
             "binding_key": "work_queue",
         },
+        "notify_tasks": {
+            "exchange": "notify_tasks",
+            "exchange_type": "direct",
+            "binding_key": "notify_tasks",
+        },  # 通知队列，与用例执行隔离
     },  # 定义任务队列
     CELERY_DEFAULT_QUEUE="work_queue",  # 默认的任务队列
     CELERY_FORCE_EXECV=True,  # 有些情况下可以防止死锁
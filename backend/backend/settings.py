@@ -13,6 +13,7 @@ import datetime
 import os
 import sys
 
+from celery.schedules import crontab
 from loguru import logger
 
 from conf.env import *
@@ -50,6 +51,7 @@ INSTALLED_APPS = [
     "drf_yasg",
     "django_celery_beat",
     "django_celery_results",
+    "channels",
     "lunaruser",
     "lunarlink",
 ]
@@ -288,6 +290,49 @@ CELERY_TIMEZONE = TIME_ZONE  # celery 时区问题
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"  # Backend数据库
 DJANGO_CELERY_BEAT_TZ_AWARE = False  # 时区设置
 CELERY_ENABLE_UTC = False  # 时区设置
+# 内置定时任务，DatabaseScheduler启动时同步到数据库
+CELERY_BEAT_SCHEDULE = {
+    "report_retention": {
+        "task": "lunarlink.tasks.report_retention",
+        "schedule": crontab(hour=3, minute=0),  # 每天凌晨3点执行报告保留策略
+    },
+    "refresh_daily_stats": {
+        "task": "lunarlink.tasks.refresh_daily_stats",
+        "schedule": crontab(minute="*/10"),  # 每10分钟刷新看板最近的统计
+    },
+    "full_refresh_daily_stats": {
+        "task": "lunarlink.tasks.refresh_daily_stats",
+        "schedule": crontab(hour=2, minute=0),
+        "kwargs": {"full": True},
+    },
+    "resume_stale_sync_jobs": {
+        "task": "lunarlink.tasks.resume_stale_sync_jobs",
+        "schedule": crontab(minute="*/5"),  # 每5分钟重新投递已中断的用例步骤同步任务
+    },
+}
+
+# channels 配置，websocket消息通过redis在多个进程间分发
+if REDIS_ON:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {
+                "hosts": [
+                    {
+                        "address": (REDIS_HOST, int(REDIS_PORT or 6379)),
+                        "password": REDIS_PASSWORD or None,
+                        "db": int(REDIS_DB or 0),
+                    }
+                ],
+                # 每个连接最多积压的消息数，超过后新消息被丢弃
+                "capacity": WEBSOCKET_SETTING["channel_capacity"],
+                "expiry": 60,
+            },
+        },
+    }
+else:
+    # 只能在单进程内推送
+    CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
 
 # 设置请求体的最大大小
 DATA_UPLOAD_MAX_MEMORY_SIZE = 52428800  # 50M
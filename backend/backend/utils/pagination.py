@@ -7,8 +7,16 @@
 @LastEditors : -
 @Description : 分页查询
 """
+import base64
+import datetime
+import json
+from collections import OrderedDict
 
+from django.db.models import Q
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class MyCursorPagination(pagination.CursorPagination):
@@ -31,3 +39,166 @@ class MyPageNumberPagination(pagination.PageNumberPagination):
     page_size_query_param = "size"
     page_query_param = "page"
     max_page_size = 40
+
+
+class MyKeysetPagination(MyPageNumberPagination):
+    """
+    键集分页，按(排序字段, id)倒序翻页，翻页时不使用OFFSET，耗时与数据量无关
+
+    排序字段沿用视图queryset的倒序排序字段，没有排序时使用ordering_field；
+    传cursor时按next、previous中的游标翻页，前端翻页都使用游标，只传page时兼容普通分页(OFFSET)；
+    count默认为精确总数，游标翻页时前端传count=false跳过统计，沿用第一页的总数；
+    传count=limit时最多统计到count_limit，数据量大时避免全量COUNT，返回count_limit表示不少于该数量
+    """
+
+    ordering_field = "create_time"
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    count_limit = 10000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering_field = self.get_ordering_field(queryset)
+        self.count = self.get_count(queryset, request)
+
+        queryset = queryset.order_by(f"-{self.ordering_field}", "-id")
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            results = self.paginate_by_cursor(queryset, *cursor)
+        else:
+            results = self.paginate_by_page(queryset, request)
+        self.results = results
+        return results
+
+    def get_ordering_field(self, queryset):
+        """
+        视图queryset的第一个倒序排序字段，如order_by("-update_time")
+
+        :param queryset:
+        :return:
+        """
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        if ordering:
+            field = ordering[0]
+            if isinstance(field, str) and field.startswith("-"):
+                return field[1:]
+        return self.ordering_field
+
+    def get_count(self, queryset, request):
+        """
+        统计总数，传count=false时不统计，传count=limit时最多统计到count_limit
+
+        :param queryset:
+        :param request:
+        :return:
+        """
+        count = request.query_params.get(self.count_query_param)
+        if count == "false":
+            return None
+        if count == "limit":
+            return queryset.order_by().values("id")[: self.count_limit].count()
+        return queryset.order_by().count()
+
+    def paginate_by_cursor(self, queryset, value, pk, reverse):
+        """
+        按游标取一页数据，多取一条判断是否还有数据
+
+        :param queryset:
+        :param value: 游标所在数据的排序字段值
+        :param pk: 游标所在数据的id
+        :param reverse: 是否向前翻页
+        :return:
+        """
+        field = self.ordering_field
+        if reverse:
+            queryset = queryset.filter(
+                Q(**{f"{field}__gt": value}) | Q(**{field: value, "id__gt": pk})
+            ).order_by(field, "id")
+        else:
+            queryset = queryset.filter(
+                Q(**{f"{field}__lt": value}) | Q(**{field: value, "id__lt": pk})
+            )
+
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, True
+        return results
+
+    def paginate_by_page(self, queryset, request):
+        """
+        按页码取一页数据，先在索引上取出当前页的id，再按id查询整行，仍然需要OFFSET扫描，只用于兼容
+
+        :param queryset:
+        :param request:
+        :return:
+        """
+        try:
+            page_number = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            page_number = 1
+        page_number = max(page_number, 1)
+        offset = (page_number - 1) * self.page_size
+
+        ids = list(
+            queryset.values_list("id", flat=True)[offset : offset + self.page_size + 1]
+        )
+        self.has_next = len(ids) > self.page_size
+        self.has_previous = page_number > 1
+        ids = ids[: self.page_size]
+        objects = queryset.in_bulk(ids)
+        return [objects[pk] for pk in ids if pk in objects]
+
+    def encode_cursor(self, instance, reverse):
+        value = getattr(instance, self.ordering_field)
+        if isinstance(value, datetime.datetime):
+            value = value.isoformat()
+        cursor = json.dumps([value, instance.id, int(reverse)])
+        return base64.urlsafe_b64encode(cursor.encode("utf-8")).decode("ascii")
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            cursor = base64.urlsafe_b64decode(encoded.encode("ascii"))
+            value, pk, reverse = json.loads(cursor)
+        except (TypeError, ValueError):
+            raise NotFound("无效的游标")
+        return value, pk, bool(reverse)
+
+    def get_next_link(self):
+        if not self.has_next or not self.results:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.results[-1], False)
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.results:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.results[0], True)
+        )
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("count", self.count),
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
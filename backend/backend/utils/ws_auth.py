@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+@File    : ws_auth.py
+@Time    : 2026/10/19 21:10
+@Author  : geekbing
+@LastEditTime : -
+@LastEditors : -
+@Description : websocket登录认证，校验连接地址中的token，ws/<user_id>?token=<jwt>
+"""
+import logging
+from urllib.parse import parse_qs
+
+import jwt
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework import exceptions
+
+from backend.utils.auth import MyJWTAuthentication, jwt_decode_handler
+
+logger = logging.getLogger(__name__)
+
+# 连接地址中携带token的参数名，浏览器的WebSocket不能设置Authorization请求头
+TOKEN_QUERY_PARAM = "token"
+
+
+@database_sync_to_async
+def get_user(token: str):
+    """
+    按token获取用户，token无效时返回匿名用户
+
+    :param token: jwt
+    :return:
+    """
+    try:
+        payload = jwt_decode_handler(token)
+        return MyJWTAuthentication().authenticate_credentials(payload)
+    except (jwt.InvalidTokenError, exceptions.AuthenticationFailed) as e:
+        logger.debug(f"websocket: token校验失败: {e}")
+        return AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    websocket连接的jwt认证，认证结果写入scope["user"]，由consumer决定是否接受连接
+    """
+
+    async def __call__(self, scope, receive, send):
+        query = parse_qs(scope.get("query_string", b"").decode("utf-8"))
+        tokens = query.get(TOKEN_QUERY_PARAM)
+        scope = dict(scope)
+        scope["user"] = await get_user(tokens[0]) if tokens else AnonymousUser()
+        return await super().__call__(scope, receive, send)
@@ -5,41 +5,71 @@
 @Author  : geekbing
 @LastEditTime : -
 @LastEditors : -
-@Description : -
+@Description : websocket连接管理，通过channel layer按用户分组推送消息，支持多进程部署
 """
 import asyncio
+import itertools
 import logging
 import json
-from typing import TypeVar
+import threading
+import time
+from collections import OrderedDict
+from enum import IntEnum
+from typing import Dict, Hashable, Optional, TypeVar
 
+from asgiref.sync import async_to_sync
 from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.layers import get_channel_layer
+from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
 MsgType = TypeVar("MsgType", str, dict, bytes)
 
 
+class MessageType(IntEnum):
+    RECORD = 1  # 录制的请求
+    PROGRESS = 2  # 运行进度
+    HEARTBEAT = 3  # 心跳
+
+
+def get_user_group(user_id: int) -> str:
+    """用户所有连接所在的分组"""
+    return f"ws_user_{user_id}"
+
+
 class ConnectionManager(AsyncWebsocketConsumer):
-    active_connections = {}
+    """
+    用户websocket连接，连接地址ws/<user_id>?token=<jwt>，token对应的用户必须是user_id
+
+    连接建立后加入用户分组，任意进程(web、celery、录制代理)向分组发送的消息都会推送到该用户的所有连接
+    """
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.user_id = None  # 初始化 user_id 属性
+        self.group_name = None
+        self.heartbeat_task = None
 
     async def connect(self):
         self.user_id = int(self.scope["url_route"]["kwargs"]["user_id"])
-        exist = self.active_connections.get(self.user_id)
-        if exist:
+        user = self.scope.get("user")
+        if user is None or not user.is_authenticated or user.id != self.user_id:
+            # 未登录或订阅其他用户的消息，拒绝连接
+            logger.warning(f"websocket: 用户[{self.user_id}]连接认证失败")
             await self.close()
-        else:
-            self.active_connections[self.user_id] = self
-            logger.debug(f"websocket: 用户[{self.user_id}]建立连接成功！")
+            return
+        self.group_name = get_user_group(self.user_id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
         await self.accept()
-        # asyncio.create_task(self.send_heartbeat())
+        self.heartbeat_task = asyncio.ensure_future(self.send_heartbeat())
+        logger.debug(f"websocket: 用户[{self.user_id}]建立连接成功！")
 
     async def disconnect(self, close_code):
-        if self.user_id is not None:
-            del self.active_connections[self.user_id]
+        if self.heartbeat_task:
+            self.heartbeat_task.cancel()
+        if self.group_name:
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
             logger.debug(f"websocket: 用户[{self.user_id}] 已安全断开！")
 
     async def receive(self, text_data=None, bytes_data=None):
@@ -50,9 +80,8 @@ class ConnectionManager(AsyncWebsocketConsumer):
                 response = self.questions_and_answers_map[message_type].format(
                     user_id=self.user_id
                 )  # 格式化字符串以包含 user_id
-                await self.send_personal_message(
-                    self.user_id, response
-                )  # 使用 self.user_id
+                # 只回复当前连接
+                await self.pusher(self, response)
             else:
                 # 添加其他消息类型的处理逻辑
                 pass
@@ -60,6 +89,13 @@ class ConnectionManager(AsyncWebsocketConsumer):
             # 在这里添加你的二进制数据处理逻辑
             pass
 
+    async def push_messages(self, event: Dict):
+        """
+        channel layer中type为push.messages的消息，一次携带多条合并后的消息
+        """
+        for message in event["messages"]:
+            await self.pusher(self, message)
+
     @staticmethod
     async def pusher(connection: AsyncWebsocketConsumer, message: MsgType) -> None:
         if isinstance(message, str):
@@ -72,13 +108,13 @@ class ConnectionManager(AsyncWebsocketConsumer):
             raise TypeError(f"websocket不能发送{type(message)}的内容！")
 
     @classmethod
-    async def send_personal_message(cls, user_id: int, message: MsgType) -> None:
+    async def send_personal_message(
+        cls, user_id: int, message: MsgType, coalesce_key: Hashable = None
+    ) -> None:
         """
-        发送个人信息
+        发送个人信息，消息先合并再批量推送
         """
-        connection = cls.active_connections.get(user_id)
-        if connection:
-            await cls.pusher(connection, message)
+        await message_pusher.push(user_id, message, coalesce_key)
 
     @classmethod
     async def send_data(cls, user_id, msg_type, record_msg):
@@ -91,9 +127,148 @@ class ConnectionManager(AsyncWebsocketConsumer):
     }
 
     async def send_heartbeat(self):
+        interval = settings.WEBSOCKET_SETTING["heartbeat_interval"]
         while True:
-            await self.send_personal_message(self.user_id, {"type": 3})
-            await asyncio.sleep(60)
+            await asyncio.sleep(interval)
+            await self.pusher(self, {"type": MessageType.HEARTBEAT.value})
+
+
+class MessagePusher:
+    """
+    异步环境(如录制代理)中的消息推送
+
+    发送给同一用户的消息在flush_interval内合并，满max_batch_size条立即推送，每批只发送一次channel layer消息；
+    coalesce_key相同的消息只保留最新一条；待推送的消息超过max_queue_size时丢弃最早的消息，避免无人接收时无限堆积
+    """
+
+    def __init__(self):
+        self._buffers: Dict[int, OrderedDict] = {}
+        self._flush_task: Optional[asyncio.Future] = None
+        self._counter = itertools.count()
+
+    async def push(self, user_id: int, message: MsgType, coalesce_key=None):
+        setting = settings.WEBSOCKET_SETTING
+        buffer = self._buffers.setdefault(user_id, OrderedDict())
+        if coalesce_key is None:
+            key = next(self._counter)
+        else:
+            key = ("coalesce", coalesce_key)
+            buffer.pop(key, None)
+        buffer[key] = message
+
+        dropped = 0
+        while len(buffer) > setting["max_queue_size"]:
+            buffer.popitem(last=False)
+            dropped += 1
+        if dropped:
+            logger.warning(f"websocket: 用户[{user_id}]待推送消息过多，丢弃{dropped}条")
+
+        if len(buffer) >= setting["max_batch_size"]:
+            await self.flush(user_id)
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self._delay_flush())
+
+    async def _delay_flush(self):
+        await asyncio.sleep(settings.WEBSOCKET_SETTING["flush_interval"])
+        for user_id in list(self._buffers):
+            await self.flush(user_id)
+
+    async def flush(self, user_id: int):
+        """
+        推送用户待发送的消息
+        """
+        buffer = self._buffers.pop(user_id, None)
+        channel_layer = get_channel_layer()
+        if not buffer or channel_layer is None:
+            return
+        try:
+            await channel_layer.group_send(
+                get_user_group(user_id),
+                {"type": "push.messages", "messages": list(buffer.values())},
+            )
+        except Exception as e:
+            logger.error(f"websocket: 推送用户[{user_id}]消息失败: {e}")
+
+
+message_pusher = MessagePusher()
+
+# 同步推送时coalesce_key最近一次推送的时间
+_last_push_time: Dict = {}
+# 最近一次清理_last_push_time的时间
+_last_evict_time = 0.0
+# 并行运行用例时多个线程同时推送，读写_last_push_time、_last_evict_time需要加锁
+_push_time_lock = threading.Lock()
+
+
+def _evict_stale_push_time(now: float, interval: float):
+    """
+    清理超过合并时间窗口的记录，这些记录不再影响推送，避免在长期运行的celery worker中不断增长
+
+    每个时间窗口最多清理一次，调用方需要持有_push_time_lock
+
+    :param now: 当前时间
+    :param interval: 合并的时间窗口
+    :return:
+    """
+    global _last_evict_time
+    if now - _last_evict_time < interval:
+        return
+    _last_evict_time = now
+    stale_keys = [key for key, t in _last_push_time.items() if now - t >= interval]
+    for key in stale_keys:
+        del _last_push_time[key]
+
+
+def _claim_push(user_id: int, coalesce_key: Hashable, force: bool) -> bool:
+    """
+    coalesce_key相同的消息在合并时间窗口内是否可以推送，可以推送时记录推送时间
+
+    :param user_id: 用户id
+    :param coalesce_key: 合并消息的key
+    :param force: 忽略合并，立即推送
+    :return: 是否可以推送
+    """
+    now = time.monotonic()
+    interval = settings.WEBSOCKET_SETTING["flush_interval"]
+    key = (user_id, coalesce_key)
+    with _push_time_lock:
+        _evict_stale_push_time(now, interval)
+        last_time = _last_push_time.get(key)
+        if force:
+            _last_push_time.pop(key, None)
+        elif last_time is not None and now - last_time < interval:
+            return False
+        else:
+            _last_push_time[key] = now
+    return True
+
+
+def push_message(
+    user_id: int, message: MsgType, coalesce_key: Hashable = None, force=False
+) -> bool:
+    """
+    同步环境(如celery任务)中推送消息
+
+    coalesce_key相同的消息在flush_interval内只推送第一条，调用方需要用force=True推送最终状态
 
+    :param user_id: 用户id
+    :param message: 消息
+    :param coalesce_key: 合并消息的key
+    :param force: 忽略合并，立即推送
+    :return: 是否已推送
+    """
+    channel_layer = get_channel_layer()
+    if user_id is None or channel_layer is None:
+        return False
 
-# ws_manage = ConnectionManager()
+    try:
+        if coalesce_key is not None and not _claim_push(user_id, coalesce_key, force):
+            return False
+        async_to_sync(channel_layer.group_send)(
+            get_user_group(user_id),
+            {"type": "push.messages", "messages": [message]},
+        )
+    except Exception as e:
+        logger.error(f"websocket: 推送用户[{user_id}]消息失败: {e}")
+        return False
+    return True
@@ -87,6 +87,139 @@ EMAIL_USE_TL = False
 # 是否使用 SSL
 EMAIL_USE_SSL = True
 
+# ================================================= #
+# ************** 通知发送配置  ************** #
+# ================================================= #
+# 企微机器人、邮件发送超时时间(秒)
+NOTIFY_TIMEOUT = int(os.getenv("NOTIFY_TIMEOUT", 5))
+# 发送失败最大重试次数
+NOTIFY_MAX_RETRIES = int(os.getenv("NOTIFY_MAX_RETRIES", 3))
+# webhook连接池大小
+NOTIFY_POOL_SIZE = int(os.getenv("NOTIFY_POOL_SIZE", 10))
+
+# ================================================= #
+# ************** 用例执行连接池配置  ************** #
+# ================================================= #
+# 开启后同一次运行的用例按域名共享连接池，复用TCP/TLS连接，cookies仍按用例隔离
+HTTP_POOL_SETTING = {
+    "enabled": os.getenv("HTTP_POOL_ENABLED", "False") == "True",
+    # 缓存的域名连接池数量
+    "pool_connections": int(os.getenv("HTTP_POOL_CONNECTIONS", 10)),
+    # 每个域名保持的最大连接数，并行运行时建议不小于并发数
+    "pool_maxsize": int(os.getenv("HTTP_POOL_MAXSIZE", 50)),
+    # 连接耗尽时是否阻塞等待
+    "pool_block": False,
+    # 是否开启TCP keep-alive探测
+    "keep_alive": os.getenv("HTTP_POOL_KEEP_ALIVE", "True") == "True",
+}
+
+# ================================================= #
+# ************** 用例执行响应体配置  ************** #
+# ================================================= #
+# 单个响应体超过max_body_size(字节)，或一次运行内存中的响应体总量超过memory_budget(字节)时，
+# 响应体写入临时文件，生成报告时再读取，为空表示不限制
+RESPONSE_BODY_SETTING = {
+    "max_body_size": int(os.getenv("RESPONSE_MAX_BODY_SIZE", 0)) or None,
+    "memory_budget": int(os.getenv("RESPONSE_MEMORY_BUDGET", 0)) or None,
+    # 临时文件目录，为空时使用系统临时目录
+    "spill_dir": os.getenv("RESPONSE_SPILL_DIR") or None,
+}
+
+# ================================================= #
+# ************** 用例参数化拆分配置  ************** #
+# ================================================= #
+# 并行运行时，csv参数化超过该行数的用例按行拆成多份，分给多个线程运行，0表示不拆分
+PARAMETERS_CHUNK_SIZE = int(os.getenv("PARAMETERS_CHUNK_SIZE", 1000))
+
+# ================================================= #
+# ************** 测试报告保留策略配置  ************** #
+# ================================================= #
+# 按报告类型设置报告详情保留天数，超过后详情压缩归档到存储中，查看报告时再读取，0表示不归档
+REPORT_RETENTION_SETTING = {
+    "archive_after_days": {
+        1: int(os.getenv("REPORT_ARCHIVE_DEBUG_DAYS", 7)),  # 调试
+        2: int(os.getenv("REPORT_ARCHIVE_ASYNC_DAYS", 30)),  # 异步
+        3: int(os.getenv("REPORT_ARCHIVE_SCHEDULE_DAYS", 30)),  # 定时
+        4: int(os.getenv("REPORT_ARCHIVE_CI_DAYS", 90)),  # 部署
+    },
+    # 软删除的报告超过天数后彻底删除，0表示不清理
+    "purge_deleted_after_days": int(os.getenv("REPORT_PURGE_DELETED_DAYS", 7)),
+    # 每批处理的报告数量
+    "batch_size": int(os.getenv("REPORT_RETENTION_BATCH_SIZE", 200)),
+    # 归档存储类，需要实现save、load、delete方法
+    "storage_class": os.getenv(
+        "REPORT_ARCHIVE_STORAGE", "lunarlink.utils.report_archive.LocalArchiveStorage"
+    ),
+    # 本地归档目录，为空时使用项目目录下的report_archive
+    "storage_dir": os.getenv("REPORT_ARCHIVE_DIR") or None,
+}
+
+# ================================================= #
+# ************** 看板统计配置  ************** #
+# ================================================= #
+# 看板从每日统计表中查询，定时任务刷新最近refresh_days天的统计，
+# 每天凌晨刷新最近full_refresh_days天的统计，同步较早数据的删除
+DASHBOARD_STAT_SETTING = {
+    "refresh_days": int(os.getenv("DASHBOARD_STAT_REFRESH_DAYS", 2)),
+    # 需要覆盖看板最近6个月的统计
+    "full_refresh_days": int(os.getenv("DASHBOARD_STAT_FULL_REFRESH_DAYS", 200)),
+}
+
+# ================================================= #
+# ************** 全文搜索配置  ************** #
+# ================================================= #
+# 接口和用例步骤的名称、url使用MySQL ngram全文索引搜索，关闭后使用LIKE搜索
+FULLTEXT_SEARCH_SETTING = {
+    "enabled": os.getenv("FULLTEXT_SEARCH_ENABLED", "True") == "True",
+    # 与MySQL的ngram_token_size保持一致，短于该长度的关键字使用LIKE搜索
+    "ngram_token_size": int(os.getenv("FULLTEXT_NGRAM_TOKEN_SIZE", 2)),
+}
+
+# ================================================= #
+# ************** YAPI导入配置  ************** #
+# ================================================= #
+# 并发获取接口详情，请求超时和失败重试；解析和写入按batch_size分批
+YAPI_IMPORT_SETTING = {
+    "max_workers": int(os.getenv("YAPI_IMPORT_MAX_WORKERS", 10)),
+    # 单个请求的超时时间，单位秒
+    "timeout": int(os.getenv("YAPI_IMPORT_TIMEOUT", 10)),
+    # 连接失败和5xx响应的重试次数
+    "retries": int(os.getenv("YAPI_IMPORT_RETRIES", 3)),
+    "batch_size": int(os.getenv("YAPI_IMPORT_BATCH_SIZE", 200)),
+}
+
+# ================================================= #
+# ************** HAR导入配置  ************** #
+# ================================================= #
+# har文件流式解析，过滤后的请求数量和单个响应内容的长度有上限，避免占用过多内存
+HAR_IMPORT_SETTING = {
+    # 过滤后最多导入的请求数量，超过时提示使用正则过滤
+    "max_requests": int(os.getenv("HAR_IMPORT_MAX_REQUESTS", 500)),
+    # 超过长度的响应内容不保留，不参与变量关联
+    "max_content_length": int(os.getenv("HAR_IMPORT_MAX_CONTENT_LENGTH", 256 * 1024)),
+    # 所有请求保留的响应内容总长度，用完后之后的响应内容不保留，限制导入时的内存占用
+    "max_total_content_length": int(
+        os.getenv("HAR_IMPORT_MAX_TOTAL_CONTENT_LENGTH", 32 * 1024 * 1024)
+    ),
+}
+
+# ================================================= #
+# ************** websocket配置  ************** #
+# ================================================= #
+# 消息通过channel layer按用户分组推送，同一用户的消息合并后批量发送
+WEBSOCKET_SETTING = {
+    # 心跳间隔，单位秒
+    "heartbeat_interval": int(os.getenv("WS_HEARTBEAT_INTERVAL", 30)),
+    # 消息合并的时间窗口，单位秒
+    "flush_interval": float(os.getenv("WS_FLUSH_INTERVAL", 0.2)),
+    # 合并后每批最多的消息数
+    "max_batch_size": int(os.getenv("WS_MAX_BATCH_SIZE", 50)),
+    # 每个用户待推送的消息上限，超过时丢弃最早的消息
+    "max_queue_size": int(os.getenv("WS_MAX_QUEUE_SIZE", 1000)),
+    # channel layer中每个连接积压的消息上限
+    "channel_capacity": int(os.getenv("WS_CHANNEL_CAPACITY", 100)),
+}
+
 # ================================================= #
 # ************** 录制流量代理配置  ************** #
 # ================================================= #
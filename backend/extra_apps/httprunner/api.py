@@ -1,5 +1,6 @@
 # encoding: utf-8
 
+import contextvars
 import logging
 import os
 import unittest
@@ -20,6 +21,12 @@ class HttpRunner(object):
             resultclass (class): HtmlTestResult or TextTestResult
             failfast (bool): False/True, stop the test run on the first error or failure.
             http_client_session (instance): requests.Session(), or locust.client.Session() instance.
+            connection_pool (instance): client.ConnectionPoolManager() instance shared by all testcases,
+                reuse connections per origin while each testcase keeps its own cookies.
+            body_store (instance): body.BodyStore() instance shared by all testcases,
+                limit response bodies kept in memory, spilled files are removed by BodyStore.close().
+            report_sink (instance): object with write(testcase_summary) method, called as soon as
+                each testcase finished, it may persist and release the testcase records.
 
         Attributes:
             project_mapping (dict): save project loaded api/testcases, environments and debugtalk.py module.
@@ -36,6 +43,9 @@ class HttpRunner(object):
         """
         self.exception_stage = "initialize HttpRunner()"
         self.http_client_session = kwargs.pop("http_client_session", None)
+        self.connection_pool = kwargs.pop("connection_pool", None)
+        self.body_store = kwargs.pop("body_store", None)
+        self.report_sink = kwargs.pop("report_sink", None)
         kwargs.setdefault("resultclass", report.HtmlTestResult)
         self.unittest_runner = unittest.TextTestRunner(**kwargs)
         self.test_loader = unittest.TestLoader()
@@ -50,14 +60,36 @@ class HttpRunner(object):
         Returns:
             tuple: unittest.TestSuite()
 
+        """
+        return unittest.TestSuite(self._iter_tests(testcases))
+
+    def _iter_tests(self, testcases):
+        """initialize testcase with Runner() lazily, testcase is loaded when it is about to run.
+
+        Args:
+            testcases (iterable): parsed testcases, e.g. generator of parser.iter_tests
+
+        Yields:
+            loaded testcase, unittest.TestSuite() with config, teststeps and runner attributes
+
         """
 
         def _add_teststep(test_runner, config, teststep_dict):
             """add teststep to testcase."""
+            try:
+                # 加载时编译校验器，重复执行时不再解析校验器和查找比较函数
+                validators = parser.compile_validators(
+                    teststep_dict.get("validate", [])
+                    or teststep_dict.get("validators", []),
+                    config.get("functions", {}),
+                )
+            except exceptions.MyBaseError:
+                # 校验器有误时保持原有行为，执行步骤时再抛出异常
+                validators = None
 
             def test(self):
                 try:
-                    test_runner.run_test(teststep_dict)
+                    test_runner.run_test(teststep_dict, validators)
                 except exceptions.MyBaseFailure as ex:
                     self.fail(str(ex))
 
@@ -79,10 +111,11 @@ class HttpRunner(object):
             test.__doc__ = teststep_dict["name"]
             return test
 
-        test_suite = unittest.TestSuite()
         for testcase in testcases:
             config = testcase.get("config", {})
-            test_runner = runner.Runner(config, self.http_client_session)
+            test_runner = runner.Runner(
+                config, self.http_client_session, self.connection_pool, self.body_store
+            )
             TestSequense = type("TestSequense", (unittest.TestCase,), {})
 
             teststeps = testcase.get("teststeps", [])
@@ -98,36 +131,57 @@ class HttpRunner(object):
             setattr(loaded_testcase, "config", config)
             setattr(loaded_testcase, "teststeps", testcase.get("teststeps", []))
             setattr(loaded_testcase, "runner", test_runner)
-            test_suite.addTest(loaded_testcase)
-
-        return test_suite
+            yield loaded_testcase
 
     def _run_suite(self, test_suite):
         """run tests in test_suite
 
         Args:
-            test_suite: unittest.TestSuite()
+            test_suite: unittest.TestSuite(), or iterable of loaded testcases
 
         Returns:
-            list: tests_results
+            list: testcase summaries
 
         """
-        tests_results = []
+        testcase_summaries = []
 
         for testcase in test_suite:
             testcase_name = testcase.config.get("name")
             logger.info("Start to run testcase: {}".format(testcase_name))
 
             result = self.unittest_runner.run(testcase)
-            tests_results.append((testcase, result))
+            testcase_summary = self._get_testcase_summary(testcase, result)
+            if self.report_sink is not None:
+                self.report_sink.write(testcase_summary)
+            testcase_summaries.append(testcase_summary)
+
+        return testcase_summaries
 
-        return tests_results
+    @staticmethod
+    def _get_testcase_summary(testcase, result):
+        """get summary of one testcase
 
-    def _aggregate(self, tests_results):
+        Args:
+            testcase: loaded testcase
+            result: unittest result of testcase
+
+        """
+        testcase_summary = report.get_summary(result)
+        testcase_summary["name"] = testcase.config.get("name")
+        testcase_summary["base_url"] = testcase.config.get("request", {}).get(
+            "base_url", ""
+        )
+
+        in_out = utils.get_testcase_io(testcase)
+        utils.print_io(in_out)
+        testcase_summary["in_out"] = in_out
+        return testcase_summary
+
+    def _aggregate(self, testcase_summaries):
         """aggregate results
 
         Args:
-            tests_results (list): list of (testcase, result)
+            testcase_summaries (list): list of testcase summary
 
         """
         self.summary = {
@@ -135,28 +189,20 @@ class HttpRunner(object):
             "stat": {},
             "time": {},
             "platform": report.get_platform(),
+            "timings": {},
             "details": [],
         }
 
-        for tests_result in tests_results:
-            testcase, result = tests_result
-            testcase_summary = report.get_summary(result)
-
+        for testcase_summary in testcase_summaries:
             self.summary["success"] &= testcase_summary["success"]
-            testcase_summary["name"] = testcase.config.get("name")
-            testcase_summary["base_url"] = testcase.config.get("request", {}).get(
-                "base_url", ""
-            )
-
-            in_out = utils.get_testcase_io(testcase)
-            utils.print_io(in_out)
-            testcase_summary["in_out"] = in_out
 
             report.aggregate_stat(self.summary["stat"], testcase_summary["stat"])
             report.aggregate_stat(self.summary["time"], testcase_summary["time"])
 
             self.summary["details"].append(testcase_summary)
 
+        self.summary["timings"] = report.get_timings_stat(self.summary["details"])
+
     def _run_tests(self, testcases, mapping=None):
         """start to run test with variables mapping.
 
@@ -200,11 +246,18 @@ class HttpRunner(object):
             instance: HttpRunner() instance
 
         """
+        # run in a copied context, runtime registry such as runner.current_runner
+        # is isolated between threads/greenlets/tasks and released when the run ends.
+        return contextvars.copy_context().run(self._run_tests_in_context, testcases, mapping)
+
+    def _run_tests_in_context(self, testcases, mapping=None):
+        # testcases are parsed and loaded lazily while running,
+        # parameters combinations are expanded one by one instead of all at once.
         self.exception_stage = "parse tests"
-        parsed_testcases_list = parser.parse_tests(testcases, mapping)
+        parsed_testcases = parser.iter_tests(testcases, mapping)
 
         self.exception_stage = "add tests to test suite"
-        test_suite = self._add_tests(parsed_testcases_list)
+        test_suite = self._iter_tests(parsed_testcases)
 
         self.exception_stage = "run test suite"
         results = self._run_suite(test_suite)
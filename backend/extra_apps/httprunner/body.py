@@ -0,0 +1,173 @@
+# encoding: utf-8
+
+import logging
+import os
+import shutil
+import tempfile
+import threading
+
+from requests.compat import chardet
+
+from httprunner.compat import json
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseBody(object):
+    """ Response body kept as raw bytes only once, text and json are computed on access.
+
+    The bytes are either held in memory or spilled to a file by BodyStore,
+    in which case they are read back on access. In-memory bytes are counted
+    in the store's memory budget until the body is released.
+    """
+    __slots__ = ("encoding", "size", "_content", "_path", "_store")
+
+    def __init__(self, content, encoding=None, path=None, store=None):
+        self.encoding = encoding
+        self.size = len(content or b"") if path is None else os.path.getsize(path)
+        self._content = content if path is None else None
+        self._path = path
+        self._store = store
+
+    def __repr__(self):
+        return "<ResponseBody size={} spilled={}>".format(self.size, self.spilled)
+
+    @property
+    def spilled(self):
+        return self._path is not None
+
+    @property
+    def content(self):
+        if self._path is None:
+            return self._content
+
+        with open(self._path, "rb") as fp:
+            return fp.read()
+
+    @property
+    def text(self):
+        """ decode content the same way as requests.Response.text
+        """
+        content = self.content
+        if not content:
+            return ""
+
+        encoding = self.encoding or chardet.detect(content)["encoding"]
+        try:
+            return str(content, encoding or "utf-8", errors="replace")
+        except (LookupError, TypeError):
+            return str(content, errors="replace")
+
+    def json(self):
+        """ parse content as json, return None if content is not valid json
+        """
+        try:
+            return json.loads(self.text)
+        except ValueError:
+            return None
+
+    def release(self):
+        """ drop content and remove spilled file, in-memory bytes are given back to the store's budget
+        """
+        if self._path is not None:
+            if os.path.isfile(self._path):
+                os.remove(self._path)
+        elif self._content is not None and self._store is not None:
+            self._store.free(self.size)
+        self._content = None
+        self._path = None
+        self._store = None
+
+
+class BodyStore(object):
+    """ Run-level store of response bodies with optional memory limits.
+
+    Args:
+        max_body_size (int): bodies larger than this (bytes) are spilled to disk, None for no cap.
+        memory_budget (int): total bytes of unreleased bodies kept in memory at the same time,
+            bodies exceeding the budget are spilled to disk, None for no budget.
+        spill_dir (str): parent directory of spilled files, default to system temp directory.
+
+    """
+    def __init__(self, max_body_size=None, memory_budget=None, spill_dir=None):
+        self.max_body_size = max_body_size
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.memory_used = 0
+        self._tmp_dir = None
+        self._lock = threading.Lock()
+
+    def _should_spill(self, size):
+        if self.max_body_size and size > self.max_body_size:
+            return True
+        if self.memory_budget and self.memory_used + size > self.memory_budget:
+            return True
+        return False
+
+    def _spill(self, content):
+        if self._tmp_dir is None:
+            self._tmp_dir = tempfile.mkdtemp(prefix="hrun_body_", dir=self.spill_dir)
+        fd, path = tempfile.mkstemp(dir=self._tmp_dir)
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(content)
+        return path
+
+    def create(self, content, encoding=None):
+        """ create ResponseBody, spill content to disk if it exceeds body size cap or memory budget
+        """
+        content = content or b""
+        size = len(content)
+        with self._lock:
+            spill = self._should_spill(size)
+            if spill:
+                path = self._spill(content)
+            else:
+                self.memory_used += size
+
+        if spill:
+            logger.debug("response body of {} bytes spilled to {}".format(size, path))
+            return ResponseBody(None, encoding, path=path)
+
+        return ResponseBody(content, encoding, store=self)
+
+    def free(self, size):
+        """ give back memory of a released in-memory body
+        """
+        with self._lock:
+            self.memory_used = max(self.memory_used - size, 0)
+
+    def close(self):
+        """ remove all spilled files, should be called after the run's report is persisted
+        """
+        with self._lock:
+            if self._tmp_dir is not None:
+                shutil.rmtree(self._tmp_dir, ignore_errors=True)
+                self._tmp_dir = None
+            self.memory_used = 0
+
+
+def materialize(response_meta, with_text=False):
+    """ replace lazy body in response meta_data with serializable content and json.
+
+    Args:
+        response_meta (dict): meta_data["response"] with "body" of ResponseBody
+        with_text (bool): also set decoded "text", content is kept as bytes in this case.
+
+    Returns:
+        dict: response_meta, "content" is decoded str unless with_text is True.
+
+    """
+    body = response_meta.pop("body", None)
+    if not isinstance(body, ResponseBody):
+        # request failed before response received
+        response_meta.setdefault("content", None)
+        return response_meta
+
+    if with_text:
+        response_meta["content"] = body.content
+        response_meta["text"] = body.text
+    else:
+        response_meta["content"] = body.text
+    response_meta["json"] = body.json()
+    body.release()
+    return response_meta
@@ -1,6 +1,8 @@
 # encoding: utf-8
 
 import re
+import socket
+import threading
 
 import curlify
 import time
@@ -9,10 +11,17 @@ import logging
 import requests
 import urllib3
 # from httprunner import logger
+from httprunner.body import BodyStore
 from httprunner.exceptions import ParamsError
 from requests import Request, Response
+from requests.adapters import HTTPAdapter
 from requests.exceptions import (InvalidSchema, InvalidURL, MissingSchema,
                                  RequestException)
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+from urllib3.util import parse_url
+from urllib3.util.connection import allowed_gai_family
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -30,6 +39,222 @@ class ApiResponse(Response):
         Response.raise_for_status(self)
 
 
+def _elapsed_ms(start, end):
+    return round((end - start) * 1000, 2)
+
+
+class PhaseTimingMixin(object):
+    """
+    Record per-phase network timings on urllib3 connections.
+
+    dns_ms/connect_ms/tls_ms are only non-zero for the request that opened the connection,
+    a request on a reused keep-alive connection reports 0 for them. The timings are attached
+    to the http.client response as `phase_timings` and reset for the next request.
+    """
+    def _reset_phase_timings(self):
+        self.phase_timings = {"dns_ms": 0, "connect_ms": 0, "tls_ms": 0}
+        self._request_sent_at = None
+
+    def _new_conn(self):
+        if not hasattr(self, "phase_timings"):
+            self._reset_phase_timings()
+
+        dns_start = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(
+                self._dns_host, self.port, allowed_gai_family(), socket.SOCK_STREAM
+            )
+        except socket.error:
+            # let urllib3 raise its own NewConnectionError
+            return super(PhaseTimingMixin, self)._new_conn()
+        connect_start = time.perf_counter()
+        self.phase_timings["dns_ms"] = _elapsed_ms(dns_start, connect_start)
+
+        # connect to the resolved address directly, so name resolution is not repeated
+        dns_host = self._dns_host
+        try:
+            for index, address in enumerate(addresses):
+                self._dns_host = address[4][0]
+                try:
+                    conn = super(PhaseTimingMixin, self)._new_conn()
+                    break
+                except NewConnectionError:
+                    if index == len(addresses) - 1:
+                        raise
+        finally:
+            self._dns_host = dns_host
+
+        self.phase_timings["connect_ms"] = _elapsed_ms(connect_start, time.perf_counter())
+        return conn
+
+    def request(self, *args, **kwargs):
+        super(PhaseTimingMixin, self).request(*args, **kwargs)
+        self._request_sent_at = time.perf_counter()
+
+    def request_chunked(self, *args, **kwargs):
+        super(PhaseTimingMixin, self).request_chunked(*args, **kwargs)
+        self._request_sent_at = time.perf_counter()
+
+    def getresponse(self, *args, **kwargs):
+        if not hasattr(self, "phase_timings"):
+            self._reset_phase_timings()
+        httplib_response = super(PhaseTimingMixin, self).getresponse(*args, **kwargs)
+        headers_at = time.perf_counter()
+        timings = dict(self.phase_timings)
+        timings["ttfb_ms"] = (
+            _elapsed_ms(self._request_sent_at, headers_at) if self._request_sent_at else 0
+        )
+        timings["headers_at"] = headers_at
+        httplib_response.phase_timings = timings
+        self._reset_phase_timings()
+        return httplib_response
+
+
+class TimedHTTPConnection(PhaseTimingMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(PhaseTimingMixin, HTTPSConnection):
+
+    def connect(self):
+        if not hasattr(self, "phase_timings"):
+            self._reset_phase_timings()
+        connect_start = time.perf_counter()
+        super(TimedHTTPSConnection, self).connect()
+        # connect() = _new_conn() (dns + tcp) + tls handshake
+        total_ms = _elapsed_ms(connect_start, time.perf_counter())
+        self.phase_timings["tls_ms"] = round(
+            max(total_ms - self.phase_timings["dns_ms"] - self.phase_timings["connect_ms"], 0), 2
+        )
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """
+    HTTPAdapter whose connection pools record per-phase network timings.
+    """
+    def init_poolmanager(self, *args, **kwargs):
+        super(TimedHTTPAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool,
+        }
+
+
+def get_phase_timings(response, finished_at):
+    """ get per-phase network timings of response.
+
+    Args:
+        response (requests.Response): response sent by TimedHTTPAdapter.
+        finished_at (float): time.perf_counter() when response content was downloaded.
+
+    Returns:
+        dict: timings in ms, empty if the response was not sent by TimedHTTPAdapter.
+            {
+                "dns_ms": 1.2,
+                "connect_ms": 3.4,
+                "tls_ms": 10.5,
+                "ttfb_ms": 30.2,
+                "download_ms": 2.1
+            }
+
+    """
+    raw = getattr(response, "raw", None)
+    timings = getattr(getattr(raw, "_original_response", None), "phase_timings", None)
+    if not timings:
+        return {}
+
+    timings = dict(timings)
+    headers_at = timings.pop("headers_at")
+    timings["download_ms"] = _elapsed_ms(headers_at, max(finished_at, headers_at))
+    return timings
+
+
+class ConnectionPoolManager(object):
+    """
+    Run-level manager of HTTP connection pools, keyed by origin (scheme://host:port).
+
+    Every HttpSession bound to the same manager sends its requests through the shared
+    adapter of the target origin, so TCP/TLS connections are reused across testcases,
+    while cookies stay isolated because each testcase still owns its HttpSession.
+    Adapters are thread-safe, so one manager may be shared by parallel runners.
+    """
+    def __init__(self, pool_connections=10, pool_maxsize=50, pool_block=False,
+                 max_retries=0, keep_alive=True):
+        """
+        Args:
+            pool_connections (int): number of host pools cached by each origin adapter.
+            pool_maxsize (int): max connections kept alive per origin.
+            pool_block (bool): block when no free connection instead of opening a new one.
+            max_retries (int): retries for failed connections, as requests' HTTPAdapter.
+            keep_alive (bool): enable TCP keep-alive probes on pooled sockets.
+
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.max_retries = max_retries
+        self.keep_alive = keep_alive
+        self._adapters = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def get_origin(url):
+        """ get origin of url, default ports are made explicit so they share one pool
+        """
+        parsed_url = parse_url(url)
+        scheme = (parsed_url.scheme or "http").lower()
+        port = parsed_url.port or (443 if scheme == "https" else 80)
+        return "{}://{}:{}".format(scheme, (parsed_url.host or "").lower(), port)
+
+    def _new_adapter(self):
+        adapter = TimedHTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=self.max_retries,
+            pool_block=self.pool_block
+        )
+        if self.keep_alive:
+            socket_options = HTTPConnection.default_socket_options + [
+                (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+            ]
+            adapter.init_poolmanager(
+                self.pool_connections,
+                self.pool_maxsize,
+                block=self.pool_block,
+                socket_options=socket_options
+            )
+        return adapter
+
+    def get_adapter(self, url):
+        """ get the shared adapter of url's origin, create it on first use
+        """
+        origin = self.get_origin(url)
+        adapter = self._adapters.get(origin)
+        if adapter is None:
+            with self._lock:
+                adapter = self._adapters.get(origin)
+                if adapter is None:
+                    adapter = self._new_adapter()
+                    self._adapters[origin] = adapter
+        return adapter
+
+    def close(self):
+        """ close all pooled connections, should be called when the run finished
+        """
+        with self._lock:
+            for adapter in self._adapters.values():
+                adapter.close()
+            self._adapters.clear()
+
+
 class HttpSession(requests.Session):
     """
     Class for performing HTTP requests and holding (session-) cookies between requests (in order
@@ -43,11 +268,27 @@ class HttpSession(requests.Session):
     part of the URL will be prepended with the HttpSession.base_url which is normally inherited
     from a HttpRunner class' host property.
     """
-    def __init__(self, base_url=None, *args, **kwargs):
+    def __init__(self, base_url=None, connection_pool=None, body_store=None, *args, **kwargs):
         super(HttpSession, self).__init__(*args, **kwargs)
         self.base_url = base_url if base_url else ""
+        # ConnectionPoolManager shared by the run, None to use session's own adapters
+        self.connection_pool = connection_pool
+        # BodyStore shared by the run, keeps response bodies within size cap and memory budget
+        self.body_store = body_store or BodyStore()
+        self.mount("https://", TimedHTTPAdapter())
+        self.mount("http://", TimedHTTPAdapter())
         self.init_meta_data()
 
+    def get_adapter(self, url):
+        if self.connection_pool is not None:
+            return self.connection_pool.get_adapter(url)
+        return super(HttpSession, self).get_adapter(url)
+
+    def close(self):
+        # shared adapters are owned and closed by the connection pool manager
+        if self.connection_pool is None:
+            super(HttpSession, self).close()
+
     def _build_url(self, path):
         """ prepend url with hostname unless it's already an absolute URL """
         if absolute_http_url_regexp.match(path):
@@ -74,9 +315,11 @@ class HttpSession(requests.Session):
                 "response_time_ms": "N/A",
                 "elapsed_ms": "N/A",
                 "encoding": None,
-                "content": None,
+                "body": None,
                 "content_type": ""
-            }
+            },
+            # per-phase network timings, kept out of response which reports list item by item
+            "timings": {}
         }
 
     def request(self, method, url, name=None, **kwargs):
@@ -135,11 +378,14 @@ class HttpSession(requests.Session):
 
         kwargs.setdefault("timeout", 120)
         response = self._send_request_safe_mode(method, url, **kwargs)
+        finished_at = time.perf_counter()
 
         # record the consumed time
         self.meta_data["response"]["response_time_ms"] = \
             round((time.time() - self.meta_data["request"]["start_timestamp"]) * 1000, 2)
-        self.meta_data["response"]["elapsed_ms"] = response.elapsed.microseconds / 1000.0
+        self.meta_data["response"]["elapsed_ms"] = round(response.elapsed.total_seconds() * 1000, 2)
+        # dns, connect, tls, ttfb and download timings of the final response
+        self.meta_data["timings"] = get_phase_timings(response, finished_at)
 
         # record actual request info
         self.meta_data["request"]["url"] = (response.history and response.history[0] or response).request.url
@@ -157,21 +403,18 @@ class HttpSession(requests.Session):
         self.meta_data["response"]["headers"] = dict(response.headers)
         self.meta_data["response"]["cookies"] = response.cookies or {}
         self.meta_data["response"]["encoding"] = response.encoding
-        self.meta_data["response"]["content"] = response.content
-        self.meta_data["response"]["text"] = response.text
         self.meta_data["response"]["content_type"] = response.headers.get("Content-Type", "")
 
-        try:
-            self.meta_data["response"]["json"] = response.json()
-        except ValueError:
-            self.meta_data["response"]["json"] = None
-
         # get the length of the content, but if the argument stream is set to True, we take
         # the size from the content-length header, in order to not trigger fetching of the body
         if kwargs.get("stream", False):
             self.meta_data["response"]["content_size"] = int(self.meta_data["response"]["headers"].get("content-length") or 0)
+            self.meta_data["response"]["body"] = self.body_store.create(b"", response.encoding)
         else:
-            self.meta_data["response"]["content_size"] = len(response.content or "")
+            # raw bytes are kept once, text and json are decoded lazily, see body.materialize
+            body = self.body_store.create(response.content, response.encoding)
+            self.meta_data["response"]["body"] = body
+            self.meta_data["response"]["content_size"] = body.size
 
         # log response details in debug mode
         log_print("response")
@@ -135,7 +135,7 @@ class Context(object):
         """ evaluate check item in validator.
 
         Args:
-            validator (dict): validator
+            validator (parser.Validator): validator compiled from
                 {"check": "status_code", "comparator": "eq", "expect": 201}
                 {"check": "$resp_body_success", "comparator": "eq", "expect": True}
             resp_obj (object): requests.Response() object
@@ -150,7 +150,7 @@ class Context(object):
                 }
 
         """
-        check_item = validator["check"]
+        check_item = validator.check
         # check_item should only be the following 5 formats:
         # 1, variable reference, e.g. $token
         # 2, function reference, e.g. ${is_status_code_200($status_code)}
@@ -158,9 +158,7 @@ class Context(object):
         # 4, string joined by delimiter. e.g. "status_code", "headers.content-type"
         # 5, regex string, e.g. "LB[\d]*(.*)RB[\d]*"
 
-        if isinstance(check_item, (dict, list)) \
-            or parser.extract_variables(check_item) \
-            or parser.extract_functions(check_item):
+        if validator.check_is_template:
             # format 1/2/3
             check_value = self.eval_content(check_item)
 
@@ -172,21 +170,23 @@ class Context(object):
             # format 4/5
             check_value = resp_obj.extract_field(check_item)
 
-        validator["check_value"] = check_value
+        validator_dict = validator.to_dict()
+        validator_dict["check_value"] = check_value
 
         # expect_value should only be in 2 types:
         # 1, variable reference, e.g. $expect_status_code
         # 2, actual value, e.g. 200
-        expect_value = self.eval_content(validator["expect"])
-        validator["expect"] = expect_value
-        validator["check_result"] = "unchecked"
-        return validator
+        if validator.expect_is_template:
+            validator_dict["expect"] = self.eval_content(validator.expect)
+        validator_dict["check_result"] = "unchecked"
+        return validator_dict
 
-    def _do_validation(self, validator_dict):
+    def _do_validation(self, validator, validator_dict):
         """ validate with functions
 
         Args:
-            validator_dict (dict): validator dict
+            validator (parser.Validator): compiled validator
+            validator_dict (dict): evaluated validator dict
                 {
                     "check": "status_code",
                     "check_value": 200,
@@ -195,10 +195,7 @@ class Context(object):
                 }
 
         """
-        # TODO: move comparator uniform to init_test_suites
-        comparator = utils.get_uniform_comparator(validator_dict["comparator"])
-        validate_func = parser.get_mapping_function(comparator, self.TESTCASE_SHARED_FUNCTIONS_MAPPING)
-
+        comparator = validator.uniform_comparator
         check_item = validator_dict["check"]
         check_value = validator_dict["check_value"]
         expect_value = validator_dict["expect"]
@@ -207,19 +204,24 @@ class Context(object):
             and comparator not in ["is", "eq", "equals", "not_equals", "=="]:
             raise exceptions.ParamsError("Null value can only be compared with comparator: eq/equals/==")
 
-        validate_msg = "validate: {} {} {}({})".format(
-            check_item,
-            comparator,
-            expect_value,
-            type(expect_value).__name__
-        )
-
         try:
             validator_dict["check_result"] = "pass"
-            validate_func(check_value, expect_value)
-            validate_msg += "\t==> pass"
-            logger.debug(validate_msg)
+            validator.validate_func(check_value, expect_value)
+            # message is formatted only when debug logging is enabled
+            logger.debug(
+                "validate: %s %s %s(%s)\t==> pass",
+                check_item,
+                comparator,
+                expect_value,
+                type(expect_value).__name__
+            )
         except (AssertionError, TypeError):
+            validate_msg = "validate: {} {} {}({})".format(
+                check_item,
+                comparator,
+                expect_value,
+                type(expect_value).__name__
+            )
             validate_msg += "\t==> fail"
             validate_msg += "\n{}({}) {} {}({})".format(
                 check_value,
@@ -234,6 +236,13 @@ class Context(object):
 
     def validate(self, validators, resp_obj):
         """ make validations
+
+        Args:
+            validators (list): validators of teststep, compiled parser.Validator or raw validator dict.
+                raw validators are compiled here, compile them once when loading tests to avoid
+                parsing and resolving comparators for each run.
+            resp_obj (object): response.ResponseObject() object
+
         """
         evaluated_validators = []
         if not validators:
@@ -244,14 +253,14 @@ class Context(object):
         failures = []
 
         for validator in validators:
-            # evaluate validators with context variable mapping.
-            evaluated_validator = self.__eval_check_item(
-                parser.parse_validator(validator),
-                resp_obj
+            validator = parser.compile_validator(
+                validator, self.TESTCASE_SHARED_FUNCTIONS_MAPPING
             )
+            # evaluate validators with context variable mapping.
+            evaluated_validator = self.__eval_check_item(validator, resp_obj)
 
             try:
-                self._do_validation(evaluated_validator)
+                self._do_validation(validator, evaluated_validator)
             except exceptions.ValidationFailure as ex:
                 validate_pass = False
                 failures.append(str(ex))
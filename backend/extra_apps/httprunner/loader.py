@@ -1,3 +1,4 @@
+import array
 import collections
 import csv
 import importlib
@@ -85,6 +86,182 @@ def load_csv_file(csv_file):
     return csv_content_list
 
 
+class CSVParameters(object):
+    """ streaming csv parameter source, rows are read from file on demand.
+
+    Iterating reads the file row by row, so the source can be iterated many times
+    (e.g. as inner parameter of cartesian product) without holding all rows in memory.
+    Random access and len() use an index of row byte offsets built on first use,
+    which is what pairwise/sample parameters modes and chunked dispatch rely on.
+
+    Rows are the same as csv.DictReader: missing values are None, extra values are
+    listed under None key, empty lines are skipped.
+
+    Args:
+        csv_file (str): csv file path, first row is header
+        keys (list): only keep these columns in rows, default to all columns
+        start (int): first row index of this source, used by chunks
+        stop (int): row index after the last row of this source, None for end of file
+        encoding (str): file encoding
+
+    """
+
+    def __init__(self, csv_file, keys=None, start=0, stop=None, encoding="utf-8"):
+        self.csv_file = csv_file
+        self.keys = keys
+        self.start = start
+        self.stop = stop
+        self.encoding = encoding
+        self._fieldnames = None
+        self._offsets = None
+
+    def __repr__(self):
+        return "<CSVParameters {} [{}:{}]>".format(self.csv_file, self.start, self.stop)
+
+    def _iter_raw_rows(self, from_offset=0):
+        """ yield (offset, values) of each data row, offset is the byte offset of row in file
+
+        Args:
+            from_offset (int): start reading from this offset of data row, header is read first if not loaded
+
+        """
+        if from_offset and self._fieldnames is None:
+            self._fieldnames = self.fieldnames
+
+        with io.open(self.csv_file, "rb") as csvfile:
+            csvfile.seek(from_offset)
+            position = from_offset
+
+            def _lines():
+                nonlocal position
+                for raw_line in csvfile:
+                    position += len(raw_line)
+                    yield raw_line.decode(self.encoding)
+
+            # csv reader reads exactly the lines of one row each time, without read ahead
+            reader = csv.reader(_lines())
+            offset = position
+            header_pending = from_offset == 0
+            for values in reader:
+                if header_pending:
+                    self._fieldnames = values
+                    header_pending = False
+                elif values:
+                    yield offset, values
+                offset = position
+
+    @property
+    def fieldnames(self):
+        if self._fieldnames is None:
+            for _ in self._iter_raw_rows():
+                break
+        return self._fieldnames or []
+
+    def _make_row(self, values):
+        fieldnames = self.fieldnames
+        row = dict(zip(fieldnames, values))
+        if len(values) > len(fieldnames):
+            row[None] = values[len(fieldnames):]
+        elif len(values) < len(fieldnames):
+            for key in fieldnames[len(values):]:
+                row[key] = None
+
+        if self.keys is not None:
+            row = {key: row[key] for key in self.keys}
+        return row
+
+    def _build_offsets(self):
+        if self._offsets is None:
+            offsets = array.array("q")
+            for offset, _ in self._iter_raw_rows():
+                offsets.append(offset)
+            self._offsets = offsets
+        return self._offsets
+
+    def _range(self):
+        count = len(self._build_offsets())
+        stop = count if self.stop is None else min(self.stop, count)
+        return min(self.start, stop), stop
+
+    def __iter__(self):
+        index = 0
+        from_offset = 0
+        if self.start and self._offsets is not None:
+            # seek to the first row of chunk directly
+            if self.start >= len(self._offsets):
+                return
+            index = self.start
+            from_offset = self._offsets[self.start]
+
+        for _, values in self._iter_raw_rows(from_offset):
+            if self.stop is not None and index >= self.stop:
+                break
+            if index >= self.start:
+                yield self._make_row(values)
+            index += 1
+
+    def __len__(self):
+        start, stop = self._range()
+        return stop - start
+
+    def __getitem__(self, index):
+        start, stop = self._range()
+        if index < 0:
+            index += stop - start
+        if not 0 <= index < stop - start:
+            raise IndexError("csv row index out of range: {}".format(index))
+
+        offsets = self._build_offsets()
+        with io.open(self.csv_file, "rb") as csvfile:
+            csvfile.seek(offsets[start + index])
+            lines = (raw_line.decode(self.encoding) for raw_line in csvfile)
+            values = next(csv.reader(lines))
+
+        return self._make_row(values)
+
+    def select(self, keys):
+        """ get source of the same rows with only specified columns
+        """
+        source = CSVParameters(self.csv_file, keys, self.start, self.stop, self.encoding)
+        source._fieldnames = self._fieldnames
+        source._offsets = self._offsets
+        return source
+
+    def chunks(self, chunk_size):
+        """ split rows into sources of at most chunk_size rows, e.g. for dispatching to parallel workers.
+            each chunk reads its own rows from file, no rows are loaded here.
+        """
+        start, stop = self._range()
+        for chunk_start in range(start, stop, chunk_size):
+            chunk = CSVParameters(
+                self.csv_file,
+                self.keys,
+                chunk_start,
+                min(chunk_start + chunk_size, stop),
+                self.encoding,
+            )
+            chunk._fieldnames = self._fieldnames
+            chunk._offsets = self._offsets
+            yield chunk
+
+
+def load_csv_parameters(csv_file, encoding="utf-8"):
+    """ load csv file as streaming parameter source, used by ${parameterize(account.csv)}
+
+    Args:
+        csv_file (str): csv file path
+
+    Returns:
+        CSVParameters: rows in dict format, read from file on demand
+            e.g. {'username': 'test1', 'password': '111111'}
+
+    """
+    if not os.path.isfile(csv_file):
+        raise exceptions.FileNotFound("{} does not exist.".format(csv_file))
+
+    return CSVParameters(csv_file, encoding=encoding)
+
+
 def load_file(file_path):
     if not os.path.isfile(file_path):
         raise exceptions.FileNotFound("{} does not exist.".format(file_path))
@@ -1,7 +1,11 @@
 # encoding: utf-8
 
 import ast
+import functools
+import itertools
 import logging
+import operator
+import random
 import re
 
 # from loguru import logger
@@ -219,6 +223,108 @@ def parse_validator(validator):
     }
 
 
+def is_template(content):
+    """check if content contains $ notation and should be parsed with parse_data.
+    """
+    if isinstance(content, basestring):
+        return "$" in content
+
+    if isinstance(content, (list, set, tuple)):
+        return any(is_template(item) for item in content)
+
+    if isinstance(content, dict):
+        return any(
+            is_template(key) or is_template(value) for key, value in content.items()
+        )
+
+    return False
+
+
+class Validator(object):
+    """validator parsed once when tests are loaded, see compile_validator.
+
+    Attributes:
+        check: check item, e.g. "status_code", "$resp_body_success"
+        expect: expect value, e.g. 201
+        comparator (str): comparator in validator, e.g. "eq"
+        uniform_comparator (str): uniform comparator name, e.g. "equals"
+        desc (str): validator description
+        validate_func (function): resolved comparator function
+        check_is_template (bool): check item should be evaluated before extracting
+        expect_is_template (bool): expect value should be evaluated with parse_data
+
+    """
+
+    __slots__ = (
+        "check",
+        "expect",
+        "comparator",
+        "uniform_comparator",
+        "desc",
+        "validate_func",
+        "check_is_template",
+        "expect_is_template",
+    )
+
+    def __init__(self, parsed_validator, functions_mapping):
+        self.check = parsed_validator["check"]
+        self.expect = parsed_validator["expect"]
+        self.comparator = parsed_validator["comparator"]
+        self.desc = parsed_validator["desc"]
+        self.uniform_comparator = utils.get_uniform_comparator(self.comparator)
+        self.validate_func = get_mapping_function(
+            self.uniform_comparator, functions_mapping
+        )
+        # same rule as check item evaluation in Context.validate
+        self.check_is_template = bool(
+            isinstance(self.check, (dict, list))
+            or extract_variables(self.check)
+            or extract_functions(self.check)
+        )
+        self.expect_is_template = is_template(self.expect)
+
+    def __repr__(self):
+        return "<Validator {} {} {}>".format(self.check, self.comparator, self.expect)
+
+    def to_dict(self):
+        return {
+            "check": self.check,
+            "expect": self.expect,
+            "comparator": self.comparator,
+            "desc": self.desc,
+        }
+
+
+def compile_validator(validator, functions_mapping):
+    """parse validator and resolve its comparator function.
+
+    Args:
+        validator (dict/Validator): validator in any format supported by parse_validator,
+            compiled Validator is returned as is.
+        functions_mapping (dict): functions mapping of testcase, used to resolve comparator.
+
+    Returns:
+        Validator: compiled validator
+
+    Raises:
+        exceptions.ParamsError: invalid validator
+        exceptions.FunctionNotFound: comparator is neither defined in debugtalk.py nor builtin.
+
+    """
+    if isinstance(validator, Validator):
+        return validator
+
+    return Validator(parse_validator(validator), functions_mapping)
+
+
+def compile_validators(validators, functions_mapping):
+    """compile validators list of teststep, see compile_validator.
+    """
+    return [
+        compile_validator(validator, functions_mapping) for validator in validators or []
+    ]
+
+
 def substitute_variables(content, variables_mapping):
     """substitute variables in content with variables_mapping
 
@@ -296,6 +402,23 @@ def parse_parameters(parameters, variables_mapping, functions_mapping):
         ]
         >>> parse_parameters(parameters)
 
+    """
+    parsed_parameters_list = load_parameters(
+        parameters, variables_mapping, functions_mapping
+    )
+    return utils.gen_cartesian_product(*parsed_parameters_list)
+
+
+def load_parameters(parameters, variables_mapping, functions_mapping):
+    """load value list of each parameter, see parse_parameters.
+
+    Returns:
+        list: parameter dicts list of each parameter
+            [
+                [{"user_agent": "iOS/10.1"}, {"user_agent": "iOS/10.2"}],
+                [{"username": "user1", "password": "111111"}, {"username": "user2", "password": "222222"}]
+            ]
+
     """
     parsed_parameters_list = []
     for parameter in parameters:
@@ -326,18 +449,110 @@ def parse_parameters(parameters, variables_mapping, functions_mapping):
             )
             # e.g. [{'app_version': '2.8.5'}, {'app_version': '2.8.6'}]
             # e.g. [{"username": "user1", "password": "111111"}, {"username": "user2", "password": "222222"}]
-            if not isinstance(parsed_parameter_content, list):
-                raise exceptions.ParamsError("parameters syntax error!")
+            from httprunner import loader
 
-            parameter_content_list = [
-                # get subset by parameter name
-                {key: parameter_item[key] for key in parameter_name_list}
-                for parameter_item in parsed_parameter_content
-            ]
+            if isinstance(parsed_parameter_content, loader.CSVParameters):
+                # csv rows are read from file on demand, get subset by parameter name
+                parameter_content_list = parsed_parameter_content.select(
+                    parameter_name_list
+                )
+            elif not isinstance(parsed_parameter_content, list):
+                raise exceptions.ParamsError("parameters syntax error!")
+            else:
+                parameter_content_list = [
+                    # get subset by parameter name
+                    {key: parameter_item[key] for key in parameter_name_list}
+                    for parameter_item in parsed_parameter_content
+                ]
 
         parsed_parameters_list.append(parameter_content_list)
 
-    return utils.gen_cartesian_product(*parsed_parameters_list)
+    return parsed_parameters_list
+
+
+PARAMETERS_MODES = ("cartesian", "pairwise", "sample")
+
+
+def iter_parameters(parsed_parameters_list, mode="cartesian", limit=None, seed=None):
+    """generate parameter mappings lazily.
+
+    Args:
+        parsed_parameters_list (list): loaded by load_parameters
+        mode (str): combination mode of parameters
+            cartesian: all combinations, in the same order as parse_parameters.
+            pairwise: combinations covering every value pair of any two parameters.
+            sample: random combinations without replacement, kept in cartesian order.
+        limit (int): max count of combinations, required for sample mode.
+        seed (int): random seed of sample mode.
+
+    Yields:
+        dict: parameter mapping of one combination
+
+    """
+    if mode not in PARAMETERS_MODES:
+        raise exceptions.ParamsError(
+            "invalid parameters mode: {}, available modes: {}".format(
+                mode, "/".join(PARAMETERS_MODES)
+            )
+        )
+    if mode == "sample" and limit is None:
+        raise exceptions.ParamsError("limit is required for sample parameters mode")
+
+    if mode == "cartesian":
+        product = utils.iter_cartesian_product(*parsed_parameters_list)
+        if limit is not None:
+            product = itertools.islice(product, limit)
+        for parameter_mapping in product:
+            yield parameter_mapping
+        return
+
+    # pairwise and sample modes pick values by index
+    parameters_list = [
+        parameters if hasattr(parameters, "__getitem__") else list(parameters)
+        for parameters in parsed_parameters_list
+    ]
+    sizes = [len(parameters) for parameters in parameters_list]
+    if 0 in sizes:
+        return
+
+    if mode == "pairwise":
+        indexes_list = utils.gen_pairwise_indexes(sizes)
+        if limit is not None:
+            indexes_list = itertools.islice(indexes_list, limit)
+    else:
+        total = functools.reduce(operator.mul, sizes, 1) if sizes else 0
+        count = min(limit, total)
+        # sample from range without materializing all combinations
+        positions = sorted(random.Random(seed).sample(range(total), count))
+        indexes_list = (_unravel_index(position, sizes) for position in positions)
+
+    for indexes in indexes_list:
+        parameter_mapping = {}
+        for parameters, index in zip(parameters_list, indexes):
+            parameter_mapping.update(parameters[index])
+        yield parameter_mapping
+
+
+def _iter_or_default(iterable, default):
+    """yield items of iterable, or default if iterable is empty.
+    """
+    empty = True
+    for item in iterable:
+        empty = False
+        yield item
+
+    if empty:
+        yield default
+
+
+def _unravel_index(position, sizes):
+    """convert position in cartesian product to value index of each parameter.
+    """
+    indexes = []
+    for size in reversed(sizes):
+        position, index = divmod(position, size)
+        indexes.append(index)
+    return tuple(reversed(indexes))
 
 
 ###############################################################################
@@ -592,7 +807,13 @@ def parse_string(
         func_match = function_regex_compile.match(raw_string, match_start_position)
         if func_match:
             func_name = func_match.group(1)
-            func = get_mapping_function(func_name, functions_mapping)
+            if func_name in ["parameterize", "P"] and func_name not in functions_mapping:
+                # built-in csv parameterize, e.g. ${parameterize(account.csv)}
+                from httprunner import loader
+
+                func = loader.load_csv_parameters
+            else:
+                func = get_mapping_function(func_name, functions_mapping)
 
             func_params_str = func_match.group(2)
             function_meta = parse_function_params(func_params_str)
@@ -764,10 +985,33 @@ def parse_tests(testcases, variables_mapping=None):
 
     Returns:
         list: parsed testcases list, with config variables/parameters/name/request parsed.
+            see iter_tests for parameters mode.
+
+    """
+    return list(iter_tests(testcases, variables_mapping))
+
+
+def iter_tests(testcases, variables_mapping=None):
+    """parse testcases lazily, one testcase is yielded for each parameters combination.
+
+    Parameters combinations are generated on demand, and only the varying parts of testcase
+    are copied for each combination: teststeps are deep copied since they are changed
+    while running, config is shallow copied since its parsed fields are always new objects.
+
+    Config may specify how parameters are combined, see iter_parameters:
+        "parameters_mode": "cartesian",     # optional, cartesian/pairwise/sample
+        "parameters_limit": 100,            # max count of combinations, required by sample mode
+        "parameters_seed": 1                # optional, random seed of sample mode
+
+    Args:
+        testcases (list): testcase list, with config unparsed, see parse_tests.
+        variables_mapping (dict): if variables_mapping is specified, it will override variables in config block.
+
+    Yields:
+        dict: parsed testcase, with config variables/parameters/name/request parsed.
 
     """
     variables_mapping = variables_mapping or {}
-    parsed_testcases_list = []
 
     for testcase in testcases:
         testcase_config = testcase.setdefault("config", {})
@@ -783,14 +1027,29 @@ def parse_tests(testcases, variables_mapping=None):
 
         # parse config parameters
         config_parameters = testcase_config.pop("parameters", [])
-        cartesian_product_parameters_list = parse_parameters(
-            config_parameters,
-            project_mapping["debugtalk"]["variables"],
-            project_mapping["debugtalk"]["functions"],
-        ) or [{}]
-
-        for parameter_mapping in cartesian_product_parameters_list:
-            testcase_dict = utils.deepcopy_dict(testcase)
+        parameters_mode = testcase_config.pop("parameters_mode", None) or "cartesian"
+        parameters_limit = testcase_config.pop("parameters_limit", None)
+        parameters_seed = testcase_config.pop("parameters_seed", None)
+        if config_parameters:
+            parsed_parameters_list = load_parameters(
+                config_parameters,
+                project_mapping["debugtalk"]["variables"],
+                project_mapping["debugtalk"]["functions"],
+            )
+            parameter_mappings = iter_parameters(
+                parsed_parameters_list,
+                mode=parameters_mode,
+                limit=parameters_limit,
+                seed=parameters_seed,
+            )
+        else:
+            parameter_mappings = []
+
+        for parameter_mapping in _iter_or_default(parameter_mappings, {}):
+            testcase_dict = utils.deepcopy_dict(
+                {key: value for key, value in testcase.items() if key != "config"}
+            )
+            testcase_dict["config"] = dict(testcase_config)
             config = testcase_dict.get("config")
 
             # parse config variables
@@ -833,6 +1092,4 @@ def parse_tests(testcases, variables_mapping=None):
             testcase_dict["config"]["functions"] = project_mapping["debugtalk"][
                 "functions"
             ]
-            parsed_testcases_list.append(testcase_dict)
-
-    return parsed_testcases_list
+            yield testcase_dict
@@ -2,6 +2,7 @@
 
 import io
 import logging
+import math
 import os
 import platform
 import time
@@ -9,10 +10,12 @@ import unittest
 from base64 import b64encode
 from collections import Iterable
 from datetime import datetime
+from urllib.parse import urlsplit
 
 from jinja2 import Template
 from markupsafe import escape
 
+from httprunner import body
 from httprunner.__about__ import __version__
 from httprunner.compat import basestring, bytes, json, numeric_types
 
@@ -83,6 +86,103 @@ def aggregate_stat(origin_stat, new_stat):
             origin_stat[key] += new_stat[key]
 
 
+TIMING_PHASES = (
+    "dns_ms",
+    "connect_ms",
+    "tls_ms",
+    "ttfb_ms",
+    "download_ms",
+    "response_time_ms",
+)
+
+TIMING_PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(sorted_values, percent):
+    """nearest-rank percentile of sorted values"""
+    if not sorted_values:
+        return 0
+    rank = max(int(math.ceil(percent / 100.0 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def collect_timing_samples(records, samples):
+    """collect per-phase network timings of records into samples, grouped by api.
+
+    Args:
+        records (list): testcase records.
+        samples (dict): samples collected so far, will be updated.
+            {
+                "GET /api/users": {"ttfb_ms": [20.1, 35.2], ...}
+            }
+
+    """
+    for record in records:
+        meta_data = record.get("meta_data") or {}
+        response = meta_data.get("response") or {}
+        timings = meta_data.get("timings")
+        if not timings:
+            continue
+
+        request = meta_data.get("request") or {}
+        api = "{} {}".format(
+            request.get("method", "N/A"), urlsplit(str(request.get("url", ""))).path
+        )
+        api_samples = samples.setdefault(api, {phase: [] for phase in TIMING_PHASES})
+        for phase in TIMING_PHASES:
+            value = timings.get(phase, response.get(phase))
+            if isinstance(value, numeric_types):
+                api_samples[phase].append(value)
+
+    return samples
+
+
+def summarize_timing_samples(samples):
+    """get percentiles of each phase per api from collected samples.
+
+    Returns:
+        dict: percentiles of each phase per api, api is identified by "METHOD path".
+            {
+                "GET /api/users": {
+                    "count": 10,
+                    "ttfb_ms": {"p50": 20.1, "p90": 35.2, "p95": 40.0, "p99": 52.3, "max": 52.3},
+                    ...
+                }
+            }
+
+    """
+    timings_stat = {}
+    for api, api_samples in samples.items():
+        api_stat = {"count": len(api_samples["response_time_ms"])}
+        for phase, values in api_samples.items():
+            values = sorted(values)
+            phase_stat = {
+                "p{}".format(percent): percentile(values, percent)
+                for percent in TIMING_PERCENTILES
+            }
+            phase_stat["max"] = values[-1] if values else 0
+            api_stat[phase] = phase_stat
+        timings_stat[api] = api_stat
+
+    return timings_stat
+
+
+def get_timings_stat(details):
+    """aggregate per-phase network timings of all records, grouped by api.
+
+    Args:
+        details (list): summary details, each with records.
+
+    Returns:
+        dict: see summarize_timing_samples
+
+    """
+    samples = {}
+    for detail in details:
+        collect_timing_samples(detail.get("records", []), samples)
+    return summarize_timing_samples(samples)
+
+
 def render_html_report(summary, html_report_name=None, html_report_template=None):
     """render html report with specified report name and template
     if html_report_name is not specified, use current datetime
@@ -122,6 +222,7 @@ def render_html_report(summary, html_report_name=None, html_report_template=None
             suite_summary["name"] = "test suite {}".format(index)
         for record in suite_summary.get("records"):
             meta_data = record["meta_data"]
+            body.materialize(meta_data["response"], with_text=True)
             stringify_data(meta_data, "request")
             stringify_data(meta_data, "response")
 
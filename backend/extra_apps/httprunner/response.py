@@ -3,6 +3,8 @@
 import json
 import re
 import logging
+from collections import namedtuple
+from functools import lru_cache
 
 import pydash
 import jsonpath
@@ -12,9 +14,82 @@ from httprunner.compat import OrderedDict, basestring, is_py2
 
 text_extractor_regexp_compile = re.compile(r".*\(.*\).*")
 list_condition_extractor_regexp_compile = re.compile(r'^for#\w+.*#\w.*')
+# plain dotted path without jsonpath operators, e.g. content.data.list.0.id
+dotted_path_regexp_compile = re.compile(r'^[\w\-]+(\.[\w\-]+)*$')
 
 logger = logging.getLogger(__name__)
 
+EXTRACTOR_CACHE_SIZE = 4096
+
+_MISSING = object()
+
+Extractor = namedtuple("Extractor", ["kind", "top_query", "sub_query", "json_keys"])
+
+
+@lru_cache(maxsize=EXTRACTOR_CACHE_SIZE)
+def compile_extractor(field):
+    """ classify extractor field and split it once, result is cached by field string.
+
+    Args:
+        field (str): extractor field, e.g. "status_code", "content.data.0.id", "LB(.*)RB"
+
+    Returns:
+        Extractor: kind is one of regex, condition and delimiter.
+            json_keys is set for plain dotted path of response body, e.g. ("data", "0", "id").
+
+    """
+    if text_extractor_regexp_compile.match(field) and field.startswith("content.") is False:
+        return Extractor("regex", None, None, None)
+
+    if list_condition_extractor_regexp_compile.match(field.replace(" ", "")):
+        return Extractor("condition", None, None, None)
+
+    # string.split(sep=None, maxsplit=-1) -> list of strings
+    # e.g. "content.person.name" => ["content", "person.name"]
+    try:
+        top_query, sub_query = field.split('.', 1)
+    except ValueError:
+        top_query = field
+        sub_query = None
+
+    json_keys = None
+    if top_query == "content" and sub_query and dotted_path_regexp_compile.match(sub_query):
+        json_keys = tuple(sub_query.split("."))
+
+    return Extractor("delimiter", top_query, sub_query, json_keys)
+
+
+def query_json_keys(obj, json_keys):
+    """ walk json object with dict keys and list indexes, return _MISSING if not found.
+    """
+    for key in json_keys:
+        if isinstance(obj, dict) and key in obj:
+            obj = obj[key]
+        elif isinstance(obj, list) and key.isdigit() and int(key) < len(obj):
+            obj = obj[int(key)]
+        else:
+            return _MISSING
+
+    return obj
+
+
+def index_condition_list(condition_list, expect_path):
+    """ index list items by str value of condition field, first matched item is kept.
+
+    Args:
+        condition_list (list): list in response body, e.g. [{"id": 1, "a": 2}, {"id": 2, "a": 3}]
+        expect_path (str): condition field of item, e.g. "id"
+
+    Returns:
+        dict: {"1": {"id": 1, "a": 2}, "2": {"id": 2, "a": 3}}
+
+    """
+    index = {}
+    for item in condition_list:
+        index.setdefault(str(pydash.get(item, expect_path, "")), item)
+
+    return index
+
 
 class ResponseObject(object):
 
@@ -38,6 +113,23 @@ class ResponseObject(object):
             logger.error(err_msg)
             raise exceptions.ParamsError(err_msg)
 
+    def _get_body(self):
+        """ response body parsed as json, fall back to text if it is not json.
+            parsed once and shared by all extractors and validators of the response.
+        """
+        try:
+            return self.__dict__["_body"]
+        except KeyError:
+            pass
+
+        try:
+            body = self.json
+        except exceptions.JSONDecodeError:
+            body = self.text
+
+        self.__dict__["_body"] = body
+        return body
+
     def _extract_field_with_regex(self, field):
         """ extract field from response content with regex.
             requests.Response body could be json or html text.
@@ -72,14 +164,8 @@ class ResponseObject(object):
             "request.body"
             "request.body.key"
         """
-        # string.split(sep=None, maxsplit=-1) -> list of strings
-        # e.g. "content.person.name" => ["content", "person.name"]
-
-        try:
-            top_query, sub_query = field.split('.', 1)
-        except ValueError:
-            top_query = field
-            sub_query = None
+        extractor = compile_extractor(field)
+        top_query, sub_query = extractor.top_query, extractor.sub_query
 
         # request
         if top_query == 'request' and sub_query is not None:
@@ -155,15 +241,18 @@ class ResponseObject(object):
 
         # response body
         elif top_query in ["content", "text", "json"]:
-            try:
-                body = self.json
-            except exceptions.JSONDecodeError:
-                body = self.text
+            body = self._get_body()
 
             if not sub_query:
                 # extract response body
                 return body
 
+            # 普通的点分路径直接按key取值，取不到时仍交给jsonpath处理
+            if extractor.json_keys is not None:
+                value = query_json_keys(body, extractor.json_keys)
+                if value is not _MISSING:
+                    return value
+
             # 当body是dict时，使用jsonpath替换原有的取值方式
             return self._extract_with_jsonpath(body, field)
 
@@ -247,17 +336,24 @@ class ResponseObject(object):
                 log.error(err_msg)
                 raise exceptions.ExtractFailure(err_msg)
 
+            # 同一个响应中对同一列表、同一条件字段的抽取共用索引，只在第一次抽取时遍历列表
+            condition_indexes = self.__dict__.setdefault("_condition_indexes", {})
+            index_key = (condition_list_path, expect_path)
+            index = condition_indexes.get(index_key)
+            if index is None:
+                index = index_condition_list(condition_list, expect_path)
+                condition_indexes[index_key] = index
+
             extract_value = None
-            for d in condition_list:
-                if expect_value == str(pydash.get(d, expect_path, "")):
-                    # 当抽取条件满足时
-                    # 如果抽取路径以content.开头，就从整个json取
-                    # 否则,从当前的对象取
-                    if extract_path.startswith('content.'):
-                        extract_value = pydash.get(content, extract_path.replace('content.', "", 1))
-                    else:
-                        extract_value = pydash.get(d, extract_path)
-                    break
+            d = index.get(expect_value, _MISSING)
+            if d is not _MISSING:
+                # 当抽取条件满足时
+                # 如果抽取路径以content.开头，就从整个json取
+                # 否则,从当前的对象取
+                if extract_path.startswith('content.'):
+                    extract_value = pydash.get(content, extract_path.replace('content.', "", 1))
+                else:
+                    extract_value = pydash.get(d, extract_path)
 
             if not extract_value:
                 err_msg = '抽取结果不存在'
@@ -286,9 +382,10 @@ class ResponseObject(object):
 
         msg = "extract: {}".format(field)
 
-        if text_extractor_regexp_compile.match(field) and field.startswith("content.") is False:
+        extractor = compile_extractor(field)
+        if extractor.kind == "regex":
             value = self._extract_field_with_regex(field)
-        elif list_condition_extractor_regexp_compile.match(field.replace(" ", "")):
+        elif extractor.kind == "condition":
             value = self._extract_with_condition(field)
         else:
             value = self._extract_field_with_delimiter(field)
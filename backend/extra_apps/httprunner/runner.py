@@ -1,5 +1,5 @@
 # encoding: utf-8
-import threading
+import contextvars
 import logging
 
 import pydash
@@ -13,14 +13,24 @@ from httprunner.context import Context
 
 logger = logging.getLogger(__name__)
 
+# 当前正在执行的Runner，HttpRunner每次运行都在独立的上下文中执行，
+# 线程、协程之间互不影响，运行结束后随上下文一起释放
+current_runner = contextvars.ContextVar("current_runner", default=None)
+
 
 class Runner(object):
-    # 每个线程对应Runner类的实例
-    instances = {}
 
-    def __init__(self, config_dict=None, http_client_session=None):
+    def __init__(
+        self,
+        config_dict=None,
+        http_client_session=None,
+        connection_pool=None,
+        body_store=None,
+    ):
         """ """
         self.http_client_session = http_client_session
+        self.connection_pool = connection_pool
+        self.body_store = body_store
         config_dict = config_dict or {}
         self.evaluated_validators = []
 
@@ -36,11 +46,12 @@ class Runner(object):
         self.context = Context(config_variables, config_functions)
         self.init_test(config_dict, "testcase")
 
+        # 用例前置hooks中也可以使用Hrun修改运行时变量
+        current_runner.set(self)
+
         if testcase_setup_hooks:
             self.do_hook_actions(testcase_setup_hooks)
 
-        Runner.instances[threading.current_thread().name] = self
-
     def __del__(self):
         if self.testcase_teardown_hooks:
             self.do_hook_actions(self.testcase_teardown_hooks)
@@ -94,7 +105,9 @@ class Runner(object):
         parsed_request = self.context.get_parsed_request(request_config, level)
 
         base_url = parsed_request.pop("base_url", None)
-        self.http_client_session = self.http_client_session or HttpSession(base_url)
+        self.http_client_session = self.http_client_session or HttpSession(
+            base_url, connection_pool=self.connection_pool, body_store=self.body_store
+        )
 
         return parsed_request
 
@@ -136,7 +149,7 @@ class Runner(object):
             # TODO: check hook function if valid
             self.context.eval_content(action)
 
-    def run_test(self, teststep_dict):
+    def run_test(self, teststep_dict, validators=None):
         """run single teststep.
 
         Args:
@@ -161,6 +174,8 @@ class Runner(object):
                     "setup_hooks": [],          # optional
                     "teardown_hooks": []        # optional
                 }
+            validators (list): validators compiled by parser.compile_validators when loading tests,
+                default to validators in teststep_dict, which will be compiled in each run.
 
         Raises:
             exceptions.ParamsError
@@ -175,9 +190,10 @@ class Runner(object):
         extractors = teststep_dict.get("extract", []) or teststep_dict.get(
             "extractors", []
         )
-        validators = teststep_dict.get("validate", []) or teststep_dict.get(
-            "validators", []
-        )
+        if validators is None:
+            validators = teststep_dict.get("validate", []) or teststep_dict.get(
+                "validators", []
+            )
         parsed_request = self.init_test(teststep_dict, level="teststep")
         self.context.update_teststep_variables_mapping("request", parsed_request)
 
@@ -301,10 +317,11 @@ class Hrun(object):
 
     @staticmethod
     def get_current_context():
-        current_thread = threading.current_thread().name
-        if Runner.instances.get(current_thread):
-            return Runner.instances[current_thread].context
-        return Runner().context
+        runner = current_runner.get()
+        if runner is not None:
+            return runner.context
+        # 不在用例执行过程中调用时，修改不会生效
+        return Context()
 
     @staticmethod
     def set_config_var(name, value):
@@ -462,6 +462,96 @@ def gen_cartesian_product(*args):
     return product_list
 
 
+def iter_cartesian_product(*args):
+    """ generate cartesian product lazily, same order as gen_cartesian_product.
+
+    Args:
+        args: lists of parameter dicts, or any re-iterable of parameter dicts.
+            inner parameters are iterated again for each item of outer parameters
+            instead of being materialized like itertools.product.
+
+    Yields:
+        dict: merged parameter mapping, e.g. {'a': 1, 'x': 111, 'y': 112}
+
+    """
+    if not args:
+        return
+
+    def _product(index, merged):
+        for item in args[index]:
+            product_item_dict = dict(merged)
+            product_item_dict.update(item)
+            if index == len(args) - 1:
+                yield product_item_dict
+            else:
+                for product_item in _product(index + 1, product_item_dict):
+                    yield product_item
+
+    for product_item in _product(0, {}):
+        yield product_item
+
+
+def gen_pairwise_indexes(sizes):
+    """ generate index combinations covering every value pair of any two parameters.
+
+    Greedy all-pairs generation, the number of combinations is close to the product
+    of the two largest sizes instead of the product of all sizes.
+
+    Args:
+        sizes (list): value count of each parameter, e.g. [3, 2, 2]
+
+    Yields:
+        tuple: value index of each parameter, e.g. (0, 1, 1)
+
+    """
+    if len(sizes) <= 2:
+        # all pairs of two parameters is the full cartesian product
+        for indexes in itertools.product(*[range(size) for size in sizes]):
+            yield indexes
+        return
+
+    count = len(sizes)
+    all_pairs = [
+        (i, a, j, b)
+        for i, j in itertools.combinations(range(count), 2)
+        for a in range(sizes[i])
+        for b in range(sizes[j])
+    ]
+    uncovered = set(all_pairs)
+
+    for seed_pair in all_pairs:
+        if seed_pair not in uncovered:
+            continue
+
+        # seed with the first uncovered pair, then pick the value covering most uncovered pairs
+        i, a, j, b = seed_pair
+        combination = [None] * count
+        combination[i] = a
+        combination[j] = b
+
+        for k in range(count):
+            if combination[k] is not None:
+                continue
+
+            best_value, best_covered = 0, -1
+            for value in range(sizes[k]):
+                covered = 0
+                for m in range(count):
+                    if combination[m] is None:
+                        continue
+                    pair = (m, combination[m], k, value) if m < k else (k, value, m, combination[m])
+                    if pair in uncovered:
+                        covered += 1
+                if covered > best_covered:
+                    best_value, best_covered = value, covered
+            combination[k] = best_value
+
+        for m, n in itertools.combinations(range(count), 2):
+            uncovered.discard((m, combination[m], n, combination[n]))
+
+        yield tuple(combination)
+
+
 def validate_json_file(file_list):
     """ validate JSON testcase format
     """
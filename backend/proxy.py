@@ -8,10 +8,15 @@
 @Description : 启动录制代理
 """
 import asyncio
+import os
+
 from loguru import logger
 
-from backend import settings
-from record_proxy import start_proxy
+# 推送websocket消息时需要读取django配置中的channel layer
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+from backend import settings  # noqa: E402
+from record_proxy import start_proxy  # noqa: E402
 
 
 if __name__ == "__main__":
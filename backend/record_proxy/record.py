@@ -11,6 +11,7 @@ import json
 import re
 
 from backend.utils.redis_manager import RedisHelper
+from backend.utils.ws_connection_manager import ConnectionManager, MessageType
 from apps.schema.request import RequestInfo
 
 
@@ -38,4 +39,7 @@ class Recorder:
             request_data = RequestInfo(flow)
             dump_data = request_data.dumps()
             await RedisHelper.cache_record(user_id=user_id, request=dump_data)
-            # TODO: 下个版本需要加入ws协议的支持
+            # 代理和web服务不在同一进程，通过channel layer推送给用户
+            await ConnectionManager.send_data(
+                user_id, MessageType.RECORD.value, dump_data
+            )
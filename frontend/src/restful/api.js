@@ -195,10 +195,6 @@ export const moveAPI = params => {
         .then(res => res.data);
 };
 
-export const getPaginationByPage = params => {
-    return axios.get("/api/lunarlink/api", params).then(res => res.data);
-};
-
 export const runAPIByPk = (apiId, params, cancelToken) => {
     return axios
         .get("/api/lunarlink/run_api_pk/" + apiId, {
@@ -336,10 +332,6 @@ export const runSingleTest = params => {
     return axios.post("/api/lunarlink/run_test", params).then(res => res.data);
 };
 
-export const getAPIPaginationByPage = params => {
-    return axios.get("/api/lunarlink/api", params).then(res => res.data);
-};
-
 export const deleteVariables = variableId => {
     return axios
         .delete("/api/lunarlink/variables/" + variableId)
@@ -376,10 +368,6 @@ export const loginLogList = params => {
     return axios.get("/api/user/login_log", params).then(res => res.data);
 };
 
-export const loginLogPaginationByPage = params => {
-    return axios.get("/api/user/login_log", params).then(res => res.data);
-};
-
 export const runDebugtalk = params => {
     return axios
         .post("/api/lunarlink/debugtalk", params)
@@ -446,10 +434,6 @@ export const reportList = params => {
     return axios.get("/api/lunarlink/reports", params).then(res => res.data);
 };
 
-export const getReportPaginationByPage = params => {
-    return axios.get("/api/lunarlink/reports", params).then(res => res.data);
-};
-
 export const runMultiTest = params => {
     return axios
         .post("/api/lunarlink/run_multi_tests", params)
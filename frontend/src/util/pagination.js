@@ -0,0 +1,25 @@
+/**
+ * 从分页接口返回的next、previous链接中取出游标
+ * @param {String} url - next或previous链接
+ * @return {String} - 游标，没有链接时返回undefined
+ */
+export const getCursor = function(url) {
+    if (!url) {
+        return undefined;
+    }
+    return new URL(url).searchParams.get("cursor") || undefined;
+};
+
+/**
+ * 键集分页翻页时使用的游标，页码变大取next中的游标，变小取previous中的游标
+ * @param {Object} data - 当前页的分页数据 {count, next, previous, results}
+ * @param {Number} page - 目标页码
+ * @param {Number} loadedPage - 当前页的页码
+ * @return {String} - 游标，回到第一页或没有游标时返回undefined
+ */
+export const getPageCursor = function(data, page, loadedPage) {
+    if (page <= 1 || page === loadedPage) {
+        return undefined;
+    }
+    return getCursor(page > loadedPage ? data.next : data.previous);
+};